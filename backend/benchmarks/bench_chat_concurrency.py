@@ -0,0 +1,71 @@
+"""
+Latenza p50/p99 di POST /api/chat al crescere dei client concorrenti.
+
+Ogni client usa una propria sessione (i turni di una stessa sessione sono
+serializzati per costruzione). La colonna "in volo" è il numero medio di
+richieste in elaborazione contemporanea (somma delle latenze / durata):
+vicina al numero di client se le richieste si sovrappongono, vicina a 1
+se l'event loop le serializza.
+
+Richiede il server avviato (python main.py --mode frontend).
+
+Usage:
+    python -m backend.benchmarks.bench_chat_concurrency --url http://localhost:8000 --clients 1 2 4 8 16
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+MESSAGES = [
+    "Ciao, come stai?",
+    "Qual è la capitale dell'Australia?",
+    "Grazie mille!",
+    "Spiegami cos'è la fotosintesi.",
+]
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def client_loop(client: httpx.AsyncClient, url: str, requests_per_client: int, latencies: list):
+    session_id = f"bench-{uuid.uuid4().hex[:8]}"
+    for i in range(requests_per_client):
+        start = time.perf_counter()
+        response = await client.post(f"{url}/api/chat", json={"command": MESSAGES[i % len(MESSAGES)], "session_id": session_id})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+async def run_level(url: str, clients: int, requests_per_client: int) -> dict:
+    latencies: list = []
+    async with httpx.AsyncClient(timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, url, requests_per_client, latencies) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return {
+        "clients": clients,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "mean": statistics.mean(latencies),
+        "throughput": len(latencies) / elapsed,
+        "in_flight": sum(latencies) / elapsed,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark di concorrenza per /api/chat")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--requests", type=int, default=5, help="Richieste per client")
+    args = parser.parse_args()
+
+    print(f"{'client':>7} {'p50 s':>8} {'p99 s':>8} {'media s':>8} {'req/s':>7} {'in volo':>8}")
+    for clients in args.clients:
+        result = await run_level(args.url, clients, args.requests)
+        print(f"{result['clients']:>7} {result['p50']:>8.2f} {result['p99']:>8.2f} {result['mean']:>8.2f} {result['throughput']:>7.2f} {result['in_flight']:>8.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,62 @@
+"""
+Time-to-first-token e latenza totale di POST /api/chat/stream (SSE) rispetto a POST /api/chat.
+
+Richiede il server avviato (python main.py --mode frontend).
+
+Usage:
+    python -m backend.benchmarks.bench_chat_stream --url http://localhost:8000 --requests 10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import httpx
+
+MESSAGES = [
+    "Ciao, come stai?",
+    "Spiegami cos'è la fotosintesi.",
+    "Raccontami qualcosa sui vulcani.",
+]
+
+async def blocking_turn(client: httpx.AsyncClient, url: str, command: str, session_id: str) -> float:
+    start = time.perf_counter()
+    response = await client.post(f"{url}/api/chat", json={"command": command, "session_id": session_id})
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+async def streaming_turn(client: httpx.AsyncClient, url: str, command: str, session_id: str) -> tuple:
+    start = time.perf_counter()
+    first_delta = None
+    async with client.stream("POST", f"{url}/api/chat/stream", json={"command": command, "session_id": session_id}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line == "event: delta" and first_delta is None:
+                first_delta = time.perf_counter() - start
+            elif line in ("event: final", "event: error"):
+                break
+    total = time.perf_counter() - start
+    return first_delta if first_delta is not None else total, total
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark dello streaming delle risposte")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=10)
+    args = parser.parse_args()
+
+    blocking, first_tokens, streamed = [], [], []
+    async with httpx.AsyncClient(timeout=120) as client:
+        for i in range(args.requests):
+            command = MESSAGES[i % len(MESSAGES)]
+            blocking.append(await blocking_turn(client, args.url, command, f"bench-{uuid.uuid4().hex[:8]}"))
+            first_token, total = await streaming_turn(client, args.url, command, f"bench-{uuid.uuid4().hex[:8]}")
+            first_tokens.append(first_token)
+            streamed.append(total)
+
+    print(f"{'endpoint':>17} {'prima risposta s':>17} {'totale s':>9}")
+    print(f"{'/api/chat':>17} {statistics.median(blocking):>17.2f} {statistics.median(blocking):>9.2f}")
+    print(f"{'/api/chat/stream':>17} {statistics.median(first_tokens):>17.2f} {statistics.median(streamed):>9.2f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+"""
+Micro-benchmark: MemorySaver vs checkpointer SQLite compresso con potatura, su sessioni lunghe.
+
+Ogni turno esegue un grafo minimo che aggiunge un messaggio utente e una
+risposta al log. Come in VoiceAssistant, l'ingresso è lo snapshot dei
+MessageLog della sessione, mentre il canale ricaricato dal checkpoint è una
+lista semplice. Si misurano la latenza per turno (media e ultimi 10%
+dei turni), il tempo speso nel reducer dei messaggi, la memoria Python
+allocata (tracemalloc) e la dimensione del file SQLite.
+
+Usage:
+    python -m backend.benchmarks.bench_checkpointer
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Annotated, List, TypedDict
+from langgraph.graph import StateGraph, START, END
+from langgraph.checkpoint.memory import MemorySaver
+from backend.src.state.message import Message
+from backend.src.state.message_log import MessageLog, merge_messages
+from backend.src import checkpointer as checkpointer_module
+from backend.src.checkpointer import ThreadedCheckpointSaver, CheckpointPruner, _sqlite_saver
+
+TURNS = [100, 500, 2_000]
+KEEP_LAST = 10
+
+reducer_time = [0.0]
+
+def timed_merge(old, new):
+    start = time.perf_counter()
+    try:
+        return merge_messages(old, new)
+    finally:
+        reducer_time[0] += time.perf_counter() - start
+
+class BenchState(TypedDict, total=False):
+    user_messages: Annotated[List[dict], timed_merge]
+    agent_messages: Annotated[List[dict], timed_merge]
+
+def reply_node(state: BenchState) -> dict:
+    last = state["user_messages"][-1]["content"]
+    return {"agent_messages": [Message("assistant", f"risposta a {last}" + " lorem ipsum" * 10)]}
+
+def build_graph(saver):
+    builder = StateGraph(BenchState)
+    builder.add_node("reply", reply_node)
+    builder.add_edge(START, "reply")
+    builder.add_edge("reply", END)
+    return builder.compile(checkpointer=saver)
+
+async def run_session(graph, turns: int, pruner: CheckpointPruner = None) -> tuple:
+    config = {"configurable": {"thread_id": "bench"}}
+    user_log, agent_log = MessageLog().freeze(), MessageLog().freeze()
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        # Snapshot della sessione come in VoiceAssistant: storico completo più il nuovo messaggio
+        user_log = merge_messages(user_log, [Message("user", f"messaggio {turn}")]).freeze()
+        result = await graph.ainvoke({"user_messages": user_log, "agent_messages": agent_log}, config=config)
+        user_log, agent_log = result["user_messages"], result["agent_messages"]
+        latencies.append(time.perf_counter() - start)
+        if pruner is not None and turn % 50 == 49:
+            pruner.prune()
+    tail = latencies[-max(turns // 10, 1):]
+    return sum(latencies) / turns, sum(tail) / len(tail)
+
+def measure(make_saver, turns: int):
+    reducer_time[0] = 0.0
+    tracemalloc.start()
+    saver, pruner, path = make_saver()
+    per_turn, tail = asyncio.run(run_session(build_graph(saver), turns, pruner))
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    size = os.path.getsize(path) if path else 0
+    return per_turn, tail, reducer_time[0] / turns, memory, size
+
+def make_memory_saver():
+    return MemorySaver(), None, None
+
+def make_sqlite_saver():
+    path = os.path.join(tempfile.mkdtemp(), "checkpoints.sqlite")
+    saver, prune = _sqlite_saver(path)
+    return ThreadedCheckpointSaver(saver), CheckpointPruner(prune, keep_last=KEEP_LAST), path
+
+def main():
+    print(f"{'turni':>7} {'backend':>8} {'ms/turno':>10} {'ultimi 10%':>11} {'reducer us':>11} {'memoria MB':>11} {'file MB':>9}")
+    for turns in TURNS:
+        for name, factory in (("memory", make_memory_saver), ("sqlite", make_sqlite_saver)):
+            per_turn, tail, reducer, memory, size = measure(factory, turns)
+            print(f"{turns:>7} {name:>8} {per_turn * 1e3:>10.2f} {tail * 1e3:>11.2f} {reducer * 1e6:>11.1f} "
+                  f"{memory / 2**20:>11.1f} {size / 2**20:>9.2f}")
+    compression = "zstd" if checkpointer_module.zstandard is not None else "zlib"
+    print(f"\nCompressione: {compression}, ultimi {KEEP_LAST} checkpoint per thread")
+
+if __name__ == "__main__":
+    main()
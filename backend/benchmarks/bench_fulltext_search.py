@@ -0,0 +1,91 @@
+"""
+Ricerca full-text (tsvector + GIN) vs ILIKE su data::text, su una tabella sintetica.
+
+Crea e poi elimina la tabella `bench_long_term_memory` nel database di DATABASE_URL.
+
+Usage:
+    python -m backend.benchmarks.bench_fulltext_search --rows 100000
+"""
+
+import argparse
+import time
+import psycopg2
+from backend.src.config import DATABASE_URL, FTS_LANGUAGE
+
+TABLE = "bench_long_term_memory"
+QUERIES = ["fotosintesi", "capitale", "ricetta", "temporale"]
+REPEAT = 5
+
+def setup(cursor, rows: int):
+    cursor.execute(f"DROP TABLE IF EXISTS {TABLE};")
+    cursor.execute(f"""
+        CREATE TABLE {TABLE} (
+            namespace VARCHAR(255),
+            key VARCHAR(255),
+            data JSONB,
+            PRIMARY KEY (namespace, key)
+        );
+    """)
+    # Testi sintetici in italiano: combinazioni di parole da un piccolo vocabolario
+    cursor.execute(f"""
+        INSERT INTO {TABLE} (namespace, key, data)
+        SELECT
+            'research_results',
+            'query-' || i,
+            jsonb_build_object(
+                'result',
+                (ARRAY['La fotosintesi', 'La capitale', 'Una ricetta', 'Il temporale', 'Il concerto'])[1 + i % 5]
+                || ' ' ||
+                (ARRAY['è spiegata in dettaglio', 'cambia con le stagioni', 'richiede pazienza', 'arriva da nord'])[1 + i % 4]
+                || ' numero ' || i
+            )
+        FROM generate_series(1, %s) AS i;
+    """, (rows,))
+    cursor.execute(f"""
+        ALTER TABLE {TABLE} ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (jsonb_to_tsvector('{FTS_LANGUAGE}', data, '["string"]')) STORED;
+    """)
+    cursor.execute(f"CREATE INDEX ON {TABLE} USING gin (search_vector);")
+    cursor.execute(f"ANALYZE {TABLE};")
+
+def time_query(cursor, sql: str, params: tuple) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        cursor.execute(sql, params)
+        cursor.fetchall()
+    return (time.perf_counter() - start) / REPEAT
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ricerca full-text vs ILIKE")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    connection = psycopg2.connect(DATABASE_URL)
+    connection.autocommit = True
+    try:
+        with connection.cursor() as cursor:
+            print(f"Creazione di {args.rows} righe sintetiche...")
+            setup(cursor, args.rows)
+
+            ilike_sql = f"SELECT key, data FROM {TABLE} WHERE namespace = %s AND data::text ILIKE %s;"
+            fulltext_sql = f"""
+                SELECT key, data, ts_rank(search_vector, query) AS rank
+                FROM {TABLE}, websearch_to_tsquery(%s::regconfig, %s) AS query
+                WHERE namespace = %s AND search_vector @@ query
+                ORDER BY rank DESC
+                LIMIT %s;
+            """
+
+            print(f"{'query':>12} {'ILIKE ms':>10} {'full-text ms':>13} {'speedup':>8}")
+            for query in QUERIES:
+                ilike = time_query(cursor, ilike_sql, ("research_results", f"%{query}%"))
+                fulltext = time_query(cursor, fulltext_sql, (FTS_LANGUAGE, query, "research_results", args.limit))
+                print(f"{query:>12} {ilike * 1e3:>10.1f} {fulltext * 1e3:>13.1f} {ilike / fulltext:>7.1f}x")
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE};")
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Esecuzioni dei nodi e latenza per turno del grafo, percorso greeting e percorso research.
+
+LLM, database ed embedding sono sostituiti da attese simulate (--llm-ms,
+--db-ms): il grafo, i reducer e il checkpointer in memoria sono quelli
+reali. Per ogni turno riporta i nodi eseguiti (`node_calls` del profiler)
+e termina con errore se un nodo, in particolare il supervisor, viene
+eseguito più di una volta nello stesso turno.
+
+Usage:
+    python -m backend.benchmarks.bench_graph_turn --turns 20 --llm-ms 50 --db-ms 5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Checkpointer in memoria, router LLM e nessun archivio: il grafo non richiede servizi esterni
+os.environ.setdefault("CHECKPOINTER_BACKEND", "memory")
+os.environ.setdefault("ROUTER_MODE", "llm")
+os.environ.setdefault("MESSAGE_WINDOW_SIZE", "0")
+os.environ["TRACE_ENABLED"] = "true"  # node_calls viene dalle tracce del profiler
+os.environ.setdefault("TRACE_EXPORT_PATH", "")
+
+from backend.src.agents import greeting_agent, researcher_agent, supervisor_agent
+from backend.src.langgraph_setup import initialize_graph
+from backend.src.profiler import profiler
+from backend.src.state.message import Message
+from backend.src.tools.intent_router import IntentRouter
+
+MESSAGES = {
+    "GREETING": "Ciao, come stai?",
+    "RESEARCHER": "Spiegami cos'è la fotosintesi?",
+}
+
+class SimulatedCache:
+    """Cache dei risultati di ricerca sempre vuota: ogni ricerca chiama l'LLM simulato."""
+
+    async def aget(self, query):
+        return None
+
+    async def aput(self, query, result, latency_s):
+        pass
+
+class SimulatedMemoryStore:
+    """MemoryStore con le sole operazioni usate dai nodi, con latenza del database simulata."""
+
+    def __init__(self, db_s: float):
+        self.db_s = db_s
+        self.research_cache = SimulatedCache()
+
+    async def aretrieve_from_long_term_memory(self, namespace, key):
+        await asyncio.sleep(self.db_s)
+        return {}
+
+    async def asave_to_long_term_memory(self, namespace, key, data, embedding=None):
+        await asyncio.sleep(self.db_s)
+
+    def manage_short_term(self, short_term, messages):
+        return (short_term + messages)[-10:]
+
+    def extract_relevant_info(self, message):
+        return None
+
+    def manage_long_term(self, long_term, info):
+        return long_term
+
+def simulate_llm(llm_s: float):
+    """Sostituisce router, ricerca e risposta con attese di `llm_s` secondi."""
+    async def route(user_message, state):
+        await asyncio.sleep(llm_s)
+        return "RESEARCHER" if "cos'è" in user_message else "GREETING"
+
+    async def research(query):
+        await asyncio.sleep(llm_s)
+        return f"Risultato per: {query}"
+
+    async def respond(conversation_text, last_user_message, modified_response):
+        await asyncio.sleep(llm_s)
+        return f"Risposta a: {last_user_message}"
+
+    supervisor_agent.adetermine_next_agent = route
+    supervisor_agent.find_relevant_messages = lambda state, message, archived=None: []
+    supervisor_agent.intent_router = IntentRouter(mode="llm")
+    researcher_agent.aperform_research = research
+    greeting_agent.agenerate_response = respond
+
+async def run(turns: int, llm_s: float, db_s: float) -> int:
+    simulate_llm(llm_s)
+    graph = initialize_graph(SimulatedMemoryStore(db_s))
+    violations = 0
+
+    print(f"{'percorso':>10} {'nodi eseguiti':>62} {'p50 ms':>8} {'p95 ms':>8}")
+    for route, message in MESSAGES.items():
+        thread_id = f"bench-{route.lower()}"
+        config = {"configurable": {"thread_id": thread_id}}
+        latencies, calls = [], None
+        for turn in range(turns):
+            state = {"user_messages": [Message("user", f"{message} ({turn})")], "thread_id": thread_id}
+            start = time.perf_counter()
+            with profiler.turn(thread_id, turn=turn):
+                await graph.ainvoke(state, config=config)
+            latencies.append((time.perf_counter() - start) * 1e3)
+            calls = profiler.traces(thread_id, limit=1)[0]["node_calls"]
+            violations += sum(count > 1 for count in calls.values())
+        latencies.sort()
+        summary = ", ".join(f"{node}={count}" for node, count in calls.items())
+        print(f"{route.lower():>10} {summary:>62} {statistics.median(latencies):>8.1f} "
+              f"{latencies[int(len(latencies) * 0.95) - 1]:>8.1f}")
+    return violations
+
+def main():
+    parser = argparse.ArgumentParser(description="Esecuzioni dei nodi e latenza per turno del grafo")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--llm-ms", type=float, default=50.0, help="Latenza simulata di ogni chiamata LLM")
+    parser.add_argument("--db-ms", type=float, default=5.0, help="Latenza simulata di ogni accesso al database")
+    args = parser.parse_args()
+
+    violations = asyncio.run(run(args.turns, args.llm_ms / 1e3, args.db_ms / 1e3))
+    if violations:
+        print(f"\n{violations} esecuzioni ripetute di un nodo nello stesso turno")
+        sys.exit(1)
+    print("\nOgni nodo è stato eseguito al più una volta per turno")
+
+if __name__ == "__main__":
+    main()
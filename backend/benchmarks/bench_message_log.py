@@ -0,0 +1,56 @@
+"""
+Micro-benchmark: reducer dei messaggi su storici lunghi (fino a 10k turni).
+
+Confronta `manage_list` (ricostruisce e riserializza tutto lo storico a ogni
+chiamata, con il vecchio pattern "storico completo + nuovo messaggio") con
+`merge_messages` su MessageLog (i nodi restituiscono solo i delta).
+
+Usage:
+    python -m backend.benchmarks.bench_message_log
+"""
+
+import time
+from backend.src.state.state_schema import manage_list
+from backend.src.state.message_log import MessageLog, merge_messages
+
+SIZES = [1_000, 5_000, 10_000]
+SAMPLE_TURNS = 20
+
+def make_message(turn: int) -> dict:
+    role = "user" if turn % 2 == 0 else "assistant"
+    return {"role": role, "content": f"messaggio {turn}: " + "lorem ipsum " * 8}
+
+def bench_manage_list(size: int) -> float:
+    """Costo per turno con uno storico di `size` messaggi."""
+    history = [make_message(i) for i in range(size)]
+    start = time.perf_counter()
+    for turn in range(size, size + SAMPLE_TURNS):
+        history = manage_list(history, history + [make_message(turn)])
+    return (time.perf_counter() - start) / SAMPLE_TURNS
+
+def bench_merge_messages(size: int) -> float:
+    history = MessageLog(make_message(i) for i in range(size))
+    start = time.perf_counter()
+    for turn in range(size, size + SAMPLE_TURNS):
+        history = merge_messages(history, [make_message(turn)])
+    return (time.perf_counter() - start) / SAMPLE_TURNS
+
+def bench_full_session(turns: int) -> float:
+    """Sessione completa con MessageLog: tempo totale per `turns` turni."""
+    history = MessageLog()
+    start = time.perf_counter()
+    for turn in range(turns):
+        history = merge_messages(history, [make_message(turn)])
+    return time.perf_counter() - start
+
+def main():
+    print(f"{'storico':>10} {'manage_list ms/turno':>22} {'MessageLog us/turno':>21} {'speedup':>9}")
+    for size in SIZES:
+        old = bench_manage_list(size)
+        new = bench_merge_messages(size)
+        print(f"{size:>10} {old * 1e3:>22.3f} {new * 1e6:>21.2f} {old / new:>8.0f}x")
+    total = bench_full_session(SIZES[-1])
+    print(f"\nSessione da {SIZES[-1]} turni con MessageLog: {total * 1e3:.1f} ms totali")
+
+if __name__ == "__main__":
+    main()
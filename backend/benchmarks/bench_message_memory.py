@@ -0,0 +1,47 @@
+"""
+Micro-benchmark: memoria di 100k messaggi come dizionari e come Message (__slots__).
+
+Il testo dei messaggi è allocato prima della misura: i numeri riportano
+solo il costo dei contenitori (dict o Message, digest compreso). Misura
+anche il tempo per aggiungerli a un MessageLog (digest calcolato contro
+digest precalcolato).
+
+Usage:
+    python -m backend.benchmarks.bench_message_memory
+"""
+
+import time
+import tracemalloc
+from backend.src.state.message import Message
+from backend.src.state.message_log import MessageLog
+
+MESSAGES = 100_000
+
+def make_contents():
+    return [(("user" if i % 2 == 0 else "assistant"), f"messaggio {i}: " + "lorem ipsum " * 4) for i in range(MESSAGES)]
+
+def measure(build) -> tuple:
+    contents = make_contents()
+    tracemalloc.start()
+    start = time.perf_counter()
+    records = build(contents)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, size, elapsed
+
+def time_log(records) -> float:
+    start = time.perf_counter()
+    MessageLog(records)
+    return time.perf_counter() - start
+
+def main():
+    dicts, dict_bytes, dict_build = measure(lambda contents: [{"role": role, "content": text} for role, text in contents])
+    messages, message_bytes, message_build = measure(lambda contents: [Message(role, text) for role, text in contents])
+
+    print(f"{'tipo':>8} {'byte/messaggio':>15} {'MB totali':>10} {'creazione ms':>13} {'MessageLog ms':>14}")
+    for name, size, build, records in (("dict", dict_bytes, dict_build, dicts), ("Message", message_bytes, message_build, messages)):
+        print(f"{name:>8} {size / MESSAGES:>15.1f} {size / 2**20:>10.1f} {build * 1e3:>13.1f} {time_log(records) * 1e3:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Micro-benchmark: processed_messages come MessageLog di testi e come DigestSet limitato.
+
+Per 100k messaggi elaborati misura memoria, tempo di inserimento, test di
+appartenenza e dimensione serializzata (pickle e JSON) di ciascuna
+struttura. Il DigestSet conserva solo gli ultimi PROCESSED_MESSAGES_LIMIT
+digest.
+
+Usage:
+    python -m backend.benchmarks.bench_processed_messages
+"""
+
+import json
+import pickle
+import time
+import tracemalloc
+from backend.src.state.digest_set import DigestSet
+from backend.src.state.message import json_default
+from backend.src.state.message_log import MessageLog
+
+MESSAGES = 100_000
+
+def make_texts():
+    return [f"richiesta {i}: " + "lorem ipsum " * 4 for i in range(MESSAGES)]
+
+def measure(structure, texts) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    for text in texts:
+        structure.add(text) if isinstance(structure, DigestSet) else structure.append(text)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    recent = texts[-1000:]
+    start = time.perf_counter()
+    for text in recent:
+        assert text in structure
+    lookup = (time.perf_counter() - start) / len(recent)
+    return size, elapsed, lookup
+
+def main():
+    texts = make_texts()
+    print(f"{'struttura':>10} {'elementi':>9} {'MB memoria':>11} {'inserimento ms':>15} {'lookup µs':>10} {'pickle KB':>10} {'JSON KB':>8}")
+    for name, structure in (("MessageLog", MessageLog()), ("DigestSet", DigestSet())):
+        size, elapsed, lookup = measure(structure, texts)
+        pickled = len(pickle.dumps(structure))
+        encoded = len(json.dumps(structure, default=json_default))
+        print(f"{name:>10} {len(structure):>9} {size / 2**20:>11.1f} {elapsed * 1e3:>15.1f} {lookup * 1e6:>10.2f} "
+              f"{pickled / 1024:>10.1f} {encoded / 1024:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Micro-benchmark: costo della profilazione dei nodi del grafo.
+
+Simula turni con quattro nodi e tre sezioni attribuite (llm, embedding,
+db) per nodo e confronta il tempo per turno senza profiler, con il
+profiler attivo e con la misura delle allocazioni (tracemalloc).
+
+Usage:
+    python -m backend.benchmarks.bench_profiler
+"""
+
+import asyncio
+import time
+import tracemalloc
+from backend.src.profiler import GraphProfiler, profiled
+
+TURNS = 5_000
+NODES = ("supervisor", "researcher", "greeting", "manage_memory")
+
+async def run_turn(profiler: GraphProfiler, turn: int):
+    with profiler.turn("bench-thread", turn=turn):
+        for name in NODES:
+            with profiler.node(name):
+                for category in ("llm", "embedding", "db"):
+                    with profiled(category):
+                        await asyncio.sleep(0)
+
+async def measure(profiler: GraphProfiler) -> float:
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        await run_turn(profiler, turn)
+    return (time.perf_counter() - start) / TURNS
+
+def main():
+    # Creati uno alla volta: con trace_allocations il profiler avvia tracemalloc
+    configurations = (
+        ("disattivato", lambda: GraphProfiler(enabled=False)),
+        ("attivo", lambda: GraphProfiler(enabled=True, trace_allocations=False, export_path="")),
+        ("allocazioni", lambda: GraphProfiler(enabled=True, trace_allocations=True, export_path="")),
+    )
+    print(f"{'profiler':>12} {'µs/turno':>10} {'turni nel buffer':>17}")
+    for name, create in configurations:
+        profiler = create()
+        per_turn = asyncio.run(measure(profiler))
+        print(f"{name:>12} {per_turn * 1e6:>10.1f} {len(profiler.traces()):>17}")
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark: CPU spesa per turno nei log dello stato, a livello INFO e DEBUG.
+
+Riproduce le chiamate di log di un turno (voice_assistant, supervisor,
+greeting, update_state) nella forma precedente (f-string e str() eager
+dell'intero stato) e con i riepiloghi differiti di utils.lazy_log.
+
+Usage:
+    python -m backend.benchmarks.bench_state_logging
+"""
+
+import io
+import logging
+import time
+from backend.src.utils.lazy_log import state_summary, summarize
+
+HISTORY_SIZES = [100, 1_000, 10_000]
+TURNS = 50
+
+logger = logging.getLogger("BenchStateLogging")
+
+def make_state(size: int) -> dict:
+    return {
+        "user_messages": [{"role": "user", "content": f"messaggio {i}"} for i in range(size)],
+        "agent_messages": [{"role": "assistant", "content": f"risposta {i} " + "lorem ipsum " * 5} for i in range(size)],
+        "processed_messages": [f"messaggio {i}" for i in range(size)],
+        "last_agent": "greeting",
+        "next_agent": "manage_memory",
+        "relevant_messages": [],
+        "thread_id": "thread-1",
+    }
+
+def eager_turn(state: dict):
+    formatted_state = {k: v for k, v in state.items() if not isinstance(v, (list, dict)) or len(str(v)) < 100}
+    logger.debug("Stato iniziale: %s", formatted_state)
+    logger.debug(f"Supervisor state: {state}")
+    logger.debug(f"[DETERMINE_AGENT] Input state: {state}")
+    logger.debug(f"Invoking greeting_node with state: {state}")
+    for key in ("user_messages", "agent_messages", "processed_messages"):
+        logger.debug("Updated state key '%s' with value: %s", key,
+                     str(state[key])[:200] + '...' if len(str(state[key])) > 200 else state[key])
+    logger.debug("Stato dopo update_state: %s", state)
+
+def lazy_turn(state: dict):
+    logger.debug("Stato iniziale: %s", state_summary(state))
+    logger.debug("Supervisor state: %s", state_summary(state))
+    logger.debug("[DETERMINE_AGENT] Input state: %s", state_summary(state))
+    logger.debug("Invoking greeting_node with state: %s", state_summary(state))
+    for key in ("user_messages", "agent_messages", "processed_messages"):
+        logger.debug("Updated state key '%s' with value: %s", key, summarize(state[key]))
+    logger.debug("Stato dopo update_state: %s", state_summary(state))
+
+def time_turns(turn, state: dict) -> float:
+    start = time.process_time()
+    for _ in range(TURNS):
+        turn(state)
+    return (time.process_time() - start) / TURNS
+
+def main():
+    handler = logging.StreamHandler(io.StringIO())  # I record emessi vengono formattati davvero
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    print(f"{'storico':>8} {'livello':>8} {'eager ms/turno':>15} {'lazy ms/turno':>14}")
+    for size in HISTORY_SIZES:
+        state = make_state(size)
+        for level in (logging.INFO, logging.DEBUG):
+            logger.setLevel(level)
+            handler.stream.seek(0)
+            handler.stream.truncate()
+            eager = time_turns(eager_turn, state)
+            lazy = time_turns(lazy_turn, state)
+            print(f"{size:>8} {logging.getLevelName(level):>8} {eager * 1e3:>15.3f} {lazy * 1e3:>14.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: allocazioni per turno dello stato passato al grafo.
+
+"prima": copia superficiale dello stato, append sul log condiviso, copia
+dei log al confine del grafo e di nuovo in update_state. "dopo": snapshot
+con log congelati e condivisi, copy-on-write solo per i log estesi nel
+turno. Il flusso di process_command è riprodotto senza il grafo.
+
+Usage:
+    python -m backend.benchmarks.bench_state_snapshot
+"""
+
+import time
+import tracemalloc
+from backend.src.state.message_log import MessageLog, merge_messages
+
+HISTORY_SIZES = [1_000, 10_000, 50_000]
+TURNS = 20
+KEYS = ("user_messages", "agent_messages", "processed_messages")
+
+def make_state(size: int) -> dict:
+    return {
+        "user_messages": MessageLog({"role": "user", "content": f"messaggio {i}"} for i in range(size)),
+        "agent_messages": MessageLog({"role": "assistant", "content": f"risposta {i}"} for i in range(size)),
+        "processed_messages": MessageLog(f"messaggio {i}" for i in range(size)),
+        "last_agent": "greeting",
+    }
+
+def turn_before(live: dict, turn: int):
+    state = live.copy()
+    state["user_messages"].append({"role": "user", "content": f"nuovo {turn}"})  # Muta il log condiviso
+    channels = {key: state[key].copy() for key in KEYS}  # Copia al confine del grafo
+    channels["agent_messages"].extend([{"role": "assistant", "content": f"risposta nuova {turn}"}])
+    channels["processed_messages"].extend([f"nuovo {turn}"])
+    for key in KEYS:
+        live[key] = channels[key].copy()  # update_state
+
+def turn_after(live: dict, turn: int):
+    live["user_messages"] = merge_messages(live["user_messages"], [{"role": "user", "content": f"nuovo {turn}"}])
+    for key in KEYS:
+        live[key].freeze()
+    state = dict(live)  # StateManager.snapshot
+    channels = {key: merge_messages([], state[key]) for key in KEYS}
+    channels["agent_messages"] = merge_messages(channels["agent_messages"], [{"role": "assistant", "content": f"risposta nuova {turn}"}])
+    channels["processed_messages"] = merge_messages(channels["processed_messages"], [f"nuovo {turn}"])
+    for key in KEYS:
+        live[key] = merge_messages(live[key], channels[key])  # update_state
+
+def measure(turn_fn, size: int):
+    live = make_state(size)
+    tracemalloc.start()
+    peaks = 0
+    start = time.perf_counter()
+    for turn in range(TURNS):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        turn_fn(live, turn)
+        peaks += tracemalloc.get_traced_memory()[1] - before
+    elapsed = (time.perf_counter() - start) / TURNS
+    tracemalloc.stop()
+    return peaks / TURNS, elapsed
+
+def main():
+    print(f"{'storico':>8} {'prima KB/turno':>15} {'dopo KB/turno':>14} {'prima ms':>9} {'dopo ms':>8}")
+    for size in HISTORY_SIZES:
+        before_bytes, before_time = measure(turn_before, size)
+        after_bytes, after_time = measure(turn_after, size)
+        print(f"{size:>8} {before_bytes / 1024:>15.1f} {after_bytes / 1024:>14.1f} {before_time * 1e3:>9.2f} {after_time * 1e3:>8.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Micro-benchmark: overhead di StateManager.update_state per aggiornamento.
+
+Confronta il percorso precedente (get_origin/get_args su ogni chiave e
+validazione dell'intero stato a ogni update, riprodotto qui) con la tabella
+dello schema precompilata, con e senza validazione (STATE_VALIDATION).
+
+Usage:
+    python -m backend.benchmarks.bench_state_update
+"""
+
+import logging
+import time
+from typing import get_args, get_origin
+from typing_extensions import Annotated
+from backend.src.state.state_manager import StateManager
+from backend.src.state.state_schema import StateSchema
+from backend.src.state import state_manager as state_manager_module
+
+UPDATES = 20_000
+UPDATE = {
+    "last_agent": "greeting",
+    "next_agent": "manage_memory",
+    "last_user_message": "ciao",
+    "relevant_messages": [],
+    "should_research": False,
+}
+
+def legacy_update(state: dict, schema, updates: dict):
+    """Percorso precedente: introspezione dello schema per ogni chiave e validazione completa."""
+    annotations = schema.__annotations__
+    for key, value in updates.items():
+        if key in annotations:
+            annotation = annotations[key]
+            origin = get_origin(annotation)
+            if origin is Annotated:
+                args = get_args(annotation)
+                base_type = get_origin(args[0]) or args[0]
+                reducer = args[1] if len(args) > 1 else None
+            else:
+                base_type = origin if origin else annotation
+                reducer = None
+            if base_type is list and reducer:
+                state[key] = reducer(state.get(key, []), value)
+            else:
+                state[key] = value
+    for key, value in state.items():
+        if key in annotations:
+            expected_type = annotations[key]
+            origin = get_origin(expected_type)
+            if origin is list:
+                isinstance(value, list)
+            elif origin is dict:
+                isinstance(value, dict)
+            elif origin is None:
+                isinstance(value, expected_type)
+
+def time_updates(update) -> float:
+    start = time.perf_counter()
+    for _ in range(UPDATES):
+        update()
+    return (time.perf_counter() - start) / UPDATES
+
+def main():
+    logging.disable(logging.WARNING)  # Solo il costo dell'aggiornamento, non dei log
+    manager = StateManager(memory_store=None)
+    manager.set_state_schema(StateSchema)
+    legacy_state = dict(manager.state)
+
+    legacy = time_updates(lambda: legacy_update(legacy_state, StateSchema, UPDATE))
+    state_manager_module.STATE_VALIDATION = True
+    validated = time_updates(lambda: manager.update_state(UPDATE))
+    state_manager_module.STATE_VALIDATION = False
+    production = time_updates(lambda: manager.update_state(UPDATE))
+
+    print(f"{'percorso':>28} {'us/update':>10}")
+    print(f"{'introspezione + validazione':>28} {legacy * 1e6:>10.2f}")
+    print(f"{'tabella precompilata':>28} {validated * 1e6:>10.2f}")
+    print(f"{'tabella, produzione':>28} {production * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
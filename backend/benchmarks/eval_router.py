@@ -0,0 +1,108 @@
+"""
+Valutazione offline del router locale del supervisor rispetto al router LLM.
+
+Le decisioni del router LLM salvate in `routing_decisions` (oppure un file
+JSON lines con {"message", "route"}) vengono divise in addestramento e
+test. Per ogni soglia di confidenza riporta la quota di messaggi decisi in
+locale, l'accordo con l'LLM su quei messaggi e l'accordo complessivo in
+modalità hybrid (sotto soglia decide l'LLM). Con --save il classificatore
+viene addestrato su tutti gli esempi e salvato in ROUTER_MODEL_PATH.
+
+Come riferimento riporta le stesse misure per una LogisticRegression di
+scikit-learn sugli stessi embedding. Il router usa i centroidi: il modello
+salvato è un file .npz con due vettori, caricato con la sola NumPy senza
+il pickle di un modello scikit-learn legato alla versione installata.
+
+I fallback (source "llm") sono solo messaggi sotto soglia; il campione di
+decisioni locali etichettate dall'LLM (source "audit", ROUTER_AUDIT_RATE)
+completa il dataset e dà l'accordo del router locale in produzione.
+
+Usage:
+    python -m backend.benchmarks.eval_router [--file decisioni.jsonl] [--save]
+"""
+
+import argparse
+import json
+import random
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from backend.src.config import ROUTER_MODEL_PATH
+from backend.src.tools.intent_router import ROUTING_NAMESPACE, train_classifier
+from backend.src.tools.embedding import embedding_cache
+
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+
+def load_decisions(path: str = "") -> List[Dict[str, Any]]:
+    if path:
+        with open(path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file if line.strip()]
+    from backend.src.core_components import CoreComponents  # Import locale: serve il database solo senza --file
+    rows = CoreComponents.get_memory_store().persistent_store.list_namespace(ROUTING_NAMESPACE)
+    return [row["data"] for row in rows]
+
+def report_sources(decisions: List[Dict[str, Any]]) -> None:
+    """Composizione del dataset e accordo con l'LLM delle decisioni locali campionate."""
+    counts = Counter(record.get("source", "llm") for record in decisions)  # Record precedenti: solo fallback
+    print(f"Etichette: {counts['llm']} fallback LLM, {counts['audit']} decisioni locali campionate")
+    audits = [record for record in decisions if record.get("source") == "audit" and record.get("local_route")]
+    if audits:
+        agreement = sum(record["local_route"] == record["route"] for record in audits) / len(audits)
+        print(f"Accordo del router locale con l'LLM in produzione: {agreement:.1%}")
+    print()
+
+def logistic_predictions(train_vectors: np.ndarray, train_labels: Sequence[str], test_vectors: np.ndarray) -> List[Tuple[str, float]]:
+    """Rotta e confidenza (probabilità della classe scelta) di una LogisticRegression."""
+    model = LogisticRegression(max_iter=1000).fit(train_vectors, train_labels)
+    probabilities = model.predict_proba(test_vectors)
+    return [(str(model.classes_[i]), float(row[i])) for row, i in zip(probabilities, probabilities.argmax(axis=1))]
+
+def report(name: str, predictions: List[Tuple[str, float]], expected: List[str]) -> None:
+    total = len(expected)
+    agreement = sum(route == label for (route, _), label in zip(predictions, expected)) / total
+    print(f"{name}: accordo senza soglia {agreement:.1%}")
+    print(f"{'soglia':>7} {'locale':>8} {'accordo locale':>15} {'accordo hybrid':>15} {'chiamate LLM':>13}")
+    for threshold in THRESHOLDS:
+        local = [(route, label) for (route, confidence), label in zip(predictions, expected) if confidence >= threshold]
+        local_agreement = sum(route == label for route, label in local) / len(local) if local else float("nan")
+        # In hybrid i messaggi sotto soglia sono decisi dall'LLM: accordo pieno per costruzione
+        hybrid_agreement = (sum(route == label for route, label in local) + total - len(local)) / total
+        print(f"{threshold:>7.2f} {len(local) / total:>8.1%} {local_agreement:>15.1%} "
+              f"{hybrid_agreement:>15.1%} {1 - len(local) / total:>13.1%}")
+    print()
+
+def evaluate(train: List[Dict[str, Any]], test: List[Dict[str, Any]]) -> None:
+    classifier = train_classifier(train)
+    test_vectors = embedding_cache.encode([record["message"] for record in test])
+    expected = [record["route"] for record in test]
+    print(f"Esempi: {len(train)} addestramento, {len(test)} test\n")
+    report("Centroidi (router)", classifier.predict(test_vectors), expected)
+
+    train_vectors = embedding_cache.encode([record["message"] for record in train])
+    train_labels = [record["route"] for record in train]
+    if len(set(train_labels)) > 1:
+        report("LogisticRegression", logistic_predictions(train_vectors, train_labels, test_vectors), expected)
+
+def main():
+    parser = argparse.ArgumentParser(description="Valuta il router locale rispetto al router LLM")
+    parser.add_argument("--file", default="", help="File JSON lines con {message, route} invece del database")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Quota di esempi usata per il test")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", action="store_true", help=f"Addestra su tutti gli esempi e salva in {ROUTER_MODEL_PATH}")
+    args = parser.parse_args()
+
+    decisions = load_decisions(args.file)
+    report_sources(decisions)
+    random.Random(args.seed).shuffle(decisions)
+    split = int(len(decisions) * (1 - args.test_fraction))
+    if split < len(decisions):
+        evaluate(decisions[:split], decisions[split:])
+
+    if args.save:
+        classifier = train_classifier(decisions)
+        classifier.save(ROUTER_MODEL_PATH)
+        print(f"\nClassificatore salvato in {ROUTER_MODEL_PATH} ({classifier.examples} esempi)")
+
+if __name__ == "__main__":
+    main()
@@ -1,58 +1,58 @@
 from langgraph.types import Command
 from typing import Literal
-from backend.src.tools.llm_tools import generate_response
+from backend.src.tools.llm_tools import agenerate_response
 from backend.src.memory_store import MemoryStore
 import logging
-from langgraph.graph import END
+from collections.abc import Mapping
+from backend.src.state.message import Message
+from backend.src.utils.lazy_log import state_summary, summarize
 
 logger = logging.getLogger("GreetingAgent")
 
 def create_greeting_node(memory_store: MemoryStore):
     """Create greeting node with injected memory_store"""
-    def greeting_node(state: dict) -> Command[Literal["__end__"]]:
-        logger.debug(f"Invoking greeting_node with state: {state}")  # Added state argument
+    async def greeting_node(state: dict) -> Command[Literal["manage_memory"]]:
+        logger.debug("Invoking greeting_node with state: %s", state_summary(state))
 
         # Recupera l'ultimo messaggio dell'utente, i messaggi rilevanti e la risposta modificata
         last_user_message = state.get("last_user_message", "")
         relevant_messages = state.get("relevant_messages", [])
         modified_response = state.get("modified_response", "")
 
-        logger.debug(f"Last user message: {last_user_message}")
-        logger.debug(f"Messaggi rilevanti trovati: {relevant_messages}")  # Added relevant_messages argument
-        logger.debug(f"Modified response: {modified_response}")
+        logger.debug("Last user message: %s", last_user_message)
+        logger.debug("Messaggi rilevanti trovati: %s", summarize(relevant_messages))
+        logger.debug("Modified response: %s", summarize(modified_response))
 
         # Genera una risposta contestuale basata sui messaggi rilevanti
         try:
             # Combina i messaggi rilevanti in ordine cronologico
             conversation_history = relevant_messages + [{"role": "user", "content": last_user_message}]
             conversation_text = "\n".join(
-                [f"{msg['role']}:{msg['content']}" for msg in conversation_history if isinstance(msg, dict)]
+                [f"{msg['role']}:{msg['content']}" for msg in conversation_history if isinstance(msg, Mapping)]
             )
-            logger.debug(f"Conversation history:\n{conversation_text}")  # Added conversation_text argument
+            logger.debug("Conversation history:\n%s", summarize(conversation_text, max_chars=1000))
 
             # Recupera il profilo utente dalla memoria a lungo termine
             thread_id = state.get("thread_id", "default-thread")
             # Replace with memory_store method call
-            user_profile = memory_store.retrieve_from_long_term_memory("user_profiles", thread_id)
+            user_profile = await memory_store.aretrieve_from_long_term_memory("user_profiles", thread_id)
             if user_profile:
                 conversation_text += f"\nUser preferences: {user_profile.get('last_greeting', 'N/A')}"
                 logger.debug(f"Preferenze utente aggiunte al contesto: {user_profile.get('last_greeting', 'N/A')}")
 
             # Genera una risposta utilizzando lo storico completo
-            assistant_response = generate_response(conversation_text, last_user_message, modified_response)
+            assistant_response = await agenerate_response(conversation_text, last_user_message, modified_response)
             logger.debug(f"Assistant response: {assistant_response}")  # Added assistant_response argument
 
             return Command(
-                goto=END,
+                goto="manage_memory",
                 update={
-                    "agent_messages": state.get("agent_messages", []) + [
-                        {"role": "assistant", "content": assistant_response}
-                    ],
+                    "agent_messages": [Message("assistant", assistant_response)],
                 },
             )
 
         except Exception as e:
             logger.error(f"Errore nel greeting_node: {e}", exc_info=True)
-            return Command(goto=END, update={"terminate": False})  # Ensure terminate remains False
+            return Command(goto="manage_memory", update={"terminate": False})  # Ensure terminate remains False
 
     return greeting_node
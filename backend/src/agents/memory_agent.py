@@ -8,7 +8,7 @@ logger = logging.getLogger("MemoryAgent")
 
 def create_memory_node(memory_store: MemoryStore):
     """Create memory node with injected memory_store"""
-    def memory_node(state: dict) -> Command[Literal["__end__"]]:
+    async def memory_node(state: dict) -> Command[Literal["__end__"]]:
         try:
             # Extract current memories
             short_term = state.get("short_term_memory", [])
@@ -33,7 +33,7 @@ def create_memory_node(memory_store: MemoryStore):
             updated_long_term = long_term  # Initialize updated_long_term
             if important_info:
                 updated_long_term = memory_store.manage_long_term(long_term, important_info)
-                memory_store.save_to_long_term_memory(
+                await memory_store.asave_to_long_term_memory(
                     "conversation_history", 
                     state.get("thread_id", "default"), 
                     updated_long_term
@@ -44,8 +44,6 @@ def create_memory_node(memory_store: MemoryStore):
                 update={
                     "short_term_memory": updated_short_term,
                     "long_term_memory": updated_long_term if important_info else long_term,
-                    "user_messages": state.get("user_messages", []),
-                    "processed_messages": state.get("processed_messages", [])
                 }
             )
             
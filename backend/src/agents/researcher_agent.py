@@ -1,10 +1,11 @@
 # src/agents/researcher_agent.py
-from langgraph.graph import END
 from langgraph.types import Command
 from langchain_openai import ChatOpenAI
-from backend.src.tools.llm_tools import perform_research, modify_response
+from backend.src.tools.llm_tools import aperform_research, modify_response, RESEARCH_ERROR
+from backend.src.profiler import profiler
 from backend.src.memory_store import MemoryStore
 import logging
+import time
 from typing import Literal
 
 logger = logging.getLogger("ResearcherAgent")
@@ -13,18 +14,28 @@ llm = ChatOpenAI(model="gpt-3.5-turbo")
 
 def create_researcher_node(memory_store: MemoryStore):
     """Create researcher node with injected memory_store"""
-    def researcher_node(state: dict) -> Command[Literal["supervisor", "__end__"]]:
+    async def researcher_node(state: dict) -> Command[Literal["greeting"]]:
+        # Il risultato passa direttamente al greeting, che genera la risposta:
+        # il supervisor non viene rieseguito nello stesso turno
         query = state.get("query", "").strip()
         if not query:
-            return Command(goto=END, update={"terminate": False})
+            return Command(goto="greeting", update={"terminate": False})
 
         try:
-            research_result = perform_research(query)
+            # Domande uguali o parafrasate riusano il risultato salvato senza chiamare l'LLM
+            cached = await memory_store.research_cache.aget(query)
+            if cached is not None:
+                research_result = cached["result"]
+                profiler.annotate(research_cache=cached["match"])
+            else:
+                start = time.perf_counter()
+                research_result = await aperform_research(query)
+                if research_result != RESEARCH_ERROR:
+                    await memory_store.research_cache.aput(query, research_result, time.perf_counter() - start)
             modified_resp = modify_response(research_result)
-            memory_store.save_to_long_term_memory("research_results", query, {"result": research_result})
             
             return Command(
-                goto="supervisor",
+                goto="greeting",
                 update={
                     "research_result": research_result,
                     "modified_response": modified_resp,
@@ -33,6 +44,7 @@ def create_researcher_node(memory_store: MemoryStore):
             )
         except Exception as e:
             logger.error(f"Errore nel nodo researcher: {e}")
-            return Command(goto=END, update={"terminate": False})
+            # Senza risultato il greeting risponde comunque dal contesto della conversazione
+            return Command(goto="greeting", update={"terminate": False})
             
     return researcher_node
@@ -2,11 +2,19 @@ from langgraph.graph import END
 from langgraph.types import Command
 from langchain_openai import ChatOpenAI
 from backend.src.core_components import CoreComponents  # Add this import
+import asyncio
+import contextvars
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from typing_extensions import Literal
-from backend.src.tools.llm_tools import vectorize_messages, semantic_search  # Remove memory-related imports
+from backend.src.tools.embedding import get_session_index, index_messages, search_index, message_key, embedding_cache  # Indice vettoriale di sessione
+from backend.src.config import MESSAGE_WINDOW_SIZE
 import json
+from backend.src.utils.lazy_log import state_summary, summarize
+from backend.src.state.digest_set import DigestSet
+from backend.src.profiler import profiled
+from backend.src.utils.blocking import run_blocking
+from backend.src.tools.intent_router import intent_router, RouteDecision, ROUTING_NAMESPACE
 
 logger = logging.getLogger("SupervisorAgent")
 
@@ -36,10 +44,11 @@ Respond ONLY with 'RESEARCHER' or 'GREETING' in uppercase.
 llm = ChatOpenAI(model="gpt-3.5-turbo")
 
 
-def determine_next_agent(user_message: str, state: dict) -> str:
+async def adetermine_next_agent(user_message: str, state: dict) -> str:
+    """Router LLM: usato dall'IntentRouter quando il classificatore locale non è abbastanza sicuro."""
     try:
-        logger.debug(f"[DETERMINE_AGENT] Input state: {state}")
-        logger.debug(f"[DETERMINE_AGENT] User message: {user_message}")
+        logger.debug("[DETERMINE_AGENT] Input state: %s", state_summary(state))
+        logger.debug("[DETERMINE_AGENT] User message: %s", user_message)
 
         # Create context
         context = {
@@ -48,17 +57,18 @@ def determine_next_agent(user_message: str, state: dict) -> str:
             "previous_responses": [m.get("content", "") for m in state.get("agent_messages", [])[-3:]],
             "last_agent": state.get("last_agent", "")
         }
-        logger.debug(f"[DETERMINE_AGENT] Created context: {context}")
+        logger.debug("[DETERMINE_AGENT] Created context: %s", summarize(context))
 
         # Create model messages
         model_messages = [
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": f"Previous context: {json.dumps(context)}\n\nUser message: {user_message}"}
         ]
-        logger.debug(f"[DETERMINE_AGENT] Model input: {model_messages}")
+        logger.debug("[DETERMINE_AGENT] Model input: %s", summarize(model_messages))
 
         # Get model response
-        response = llm.invoke(input=model_messages)
+        with profiled("llm"):
+            response = await llm.ainvoke(input=model_messages)
         next_agent = response.content
         logger.debug(f"[DETERMINE_AGENT] Raw model response: {response.content}")
 
@@ -73,6 +83,36 @@ def determine_next_agent(user_message: str, state: dict) -> str:
         logger.error(f"[DETERMINE_AGENT] Error: {str(e)}", exc_info=True)
         return "GREETING"
 
+# Etichettature in background delle decisioni locali (riferimenti tenuti fino alla fine)
+_audit_tasks: Set[asyncio.Task] = set()
+
+async def save_routing_decision(memory_store, user_message: str, route: str, decision: RouteDecision, source: str) -> None:
+    """Salva l'etichetta dell'LLM in routing_decisions; `source` è "llm" (fallback) o "audit" (campione locale)."""
+    record = {"message": user_message, "route": route, "local_confidence": decision.confidence, "source": source}
+    if source == "audit":
+        record["local_route"] = decision.route
+    await memory_store.asave_to_long_term_memory(ROUTING_NAMESPACE, embedding_cache.content_key(user_message), record)
+
+async def audit_local_decision(memory_store, user_message: str, state: dict, decision: RouteDecision) -> None:
+    """Fa etichettare all'LLM un messaggio instradato in locale e salva l'etichetta."""
+    try:
+        route = await adetermine_next_agent(user_message, state)
+        await save_routing_decision(memory_store, user_message, route, decision, "audit")
+        if route != decision.route:
+            logger.debug(f"Decisione locale {decision.route} diversa dall'LLM ({route}) per: {user_message}")
+    except Exception as e:
+        logger.error(f"Errore nell'etichettatura della decisione di routing: {e}")
+
+def schedule_audit(memory_store, user_message: str, state: dict, decision: RouteDecision) -> None:
+    """Avvia l'etichettatura in background: il turno non attende l'LLM.
+
+    Il task parte in un contesto vuoto, fuori dalla unit of work e dallo span
+    del turno: quando termina il turno potrebbe essere già concluso.
+    """
+    task = contextvars.Context().run(asyncio.create_task, audit_local_decision(memory_store, user_message, state, decision))
+    _audit_tasks.add(task)
+    task.add_done_callback(_audit_tasks.discard)
+
 def get_last_user_message(messages: List[Dict[str, Any]]) -> str:
     """Estrae l'ultimo messaggio dell'utente."""
     try:
@@ -95,12 +135,12 @@ def _format_debug_state(state: dict) -> dict:
 
 def create_supervisor_node(memory_store):  # Remove type hint to avoid import
     """Create supervisor node with injected memory_store from CoreComponents"""
-    def supervisor_node(state: dict) -> Command[Literal["researcher", "greeting", "manage_memory", "__end__"]]:
+    async def supervisor_node(state: dict) -> Command[Literal["researcher", "greeting", "manage_memory", "__end__"]]:
         try:
-            logger.debug(f"Supervisor state: {state}")  # Added state argument
+            logger.debug("Supervisor state: %s", state_summary(state))
             # Initialize 'processed_messages' if not present
             if "processed_messages" not in state:
-                state["processed_messages"] = []
+                state["processed_messages"] = DigestSet()
                 logger.debug("Initialized 'processed_messages' in state.")
 
             # Check for user messages
@@ -127,20 +167,37 @@ def create_supervisor_node(memory_store):  # Remove type hint to avoid import
             
             # Rimuovi eventuali riferimenti a builder.memory_store se presenti
             # Usa direttamente l'istanza di memory_store
-            user_profile = memory_store.retrieve_from_long_term_memory("user_profiles", thread_id)
+            user_profile = await memory_store.aretrieve_from_long_term_memory("user_profiles", thread_id)
             if user_profile:
                 context = {}  # Initialize context
                 context.update({"user_profile": user_profile})
-                logger.debug(f"User profile added to context: {user_profile}")
+                logger.debug("User profile added to context: %s", summarize(user_profile))
 
-            # Determine the next agent with the new context
-            next_agent = determine_next_agent(last_user_message, state)
+            # Determine the next agent with the new context (classificatore locale, LLM sotto soglia)
+            decision = await intent_router.aroute(last_user_message, lambda: adetermine_next_agent(last_user_message, state))
+            next_agent = decision.route
             logger.debug(f"Determined agent type: {next_agent}")  # Added next_agent argument
+            if decision.source == "llm":
+                # Le decisioni del router LLM sono le etichette per addestrare quello locale
+                await save_routing_decision(memory_store, last_user_message, next_agent, decision, "llm")
+            elif intent_router.should_audit(decision):
+                # Campione delle decisioni locali, perché le etichette non siano solo i casi sotto soglia
+                schedule_audit(memory_store, last_user_message, state, decision)
             
+            # Con la finestra attiva i messaggi più vecchi sono cercati anche nell'archivio
+            archived = []
+            if MESSAGE_WINDOW_SIZE > 0:
+                archived = await memory_store.message_archive.asearch(thread_id, last_user_message)
+
             state_updates = {
                 "last_user_message": last_user_message,
-                "relevant_messages": find_relevant_messages(state, last_user_message),
-                "processed_messages": state.get("processed_messages", []) + [last_user_message]
+                # Embedding e ricerca sono CPU-bound: nel pool limitato, fuori dall'event loop
+                "relevant_messages": await run_blocking(find_relevant_messages, state, last_user_message, archived),
+                "processed_messages": [last_user_message],
+                # Nessun risultato di ricerca dei turni precedenti nel prompt o nella memoria,
+                # nemmeno se il researcher fallisce o non ha una query
+                "research_result": "",
+                "modified_response": "",
             }
 
             if next_agent == "RESEARCHER":
@@ -171,24 +228,33 @@ def create_supervisor_node(memory_store):  # Remove type hint to avoid import
             
     return supervisor_node
 
-def find_relevant_messages(state: dict, last_user_message: str) -> List[Dict[str, Any]]:
-    """Trova i messaggi rilevanti basati sull'ultimo messaggio dell'utente."""
+def find_relevant_messages(state: dict, last_user_message: str, archived: Optional[List[Tuple[Dict[str, Any], float]]] = None, top_k: int = 3) -> List[Dict[str, Any]]:
+    """Trova i messaggi rilevanti basati sull'ultimo messaggio dell'utente.
+
+    `archived` sono i risultati (messaggio, similarità) della ricerca
+    nell'archivio, uniti per similarità a quelli della finestra in memoria.
+    """
     try:
-        # Vettorializza i messaggi precedenti
         previous_messages = state.get("user_messages", []) + state.get("agent_messages", [])
-        if not previous_messages:
+        if not previous_messages and not archived:
             logger.debug("Nessun messaggio precedente trovato.")
             return []
-        vectors = vectorize_messages(previous_messages)
-        #logger.debug(f"Vettori dei messaggi: {vectors}")
+
+        # Indicizza solo i messaggi nuovi nell'indice persistente della sessione
+        index = get_session_index(state.get("thread_id", "default-thread"))
+        index_messages(index, previous_messages)
 
         # Trova i messaggi rilevanti utilizzando una ricerca semantica
-        relevant_messages = semantic_search(vectors, last_user_message, previous_messages)
-        logger.debug(f"Messaggi rilevanti trovati: {relevant_messages}")  # Added relevant_messages argument
+        candidates = search_index(index, last_user_message, top_k=top_k, with_scores=True)
+        seen = {message_key(msg) for msg, _ in candidates}
+        candidates += [(msg, score) for msg, score in archived or [] if message_key(msg) not in seen]
+        candidates.sort(key=lambda item: item[1], reverse=True)
+        relevant_messages = [msg for msg, _ in candidates[:top_k]]
+        logger.debug("Messaggi rilevanti trovati: %s", summarize(relevant_messages))
         return relevant_messages
     except ValueError as e:
         logger.error(f"Errore durante la ricerca dei messaggi rilevanti: {e}")
         return []
     except Exception as e:
         logger.error(f"Errore durante la ricerca dei messaggi rilevanti: {e}")
-        return []
\ No newline at end of file
+        return []
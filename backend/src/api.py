@@ -1,6 +1,6 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from backend.src.voice_assistant import VoiceAssistant
@@ -11,10 +11,16 @@ from backend.src.tts import generate_speech
 from backend.src.stt import transcribe_audio
 import asyncio
 import logging
+from typing import Optional
 from pathlib import Path
 import os
 import base64
+import json
 from backend.src.core_components import CoreComponents  # Import CoreComponents
+from backend.src import langgraph_setup
+from backend.src.profiler import profiler
+from backend.src.tools.intent_router import intent_router
+from backend.src.session_manager import InvalidSessionId, Session, new_session_id
 
 # Base setup - fai questo solo se non è già stato fatto
 if not logging.getLogger().handlers:
@@ -35,16 +41,39 @@ app.add_middleware(
 
 # Initialize core components after app creation
 core = CoreComponents.get_instance()
-state_manager = core.state_manager
-assistant = core.assistant
-assistant.is_web_mode = True  # Imposta il web mode
+core.assistant.is_web_mode = True  # Imposta il web mode
+sessions = core.session_manager  # Stato e assistente separati per ogni session_id
+
+# Cookie con il session_id assegnato: i client che non lo rimandano nel corpo mantengono la conversazione
+SESSION_COOKIE = "session_id"
+
+async def get_session(request: Request, session_id: Optional[str]) -> Session:
+    """Sessione del client: session_id dal corpo o dalla query, poi dal cookie, altrimenti una nuova."""
+    try:
+        return await sessions.get(session_id or request.cookies.get(SESSION_COOKIE))
+    except InvalidSessionId as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def remember_session(response: Response, session: Session) -> None:
+    response.set_cookie(SESSION_COOKIE, session.session_id, httponly=True, samesite="lax")
     
+@app.on_event("shutdown")
+async def flush_write_behind():
+    """Salva le scritture in coda prima dello spegnimento"""
+    if core.write_behind is not None:
+        await asyncio.to_thread(core.write_behind.stop)
+    if langgraph_setup.checkpoint_pruner is not None:
+        langgraph_setup.checkpoint_pruner.stop()
+    await core.memory_store.aclose()
+    profiler.stop()
+
 # Models - Aggiorna per corrispondere al frontend
 class Command(BaseModel):
     command: str
 
 class ChatMessage(BaseModel):
     command: str  # Cambiato da 'message' a 'command' per corrispondere al frontend
+    session_id: Optional[str] = None  # Conversazione del client (None = cookie o nuova sessione)
 
 # API Endpoints - Verifica che corrispondano al frontend
 @app.get("/api/chat", tags=["chat"])  # Changed from /api/test
@@ -53,12 +82,13 @@ async def chat_status():
     return {"status": "success", "message": "Chat service is connected!"}
 
 @app.post("/api/chat", tags=["chat"])  # Changed from /api/test
-async def process_chat_message(message: ChatMessage):  # Renamed from process_test_command
+async def process_chat_message(message: ChatMessage, request: Request, response: Response):  # Renamed from process_test_command
     """Process chat messages"""
+    session = await get_session(request, message.session_id)
+    remember_session(response, session)
     try:
         logger.debug(f"Chat message received: {message.command}")  # Cambiato da message.message a message.command
-        await assistant.process_command(message.command)  # Cambiato da message.message a message.command
-        response_text = state_manager.get_assistant_message()
+        response_text = await session.process(message.command)
         
         if response_text:
             # Genera l'audio di risposta
@@ -73,6 +103,7 @@ async def process_chat_message(message: ChatMessage):  # Renamed from process_te
                     
                     return {
                         "status": "success",
+                        "session_id": session.session_id,
                         "message": response_text,
                         "audio_response": audio_base64  # Cambiato da 'audio' a 'audio_response'
                     }
@@ -83,14 +114,76 @@ async def process_chat_message(message: ChatMessage):  # Renamed from process_te
         
         return {
             "status": "success",
+            "session_id": session.session_id,
             "message": response_text or "No response generated"
         }
     except Exception as e:
         logger.error(f"Error processing chat message: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream", tags=["chat"])
+async def stream_chat_message(message: ChatMessage, request: Request):
+    """Come /api/chat, ma la risposta arriva in Server-Sent Events mentre viene generata.
+
+    Eventi `delta` con i blocchi di testo, poi `final` con la risposta completa
+    (o `error`); i dati di ogni evento sono JSON.
+    """
+    session = await get_session(request, message.session_id)
+
+    async def events():
+        async for frame in session.stream(message.command):
+            kind = frame.pop("type")
+            yield f"event: {kind}\ndata: {json.dumps(frame, ensure_ascii=False)}\n\n"
+
+    response = StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    remember_session(response, session)
+    return response
+
+@app.get("/api/debug/write-behind", tags=["debug"])
+async def write_behind_metrics():
+    """Metriche della coda write-behind dei session_logs"""
+    if core.write_behind is None:
+        return {"status": "disabled"}
+    return {"status": "success", "metrics": core.write_behind.metrics()}
+
+@app.get("/api/debug/cache", tags=["debug"])
+async def cache_stats():
+    """Statistiche hit/miss della read-through cache della memoria a lungo termine"""
+    return {"status": "success", "stats": core.memory_store.cache_stats()}
+
+@app.get("/api/debug/checkpoints", tags=["debug"])
+async def checkpoint_metrics():
+    """Metriche della potatura dei checkpoint del grafo"""
+    if langgraph_setup.checkpoint_pruner is None:
+        return {"status": "disabled"}
+    return {"status": "success", "metrics": langgraph_setup.checkpoint_pruner.metrics()}
+
+@app.get("/api/debug/sessions", tags=["debug"])
+async def session_stats():
+    """Sessioni attive in memoria ed eviction"""
+    return {"status": "success", "stats": sessions.stats()}
+
+@app.get("/api/debug/research-cache", tags=["debug"])
+async def research_cache_metrics():
+    """Hit rate della cache dei risultati di ricerca e tempo LLM risparmiato"""
+    return {"status": "success", "metrics": core.memory_store.research_cache.metrics()}
+
+@app.get("/api/debug/router", tags=["debug"])
+async def router_metrics():
+    """Decisioni del router del supervisor: locali, LLM, fallback e confidenza media"""
+    return {"status": "success", "metrics": intent_router.metrics()}
+
+@app.get("/api/debug/trace/{thread_id}", tags=["debug"])
+async def thread_traces(thread_id: str, limit: Optional[int] = None):
+    """Ultimi turni profilati del thread: tempi per nodo e per LLM, embedding, DB e TTS"""
+    if not profiler.enabled:
+        return {"status": "disabled"}
+    return {"status": "success", "thread_id": thread_id, "traces": profiler.traces(thread_id, limit=limit)}
+
 @app.post("/audio", tags=["audio"])
-async def process_audio(audio: UploadFile = File(...)):
+async def process_audio(request: Request, response: Response, audio: UploadFile = File(...), session_id: Optional[str] = None):
+    session = await get_session(request, session_id)
+    remember_session(response, session)
     try:
         temp_path = f"temp_{audio.filename}"
         with open(temp_path, "wb") as buffer:
@@ -103,8 +196,7 @@ async def process_audio(audio: UploadFile = File(...)):
         
         if text:
             # Processa il comando e ottieni la risposta
-            await assistant.process_command(text)
-            response_text = state_manager.get_assistant_message()
+            response_text = await session.process(text)
             
             # Log per debug
             logger.debug(f"Testo trascritto: {text}")
@@ -124,6 +216,7 @@ async def process_audio(audio: UploadFile = File(...)):
                         # Ritorna sia il testo che l'audio
                         return {
                             "status": "success",
+                            "session_id": session.session_id,
                             "text": text,
                             "assistant_response": response_text,  # Aggiunto il testo della risposta
                             "audio_response": audio_base64
@@ -137,6 +230,7 @@ async def process_audio(audio: UploadFile = File(...)):
             # Fallback: ritorna solo il testo se non è stato possibile generare l'audio
             return {
                 "status": "success",
+                "session_id": session.session_id,
                 "text": text,
                 "assistant_response": response_text
             }
@@ -156,17 +250,25 @@ async def process_audio(audio: UploadFile = File(...)):
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     client_id = id(websocket)
-    logger.info(f"WebSocket connection established - Client ID: {client_id}")
+    # Ogni connessione ha la propria sessione, a meno che il client non ne riprenda una esistente
+    requested_id = websocket.query_params.get("session_id")
+    session_id = requested_id or new_session_id("ws")
+    logger.info(f"WebSocket connection established - Client ID: {client_id}, session: {session_id}")
     
     try:
+        session = await sessions.get(session_id)
         while True:
+            # Frame JSON: {"type": "delta"|"final"|"error", ...} (vedi Session.stream)
             data = await websocket.receive_text()
-            await assistant.process_command(data)
-            response = state_manager.get_assistant_message()
-            if response:
-                await websocket.send_text(response)
+            async for frame in session.stream(data):
+                await websocket.send_json(frame)
+    except InvalidSessionId as e:
+        logger.warning(f"WebSocket {client_id} rifiutato: {e}")
+        await websocket.close(code=1008)
     except WebSocketDisconnect:
         logger.info(f"Client {client_id} disconnected")
+        if not requested_id:
+            sessions.close(session_id)  # Sessione anonima: non più raggiungibile
     except Exception as e:
         logger.error(f"WebSocket error: {e}", exc_info=True)
         await websocket.close(code=1011)
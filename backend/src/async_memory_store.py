@@ -0,0 +1,161 @@
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool
+from backend.src.config import DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, FTS_LANGUAGE
+from backend.src.db_pool import UnitOfWork, current_unit_of_work
+from backend.src.state.message import json_default
+from backend.src.profiler import profiled
+from backend.src.memory_store import (
+    PersistentStore,
+    UPSERT_SQL,
+    GET_SQL,
+    SEARCH_VECTOR_SQL,
+    SEARCH_VECTOR_EXACT_SQL,
+    SCAN_EMBEDDINGS_SQL,
+    FULLTEXT_SEARCH_SQL,
+    INSERT_THREAD_SQL,
+    format_embedding,
+    rank_by_embedding,
+)
+
+logger = logging.getLogger("AsyncMemoryStore")
+
+class AsyncPersistentStore:
+    """Variante asincrona di PersistentStore basata su psycopg 3 e AsyncConnectionPool.
+
+    Lo schema (tabelle, colonna embedding, indici) è creato dallo store
+    sincrono all'avvio; questa classe esegue solo letture e scritture.
+    """
+
+    def __init__(self, sync_store: PersistentStore, min_size: int = DB_POOL_MIN_SIZE, max_size: int = DB_POOL_MAX_SIZE):
+        self.connection_string = sync_store.connection_string
+        self.vector_enabled = sync_store.vector_enabled
+        self.embedding_cast = sync_store.embedding_cast
+        self.fulltext_enabled = sync_store.fulltext_enabled
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool: Optional[AsyncConnectionPool] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._open_lock: Optional[asyncio.Lock] = None
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        """Apre il pool nel loop corrente; il pool di un loop precedente viene chiuso."""
+        loop = asyncio.get_running_loop()
+        if self._pool is not None and self._loop is loop:
+            return self._pool
+        if self._open_lock is None or self._loop is not loop:
+            if self._pool is not None:
+                self._release(self._pool, self._loop)
+            self._open_lock = asyncio.Lock()
+            self._loop = loop
+            self._pool = None
+        async with self._open_lock:
+            if self._pool is None:
+                pool = AsyncConnectionPool(
+                    self.connection_string,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    check=AsyncConnectionPool.check_connection,
+                    open=False,
+                )
+                await pool.open()
+                self._pool = pool
+                logger.debug(f"Pool PostgreSQL asincrono aperto (min={self.min_size}, max={self.max_size})")
+        return self._pool
+
+    @staticmethod
+    def _release(pool: AsyncConnectionPool, loop: asyncio.AbstractEventLoop) -> None:
+        """Chiude il pool di un altro loop: le sue connessioni si possono chiudere solo da quel loop."""
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(pool.close(), loop)
+        else:
+            logger.warning("Pool asincrono di un event loop terminato: usare aclose prima di chiudere il loop")
+
+    async def aclose(self) -> None:
+        """Chiude il pool del loop corrente (allo shutdown o alla fine della modalità vocale)."""
+        if self._pool is not None and self._loop is asyncio.get_running_loop():
+            pool, self._pool = self._pool, None
+            await pool.close()
+            logger.debug("Pool PostgreSQL asincrono chiuso")
+
+    async def execute(self, sql: str, params: tuple = (), fetch: Optional[str] = None, dict_rows: bool = False) -> Any:
+        """Esegue una query in una transazione; `fetch` può essere None, "one" o "all"."""
+        with profiled("db"):
+            pool = await self._get_pool()
+            cursor_kwargs = {"row_factory": dict_row} if dict_rows else {}
+            async with pool.connection() as conn:
+                async with conn.cursor(**cursor_kwargs) as cursor:
+                    await cursor.execute(sql, params)
+                    if fetch == "one":
+                        return await cursor.fetchone()
+                    if fetch == "all":
+                        return await cursor.fetchall()
+                    return None
+
+    async def write(self, sql: str, params: tuple, key: Optional[tuple] = None, data: Any = None):
+        """Esegue una scrittura, o la accoda alla unit of work attiva."""
+        uow = current_unit_of_work()
+        if uow is not None:
+            uow.add(sql, params, key=key, data=data)
+            return
+        await self.execute(sql, params)
+
+    async def flush(self, uow: UnitOfWork):
+        """Esegue le scritture della unit of work in una transazione, in pipeline (un solo round-trip)."""
+        if not uow.statements:
+            return
+        with profiled("db"):
+            pool = await self._get_pool()
+            async with pool.connection() as conn:
+                async with conn.pipeline():
+                    async with conn.cursor() as cursor:
+                        for sql, params in uow.statements:
+                            await cursor.execute(sql, params)
+        logger.debug(f"Unit of work eseguita: {len(uow)} scritture in una transazione")
+        uow.committed()
+
+    async def put(self, namespace: str, key: str, data: dict, embedding: Optional[List[float]] = None):
+        await self.write(
+            UPSERT_SQL.format(cast=self.embedding_cast),
+            (namespace, key, json.dumps(data, default=json_default), format_embedding(embedding, self.vector_enabled)),
+            key=(namespace, key),
+            data=data,
+        )
+        logger.debug(f"Saved to long-term memory: {namespace}/{key}")
+
+    async def get(self, namespace: str, key: str) -> dict:
+        uow = current_unit_of_work()
+        if uow is not None and (namespace, key) in uow.pending:
+            return uow.pending[(namespace, key)]
+        result = await self.execute(GET_SQL, (namespace, key), fetch="one", dict_rows=True)
+        return result["data"] if result else {}
+
+    async def search_vector(self, namespace: str, embedding: List[float], limit: int = 5) -> List[Dict[str, Any]]:
+        if self.vector_enabled:
+            vector = format_embedding(embedding, self.vector_enabled)
+            rows = await self.execute(SEARCH_VECTOR_SQL, (vector, namespace, vector, limit), fetch="all", dict_rows=True)
+            if len(rows) < limit:
+                # Candidati dell'indice esauriti dal filtro sul namespace: ricerca esatta (vedi PersistentStore)
+                rows = await self.execute(SEARCH_VECTOR_EXACT_SQL, (vector, namespace, limit), fetch="all", dict_rows=True)
+            return rows
+        rows = await self.execute(SCAN_EMBEDDINGS_SQL, (namespace,), fetch="all", dict_rows=True)
+        return rank_by_embedding(rows, embedding, limit)
+
+    async def search(self, namespace: str, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        if self.fulltext_enabled:
+            return await self.execute(FULLTEXT_SEARCH_SQL, (FTS_LANGUAGE, query, namespace, limit), fetch="all", dict_rows=True)
+        return await self.execute(
+            "SELECT key, data FROM long_term_memory WHERE namespace = %s AND data::text ILIKE %s LIMIT %s;",
+            (namespace, f"%{query}%", limit), fetch="all", dict_rows=True,
+        )
+
+    async def save_thread(self, thread_id: str):
+        await self.write(INSERT_THREAD_SQL, (thread_id,))
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
@@ -3,6 +3,7 @@
 import simpleaudio as sa
 from backend.src.audio.audio_cache import AudioCache
 from backend.src.tts import generate_speech
+from backend.src.profiler import profiled
 import logging
 import os
 
@@ -15,7 +16,8 @@ class AudioHandler:
     def speak(self, text: str):
         """Riproduce l'audio del messaggio fornito."""
         try:
-            wav_file = generate_speech(text)
+            with profiled("tts"):  # Solo la sintesi: la riproduzione non è latenza di elaborazione
+                wav_file = generate_speech(text)
             if wav_file:
                 wave_obj = sa.WaveObject.from_wave_file(wav_file)
                 play_obj = wave_obj.play()
@@ -0,0 +1,267 @@
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from backend.src.config import (
+    CHECKPOINTER_BACKEND,
+    CHECKPOINT_SQLITE_PATH,
+    CHECKPOINT_KEEP_LAST,
+    CHECKPOINT_PRUNE_INTERVAL,
+    CHECKPOINT_COMPRESS_MIN_BYTES,
+    DATABASE_URL,
+)
+from backend.src.utils.blocking import run_blocking
+
+try:
+    import zstandard
+except ImportError:  # zstd opzionale: in sua assenza si usa zlib
+    zstandard = None
+
+logger = logging.getLogger("Checkpointer")
+
+# Tipi dello stato che msgpack può ricostruire dai checkpoint (deserializzazione msgpack restrittiva)
+MSGPACK_ALLOWLIST = [
+    ("backend.src.state.message", "Message"),
+    ("backend.src.state.digest_set", "DigestSet"),
+]
+
+# Potatura: tiene gli ultimi K checkpoint per (thread, namespace) e le scritture/blob che usano
+SQLITE_PRUNE_SQL = [
+    """
+    DELETE FROM checkpoints WHERE rowid IN (
+        SELECT rowid FROM (
+            SELECT rowid, ROW_NUMBER() OVER (
+                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+            ) AS rn FROM checkpoints
+        ) WHERE rn > ?
+    );
+    """,
+    """
+    DELETE FROM writes WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns
+          AND c.checkpoint_id = writes.checkpoint_id
+    );
+    """,
+]
+
+POSTGRES_PRUNE_SQL = [
+    """
+    DELETE FROM checkpoints c
+    USING (
+        SELECT thread_id, checkpoint_ns, checkpoint_id, ROW_NUMBER() OVER (
+            PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+        ) AS rn FROM checkpoints
+    ) ranked
+    WHERE c.thread_id = ranked.thread_id AND c.checkpoint_ns = ranked.checkpoint_ns
+      AND c.checkpoint_id = ranked.checkpoint_id AND ranked.rn > %s;
+    """,
+    """
+    DELETE FROM checkpoint_writes w WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = w.thread_id AND c.checkpoint_ns = w.checkpoint_ns
+          AND c.checkpoint_id = w.checkpoint_id
+    );
+    """,
+    """
+    DELETE FROM checkpoint_blobs b WHERE NOT EXISTS (
+        SELECT 1 FROM checkpoints c
+        WHERE c.thread_id = b.thread_id AND c.checkpoint_ns = b.checkpoint_ns
+          AND c.checkpoint -> 'channel_versions' ->> b.channel = b.version
+    );
+    """,
+]
+
+class CompressedSerializer:
+    """Serializer dei checkpoint: msgpack di JsonPlusSerializer compresso con zstd (o zlib).
+
+    I payload sotto `min_bytes` restano non compressi; il tipo registrato
+    indica l'algoritmo, quindi i checkpoint esistenti restano leggibili.
+    Solo i tipi in MSGPACK_ALLOWLIST (più quelli aggiunti dal grafo con
+    `with_msgpack_allowlist`) vengono ricostruiti dal msgpack.
+    """
+
+    def __init__(self, inner=None, min_bytes: int = CHECKPOINT_COMPRESS_MIN_BYTES, level: int = 3):
+        self.inner = inner or JsonPlusSerializer(allowed_msgpack_modules=MSGPACK_ALLOWLIST)
+        self.min_bytes = min_bytes
+        self.level = level
+        if zstandard is not None:
+            self._compressor = zstandard.ZstdCompressor(level=level)
+            self._decompressor = zstandard.ZstdDecompressor()
+
+    def with_msgpack_allowlist(self, extra_allowlist) -> "CompressedSerializer":
+        """Stesso serializer con i tipi dello schema del grafo aggiunti all'allowlist del serializer interno."""
+        return CompressedSerializer(self.inner.with_msgpack_allowlist(extra_allowlist), self.min_bytes, self.level)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.inner.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.inner.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_bytes:
+            return type_, data
+        if zstandard is not None:
+            return f"{type_}+zstd", self._compressor.compress(data)
+        return f"{type_}+zlib", zlib.compress(data, self.level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith("+zstd"):
+            return self.inner.loads_typed((type_[:-5], self._decompressor.decompress(payload)))
+        if type_.endswith("+zlib"):
+            return self.inner.loads_typed((type_[:-5], zlib.decompress(payload)))
+        return self.inner.loads_typed(data)
+
+class ThreadedCheckpointSaver(BaseCheckpointSaver):
+    """Espone un checkpointer sincrono (SQLite/Postgres) al grafo asincrono.
+
+    I metodi async eseguono quelli sincroni nel pool limitato: il saver non è
+    legato a un event loop.
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver):
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    @property
+    def config_specs(self):
+        return self.saver.config_specs
+
+    def get_tuple(self, *args, **kwargs):
+        return self.saver.get_tuple(*args, **kwargs)
+
+    def list(self, *args, **kwargs):
+        return self.saver.list(*args, **kwargs)
+
+    def put(self, *args, **kwargs):
+        return self.saver.put(*args, **kwargs)
+
+    def put_writes(self, *args, **kwargs):
+        return self.saver.put_writes(*args, **kwargs)
+
+    def get_next_version(self, *args, **kwargs):
+        return self.saver.get_next_version(*args, **kwargs)
+
+    async def aget_tuple(self, *args, **kwargs):
+        return await run_blocking(self.saver.get_tuple, *args, **kwargs)
+
+    async def alist(self, *args, **kwargs) -> AsyncIterator[Any]:
+        items = await run_blocking(lambda: list(self.saver.list(*args, **kwargs)))
+        for item in items:
+            yield item
+
+    async def aput(self, *args, **kwargs):
+        return await run_blocking(self.saver.put, *args, **kwargs)
+
+    async def aput_writes(self, *args, **kwargs):
+        return await run_blocking(self.saver.put_writes, *args, **kwargs)
+
+class CheckpointPruner:
+    """Thread in background che elimina periodicamente i checkpoint oltre gli ultimi K."""
+
+    def __init__(self, prune: Callable[[int], int], keep_last: int = CHECKPOINT_KEEP_LAST, interval: float = CHECKPOINT_PRUNE_INTERVAL):
+        self._prune = prune
+        self.keep_last = keep_last
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics = {"runs": 0, "deleted": 0, "failures": 0, "last_latency_s": 0.0}
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="checkpoint-pruner", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.prune()
+
+    def prune(self) -> int:
+        start = time.perf_counter()
+        try:
+            deleted = self._prune(self.keep_last)
+        except Exception as e:
+            self._metrics["failures"] += 1
+            logger.error(f"Potatura dei checkpoint fallita: {e}")
+            return 0
+        self._metrics["runs"] += 1
+        self._metrics["deleted"] += deleted
+        self._metrics["last_latency_s"] = time.perf_counter() - start
+        if deleted:
+            logger.debug(f"Eliminate {deleted} righe di checkpoint (ultimi {self.keep_last} per thread)")
+        return deleted
+
+    def stop(self):
+        self._stop.set()
+
+    def metrics(self) -> Dict[str, Any]:
+        return dict(self._metrics)
+
+def _sqlite_saver(path: str):
+    import sqlite3
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    saver = SqliteSaver(conn, serde=CompressedSerializer())
+    saver.setup()
+
+    def prune(keep_last: int) -> int:
+        with saver.lock:
+            deleted = 0
+            for sql in SQLITE_PRUNE_SQL:
+                cursor = conn.execute(sql, (keep_last,) if "?" in sql else ())
+                deleted += cursor.rowcount
+            conn.commit()
+        return deleted
+
+    return saver, prune
+
+def _postgres_saver(dsn: str):
+    from langgraph.checkpoint.postgres import PostgresSaver
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool
+
+    pool = ConnectionPool(dsn, kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}, open=True)
+    saver = PostgresSaver(pool, serde=CompressedSerializer())
+    saver.setup()
+
+    def prune(keep_last: int) -> int:
+        deleted = 0
+        with pool.connection() as conn:
+            for sql in POSTGRES_PRUNE_SQL:
+                cursor = conn.execute(sql, (keep_last,) if "%s" in sql else ())
+                deleted += cursor.rowcount
+        return deleted
+
+    return saver, prune
+
+def create_checkpointer(backend: str = CHECKPOINTER_BACKEND) -> Tuple[BaseCheckpointSaver, Optional[CheckpointPruner]]:
+    """Checkpointer del grafo e relativo pruner (None per il backend in memoria).
+
+    `backend` è "sqlite" (singolo nodo), "postgres" (deployment condivisi)
+    o "memory" (MemorySaver, non persistente e senza limiti).
+    """
+    if backend == "memory":
+        return MemorySaver(serde=JsonPlusSerializer(allowed_msgpack_modules=MSGPACK_ALLOWLIST)), None
+    if backend == "sqlite":
+        saver, prune = _sqlite_saver(CHECKPOINT_SQLITE_PATH)
+    elif backend == "postgres":
+        saver, prune = _postgres_saver(DATABASE_URL)
+    else:
+        raise ValueError(f"Backend di checkpoint non supportato: {backend}")
+
+    pruner = CheckpointPruner(prune)
+    pruner.start()
+    logger.info(f"Checkpointer {backend} pronto (ultimi {pruner.keep_last} checkpoint per thread)")
+    return ThreadedCheckpointSaver(saver), pruner
@@ -3,12 +3,17 @@ from backend.src.state.state_manager import StateManager
 from backend.src.state.state_schema import StateSchema
 from backend.src.memory_store import MemoryStore
 from backend.src.langgraph_setup import initialize_graph, set_graph
+from backend.src.tools.model_registry import model_registry
+from backend.src.config import EMBEDDING_WARMUP, WRITE_BEHIND_ENABLED
+from backend.src.write_behind import WriteBehindPersister
+from backend.src.session_manager import SessionManager
 
 logger = logging.getLogger("CoreComponents")
 
 class CoreComponents:
     _instance = None
     _memory_store = None
+    _write_behind = None
 
     @classmethod
     def get_instance(cls):
@@ -25,8 +30,21 @@ class CoreComponents:
             logger.info("MemoryStore initialized")
         return cls._memory_store
 
+    @classmethod
+    def get_write_behind(cls):
+        """Get the singleton WriteBehindPersister (None se disabilitato)"""
+        if cls._write_behind is None and WRITE_BEHIND_ENABLED:
+            cls._write_behind = WriteBehindPersister(cls.get_memory_store())
+            cls._write_behind.start()
+            logger.info("WriteBehindPersister initialized")
+        return cls._write_behind
+
     def init_components(self):
         """Initialize all components using the singleton MemoryStore"""
+        # Carica il modello di embedding in parallelo all'inizializzazione del DB e del grafo
+        if EMBEDDING_WARMUP:
+            model_registry.warm_up(background=True)
+
         self.memory_store = self.get_memory_store()
         self.state_manager = StateManager(self.memory_store)
         self.state_manager.set_state_schema(StateSchema)
@@ -38,7 +56,11 @@ class CoreComponents:
         
         # Initialize VoiceAssistant with state_manager
         from backend.src.voice_assistant import VoiceAssistant
-        self.assistant = VoiceAssistant(self.state_manager)
+        self.write_behind = self.get_write_behind()
+        self.assistant = VoiceAssistant(self.state_manager, write_behind=self.write_behind)
         logger.info("VoiceAssistant initialized")
+
+        # Sessioni indipendenti per l'API: ogni client ha il proprio session_id
+        self.session_manager = SessionManager(self.memory_store, write_behind=self.write_behind)
         
         logger.info("Core components initialized")
\ No newline at end of file
@@ -0,0 +1,133 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import psycopg2
+from psycopg2 import pool as pg_pool
+from backend.src.profiler import profiled
+
+logger = logging.getLogger("DBPool")
+
+# Errori che indicano una connessione non più utilizzabile
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+class ConnectionPool:
+    """Pool di connessioni psycopg2 thread-safe con health check e riconnessione.
+
+    `connection()` presta una connessione per un'unica transazione: commit
+    all'uscita, rollback in caso di errore. Le connessioni chiuse o che non
+    rispondono vengono scartate e sostituite con connessioni nuove.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, health_check_interval: float = 30.0, acquire_timeout: float = 10.0):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._pool = pg_pool.ThreadedConnectionPool(min_size, max_size, dsn)
+        # ThreadedConnectionPool solleva PoolError quando è esaurito: il semaforo fa attendere invece
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._last_used: Dict[int, float] = {}
+        logger.debug(f"Pool PostgreSQL creato (min={min_size}, max={max_size})")
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - self._last_used.get(id(conn), 0.0) < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except CONNECTION_ERRORS:
+            return False
+
+    def _acquire(self):
+        conn = self._pool.getconn()
+        if not self._is_healthy(conn):
+            logger.warning("Connessione PostgreSQL non valida, riconnessione in corso")
+            self._discard(conn)
+            conn = self._pool.getconn()
+        return conn
+
+    def _discard(self, conn):
+        self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Presta una connessione per una transazione."""
+        with profiled("db"):  # Attesa del pool compresa
+            if not self._slots.acquire(timeout=self.acquire_timeout):
+                raise pg_pool.PoolError(f"Nessuna connessione disponibile entro {self.acquire_timeout}s")
+            conn = None
+            broken = False
+            try:
+                conn = self._acquire()
+                yield conn
+                conn.commit()
+            except CONNECTION_ERRORS:
+                broken = True
+                raise
+            except Exception:
+                if conn is not None and not conn.closed:
+                    conn.rollback()
+                raise
+            finally:
+                if conn is not None:
+                    if broken or conn.closed:
+                        self._discard(conn)
+                    else:
+                        self._last_used[id(conn)] = time.monotonic()
+                        self._pool.putconn(conn)
+                self._slots.release()
+
+    def close(self):
+        self._pool.closeall()
+        self._last_used.clear()
+
+class UnitOfWork:
+    """Scritture accumulate durante un turno ed eseguite in un'unica transazione."""
+
+    def __init__(self):
+        self.statements: List[Tuple[str, tuple]] = []
+        self.pending: Dict[Tuple[str, str], Any] = {}
+        self.on_commit: List[Callable[[], None]] = []
+
+    def add(self, sql: str, params: tuple, key: Optional[Tuple[str, str]] = None, data: Any = None):
+        self.statements.append((sql, params))
+        if key is not None:
+            self.pending[key] = data
+
+    def after_commit(self, callback: Callable[[], None]):
+        """Registra un'azione da eseguire solo dopo il commit (es. invalidare una cache)."""
+        self.on_commit.append(callback)
+
+    def committed(self):
+        """Chiamato dal flush dopo il commit: svuota la unit of work ed esegue le azioni registrate."""
+        callbacks = self.on_commit
+        self.statements.clear()
+        self.pending.clear()
+        self.on_commit = []
+        for callback in callbacks:
+            callback()
+
+    def __len__(self) -> int:
+        return len(self.statements)
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    """Unit of work attiva nel contesto corrente (anche nei task figli di asyncio)."""
+    return _current_unit_of_work.get()
+
+@contextmanager
+def bind_unit_of_work(uow: UnitOfWork) -> Iterator[UnitOfWork]:
+    token = _current_unit_of_work.set(uow)
+    try:
+        yield uow
+    finally:
+        _current_unit_of_work.reset(token)
@@ -2,11 +2,15 @@ from langgraph.store.memory import InMemoryStore  # Removed DBStore and LongTerm
 # from langgraph.store.db_store import DBStore, LongTermStore  # Removed as DBStore does not exist
 from langgraph.graph import StateGraph, START, END
 from backend.src.state.state_schema import StateSchema  # Assicurati che importi il StateSchema corretto
+import inspect
 import logging
-from langgraph.checkpoint.memory import MemorySaver
+from backend.src.checkpointer import create_checkpointer
+from backend.src.state.message import Message
+from backend.src.profiler import profiler
+from backend.src.utils.blocking import run_blocking
 from langgraph.types import Command
 from typing import Literal, Dict, Any, AsyncIterator, Union  # Add type hints
-from backend.src.tools.embedding import model  # Import the model from embedding.py
+from backend.src.tools.embedding import embedding_cache  # Embedding condivisi tramite il model registry
 import psycopg2  # Import psycopg2 for PostgreSQL interaction
 from psycopg2.extras import RealDictCursor  # Optional: For dictionary-like cursor
 import json  # Import json for data serialization
@@ -16,9 +20,13 @@ import json  # Import json for data serialization
 
 logger = logging.getLogger("LangGraphSetup")
 
+# Nodi le cui risposte LLM vengono inoltrate token per token ai client in streaming:
+# il risultato della ricerca passa dal greeting, che genera la risposta finale
+STREAMING_NODES = frozenset({"greeting"})
+
 # Define the embed function if not already defined
 def embed(texts: list[str]) -> list[list[float]]:
-    return model.encode(texts).tolist()
+    return embedding_cache.encode(texts).tolist()
 
 # Rimuovi l'inizializzazione non necessaria di InMemoryStore se non utilizzata
 # store = InMemoryStore(index={"embed": embed, "dims": 2})  # Rimosso
@@ -41,7 +49,8 @@ def initialize_graph(memory_store):  # Type hint removed to avoid import
     builder = StateGraph(state_schema=StateSchema)
 
     # Convert AsyncIterator to dict and ensure synchronous execution
-    def wrap_node(func):
+    # Ogni esecuzione di un nodo è uno span del turno corrente (tempo, CPU, allocazioni)
+    def wrap_node(func, name: str):
         async def wrapped(state: Union[Dict, AsyncIterator[Dict[str, Any]]], **kwargs):
             try:
                 # Handle both dict and AsyncIterator inputs
@@ -54,9 +63,12 @@ def initialize_graph(memory_store):  # Type hint removed to avoid import
                         state_list.append(item)
                     state_dict = {k: v for d in state_list for k, v in d.items()}
                 
-                # Execute the node function
-                result = func(state_dict)
-                return result
+                # Execute the node function: i nodi sono coroutine, quelli sincroni
+                # girano nel pool limitato per non bloccare l'event loop
+                with profiler.node(name, state_dict.get("thread_id", "")):
+                    if inspect.iscoroutinefunction(func):
+                        return await func(state_dict)
+                    return await run_blocking(func, state_dict)
 
             except Exception as e:
                 logger.error(f"Error in node wrapper: {e}")
@@ -71,35 +83,31 @@ def initialize_graph(memory_store):  # Type hint removed to avoid import
     memory_node = create_memory_node(memory_store)
 
     # Add nodes
-    builder.add_node("supervisor", wrap_node(supervisor_node))
-    builder.add_node("researcher", wrap_node(researcher_node))
-    builder.add_node("greeting", wrap_node(greeting_node))
-    builder.add_node("manage_memory", wrap_node(memory_node))
+    builder.add_node("supervisor", wrap_node(supervisor_node, "supervisor"))
+    builder.add_node("researcher", wrap_node(researcher_node, "researcher"))
+    builder.add_node("greeting", wrap_node(greeting_node, "greeting"))
+    builder.add_node("manage_memory", wrap_node(memory_node, "manage_memory"))
 
     # Add a fallback node to handle cases where no assistant message is generated
     def fallback_node(state: dict) -> Command[Literal["__end__"]]:
-        fallback_message = {"role": "assistant", "content": "Mi dispiace, non sono sicuro di aver capito. Puoi ripetere?"}
+        fallback_message = Message("assistant", "Mi dispiace, non sono sicuro di aver capito. Puoi ripetere?")
         return Command(
             goto=END,
             update={
-                "agent_messages": state.get("agent_messages", []) + [fallback_message],  # Assicurati di aggiungere solo un messaggio
+                "agent_messages": [fallback_message],  # Solo il messaggio nuovo: il reducer lo aggiunge al log
             },
         )
     
     builder.add_node("fallback", fallback_node)
 
-    # Define edges including memory transitions
+    # Il supervisor gira una sola volta per turno: i nodi instradano con Command
+    # supervisor -> researcher -> greeting -> manage_memory (o direttamente greeting / manage_memory)
     builder.add_edge(START, "supervisor")
-    builder.add_conditional_edges(
-        source="supervisor",
-        path=lambda state: "greeting" if state.get("last_agent") in {"researcher", "greeting"} else "researcher"
-    )
     builder.add_edge("manage_memory", END)
-    builder.add_edge("researcher", "manage_memory")
-    builder.add_edge("greeting", "manage_memory")
 
-    # Add checkpointer
-    checkpointer = MemorySaver()
+    # Checkpointer persistente con potatura in background (CHECKPOINTER_BACKEND)
+    global checkpoint_pruner
+    checkpointer, checkpoint_pruner = create_checkpointer()
     compiled_graph = builder.compile(checkpointer=checkpointer)
 
     # Debug logging
@@ -111,6 +119,7 @@ def initialize_graph(memory_store):  # Type hint removed to avoid import
 
 # Initialize graph variable
 graph = None
+checkpoint_pruner = None  # CheckpointPruner del checkpointer attivo (None con MemorySaver)
 
 def get_graph():
     """Get the initialized graph instance"""
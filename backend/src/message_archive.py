@@ -0,0 +1,48 @@
+import logging
+from typing import Any, Dict, List, Tuple
+from backend.src.config import MIN_SIMILARITY
+
+logger = logging.getLogger("MessageArchive")
+
+class MessageArchive:
+    """Archivio dei messaggi usciti dalla finestra della conversazione.
+
+    Ogni messaggio è un record di long_term_memory con embedding, nel
+    namespace `message_archive/<thread_id>`: resta cercabile con la ricerca
+    semantica (pgvector) senza occupare memoria nel processo.
+    """
+
+    def __init__(self, memory_store):
+        self.memory_store = memory_store
+
+    @staticmethod
+    def namespace(thread_id: str) -> str:
+        return f"message_archive/{thread_id}"
+
+    def records(self, thread_id: str, kind: str, offset: int, messages: List[Dict[str, Any]]) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Record (namespace, key, data) per i messaggi a partire dalla posizione assoluta `offset`."""
+        namespace = self.namespace(thread_id)
+        return [
+            (namespace, f"{kind}/{offset + position:08d}", dict(message))
+            for position, message in enumerate(messages)
+        ]
+
+    async def aarchive(self, thread_id: str, kind: str, offset: int, messages: List[Dict[str, Any]], write_behind=None) -> int:
+        """Salva i messaggi in archivio (in background se è disponibile il write-behind)."""
+        records = self.records(thread_id, kind, offset, messages)
+        for namespace, key, data in records:
+            if write_behind is not None:
+                write_behind.submit(namespace, key, data)
+            else:
+                await self.memory_store.asave_to_long_term_memory(namespace, key, data)
+        logger.debug(f"Archiviati {len(records)} messaggi {kind} di {thread_id}")
+        return len(records)
+
+    async def asearch(self, thread_id: str, query: str, limit: int = 3, min_similarity: float = MIN_SIMILARITY) -> List[Tuple[Dict[str, Any], float]]:
+        """Messaggi archiviati più simili alla query, come coppie (messaggio, similarità)."""
+        rows = await self.memory_store.asearch_long_term_memory(self.namespace(thread_id), query, limit=limit)
+        return [
+            (row["data"], float(row["similarity"]))
+            for row in rows
+            if row.get("similarity") is not None and row["similarity"] >= min_similarity
+        ]
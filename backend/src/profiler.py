@@ -0,0 +1,266 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+from backend.src.config import TRACE_ENABLED, TRACE_BUFFER_SIZE, TRACE_ALLOCATIONS, TRACE_EXPORT_PATH
+
+logger = logging.getLogger("Profiler")
+
+# Categorie a cui viene attribuito il tempo all'interno dei nodi
+CATEGORIES = ("llm", "embedding", "db", "tts")
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """Intervallo misurato di un turno o di un nodo del grafo.
+
+    Registra tempo reale, tempo CPU e (con TRACE_ALLOCATIONS) la memoria
+    allocata al netto. Il tempo CPU e le allocazioni sono del processo:
+    con più turni concorrenti includono anche il lavoro degli altri.
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent", "parent_id", "thread_id", "attributes",
+                 "categories", "children", "start_ns", "end_ns", "wall_ms", "cpu_ms", "alloc_kb",
+                 "_wall_start", "_cpu_start", "_alloc_start")
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, thread_id: str = "", **attributes: Any):
+        self.name = name
+        self.parent = parent
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.thread_id = thread_id or (parent.thread_id if parent is not None else "")
+        self.attributes = attributes
+        self.categories: Dict[str, float] = {}  # ms per categoria
+        self.children: List["Span"] = []
+        self.end_ns = 0
+        self.wall_ms = self.cpu_ms = 0.0
+        self.alloc_kb: Optional[float] = None
+        self._alloc_start = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        self._cpu_start = time.process_time()
+        self._wall_start = time.perf_counter()
+        self.start_ns = time.time_ns()
+
+    def add_time(self, category: str, seconds: float) -> None:
+        self.categories[category] = self.categories.get(category, 0.0) + seconds * 1e3
+
+    def finish(self) -> None:
+        self.wall_ms = (time.perf_counter() - self._wall_start) * 1e3
+        self.cpu_ms = (time.process_time() - self._cpu_start) * 1e3
+        self.end_ns = time.time_ns()
+        if self._alloc_start is not None and tracemalloc.is_tracing():
+            self.alloc_kb = (tracemalloc.get_traced_memory()[0] - self._alloc_start) / 1024
+        parent, self.parent = self.parent, None  # Niente riferimenti circolari nel ring buffer
+        if parent is not None:
+            parent.children.append(self)
+            for category, ms in self.categories.items():
+                parent.categories[category] = parent.categories.get(category, 0.0) + ms
+
+    def node_calls(self) -> Dict[str, int]:
+        """Esecuzioni di ogni nodo del grafo nel turno (es. il supervisor va eseguito una sola volta)."""
+        return dict(Counter(child.attributes["node"] for child in self.children if "node" in child.attributes))
+
+    def to_dict(self) -> Dict[str, Any]:
+        attributed = sum(self.categories.values())
+        data = {
+            "name": self.name,
+            "span_id": self.span_id,
+            "wall_ms": round(self.wall_ms, 2),
+            "cpu_ms": round(self.cpu_ms, 2),
+            "alloc_kb": round(self.alloc_kb, 1) if self.alloc_kb is not None else None,
+            "time_ms": {category: round(ms, 2) for category, ms in self.categories.items()},
+            "other_ms": round(max(self.wall_ms - attributed, 0.0), 2),  # Tempo non attribuito a una categoria
+            **self.attributes,
+        }
+        if self.parent_id is None:
+            data.update(trace_id=self.trace_id, thread_id=self.thread_id, start=self.start_ns / 1e9)
+            data["node_calls"] = self.node_calls()
+        if self.children:
+            data["children"] = [child.to_dict() for child in self.children]
+        return data
+
+class profiled:
+    """Attribuisce il tempo del blocco a una categoria dello span corrente (no-op fuori da un turno)."""
+
+    __slots__ = ("category", "_span", "_start")
+
+    def __init__(self, category: str):
+        self.category = category
+
+    def __enter__(self) -> "profiled":
+        self._span = _current_span.get()
+        if self._span is not None:
+            self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        if self._span is not None:
+            self._span.add_time(self.category, time.perf_counter() - self._start)
+        return False
+
+class _SpanScope:
+    """Rende `span` lo span corrente del contesto (task asyncio) per la durata del blocco."""
+
+    __slots__ = ("profiler", "span", "_token")
+
+    def __init__(self, profiler: "GraphProfiler", span: Span):
+        self.profiler = profiler
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.span.attributes["error"] = exc_type.__name__
+        is_root = self.span.parent is None
+        self.span.finish()
+        if is_root:
+            self.profiler._record(self.span)
+        return False
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_spans(span: Span) -> List[Dict[str, Any]]:
+    """Span e figli nel formato OTLP/JSON."""
+    attributes = {"thread.id": span.thread_id, "cpu_ms": span.cpu_ms, **span.attributes}
+    if span.alloc_kb is not None:
+        attributes["alloc_kb"] = span.alloc_kb
+    for category, ms in span.categories.items():
+        attributes[f"time.{category}_ms"] = ms
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()],
+    }
+    if span.parent_id is not None:
+        encoded["parentSpanId"] = span.parent_id
+    spans = [encoded]
+    for child in span.children:
+        spans.extend(otlp_spans(child))
+    return spans
+
+class SpanExporter:
+    """Esporta i turni in un file JSON lines OTLP (leggibile dal receiver `otlpjsonfile` del Collector).
+
+    La scrittura avviene in un thread in background: il turno non attende il disco.
+    """
+
+    def __init__(self, path: str, service_name: str = "aiassistant"):
+        self.path = path
+        self.service_name = service_name
+        self._queue: "queue.SimpleQueue[Optional[Span]]" = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, span: Span) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="trace-export", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.stop)
+        self._queue.put(span)
+
+    def encode(self, span: Span) -> Dict[str, Any]:
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+            "scopeSpans": [{"scope": {"name": "backend.src.profiler"}, "spans": otlp_spans(span)}],
+        }]}
+
+    def _run(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    break
+                try:
+                    file.write(json.dumps(self.encode(span), default=str) + "\n")
+                except Exception as e:
+                    logger.error(f"Errore nell'esportazione della traccia {span.trace_id}: {e}")
+                if self._queue.empty():
+                    file.flush()
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+class GraphProfiler:
+    """Tracce per turno del grafo: uno span per turno con uno span figlio per nodo.
+
+    Gli ultimi `buffer_size` turni restano in un ring buffer in memoria
+    (`traces`); con `export_path` vengono anche esportati in formato OTLP.
+    """
+
+    def __init__(self, enabled: bool = TRACE_ENABLED, buffer_size: int = TRACE_BUFFER_SIZE,
+                 trace_allocations: bool = TRACE_ALLOCATIONS, export_path: str = TRACE_EXPORT_PATH):
+        self.enabled = enabled
+        self._traces: "deque[Span]" = deque(maxlen=buffer_size)
+        self._lock = threading.Lock()
+        self._exporter = SpanExporter(export_path) if enabled and export_path else None
+        if enabled and trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def turn(self, thread_id: str, **attributes: Any):
+        """Span radice di un turno (da usare con `with`)."""
+        if not self.enabled:
+            return nullcontext()
+        return _SpanScope(self, Span("turn", None, thread_id, **attributes))
+
+    def node(self, name: str, thread_id: str = ""):
+        """Span di un nodo, figlio del turno corrente (o radice se il grafo è invocato direttamente)."""
+        if not self.enabled:
+            return nullcontext()
+        return _SpanScope(self, Span(f"node.{name}", _current_span.get(), thread_id, node=name))
+
+    def annotate(self, **attributes: Any) -> None:
+        """Aggiunge attributi allo span corrente (es. il time-to-first-token del turno)."""
+        span = _current_span.get()
+        if span is not None:
+            span.attributes.update(attributes)
+
+    def _record(self, span: Span) -> None:
+        with self._lock:
+            self._traces.append(span)
+        if self._exporter is not None:
+            self._exporter.submit(span)
+
+    def traces(self, thread_id: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Turni nel ring buffer, dal più vecchio, eventualmente filtrati per thread."""
+        with self._lock:
+            spans = [span for span in self._traces if thread_id is None or span.thread_id == thread_id]
+        if limit:
+            spans = spans[-limit:]
+        return [span.to_dict() for span in spans]
+
+    def stop(self) -> None:
+        if self._exporter is not None:
+            self._exporter.stop()
+
+# Profiler condiviso da grafo, assistente e API
+profiler = GraphProfiler()
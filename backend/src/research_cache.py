@@ -0,0 +1,120 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+from backend.src.config import (
+    RESEARCH_CACHE_ENABLED,
+    RESEARCH_CACHE_TTL,
+    RESEARCH_CACHE_VOLATILE_TTL,
+    RESEARCH_CACHE_MIN_SIMILARITY,
+)
+from backend.src.utils.blocking import run_blocking
+
+logger = logging.getLogger("ResearchCache")
+
+RESEARCH_NAMESPACE = "research_results"
+
+# Domande il cui risultato invecchia in fretta: scadenza breve (RESEARCH_CACHE_VOLATILE_TTL)
+VOLATILE_PATTERN = re.compile(
+    r"\b(oggi|ieri|domani|adesso|ora|attual\w*|ultim[aei]|recent\w*|notizie|meteo|prezz\w*|quotazion\w*|"
+    r"today|now|latest|current|news|weather|price)\b",
+    re.IGNORECASE,
+)
+
+def normalize_query(query: str) -> str:
+    """Chiave esatta della cache: minuscole, spazi compattati, senza punteggiatura finale."""
+    return re.sub(r"\s+", " ", query.strip().lower()).strip(" ?!.,;:")
+
+class ResearchCache:
+    """Cache semantica dei risultati di perform_research nel namespace `research_results`.
+
+    Prima cerca la query normalizzata come chiave esatta (con la read-through
+    cache del MemoryStore), poi la query più simile per embedding sopra
+    `min_similarity`. I risultati più vecchi della loro scadenza non vengono
+    riusati. Ogni record è indicizzato con l'embedding della sola query.
+    """
+
+    def __init__(self, memory_store, enabled: bool = RESEARCH_CACHE_ENABLED, ttl: float = RESEARCH_CACHE_TTL,
+                 volatile_ttl: float = RESEARCH_CACHE_VOLATILE_TTL, min_similarity: float = RESEARCH_CACHE_MIN_SIMILARITY):
+        self.memory_store = memory_store
+        self.enabled = enabled
+        self.ttl = ttl
+        self.volatile_ttl = volatile_ttl
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._metrics = {
+            "lookups": 0,
+            "exact_hits": 0,
+            "semantic_hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "lookup_s": 0.0,
+            "saved_s": 0.0,  # Durata delle chiamate LLM evitate
+        }
+
+    def ttl_for(self, query: str) -> float:
+        return self.volatile_ttl if VOLATILE_PATTERN.search(query) else self.ttl
+
+    def _fresh(self, data: Dict[str, Any]) -> bool:
+        # I record salvati prima della cache non hanno query e data: non riusabili
+        if not data.get("result") or "created_at" not in data or "query" not in data:
+            return False
+        return time.time() - data["created_at"] <= self.ttl_for(data["query"])
+
+    async def aget(self, query: str) -> Optional[Dict[str, Any]]:
+        """Risultato in cache per la query (con `match` e `similarity`), o None."""
+        if not self.enabled:
+            return None
+        start = time.perf_counter()
+        hit, kind = None, "misses"
+        stale = False
+        try:
+            data = await self.memory_store.aretrieve_from_long_term_memory(RESEARCH_NAMESPACE, normalize_query(query))
+            if data and self._fresh(data):
+                hit, kind = {**data, "match": "exact", "similarity": 1.0}, "exact_hits"
+            else:
+                stale = bool(data)
+                rows = await self.memory_store.asearch_long_term_memory(RESEARCH_NAMESPACE, query, limit=3)
+                for row in rows:
+                    similarity = row.get("similarity")
+                    if similarity is None or similarity < self.min_similarity:
+                        continue
+                    if self._fresh(row["data"]):
+                        hit, kind = {**row["data"], "match": "semantic", "similarity": float(similarity)}, "semantic_hits"
+                        break
+                    stale = True
+        except Exception as e:
+            logger.error(f"Errore nella ricerca nella cache dei risultati: {e}")
+
+        with self._lock:
+            self._metrics["lookups"] += 1
+            self._metrics[kind] += 1
+            self._metrics["stale"] += stale and hit is None
+            self._metrics["lookup_s"] += time.perf_counter() - start
+            if hit is not None:
+                self._metrics["saved_s"] += hit.get("latency_s", 0.0)
+        if hit is not None:
+            logger.debug(f"Risultato di ricerca in cache ({hit['match']}, similarità {hit['similarity']:.3f}) per: {query}")
+        return hit
+
+    async def aput(self, query: str, result: str, latency_s: float) -> None:
+        """Salva il risultato con l'embedding della query, per i lookup semantici successivi."""
+        if not self.enabled:
+            return
+        data = {"query": query, "result": result, "created_at": time.time(), "latency_s": round(latency_s, 3)}
+        embedding = await run_blocking(self.memory_store.long_term_store.embed_query, query)
+        await self.memory_store.asave_to_long_term_memory(RESEARCH_NAMESPACE, normalize_query(query), data, embedding=embedding)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        lookups = metrics["lookups"]
+        hits = metrics["exact_hits"] + metrics["semantic_hits"]
+        return {
+            **metrics,
+            "lookup_s": round(metrics["lookup_s"], 3),
+            "saved_s": round(metrics["saved_s"], 3),
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "avg_lookup_ms": round(metrics["lookup_s"] / lookups * 1e3, 2) if lookups else None,
+        }
@@ -0,0 +1,179 @@
+"""
+Log di sessione append-only: una riga per turno con solo le differenze di stato.
+
+Usage (migrazione dei vecchi session_logs):
+    python -m backend.src.session_log --migrate [--delete]
+"""
+
+import argparse
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from backend.src.state.message import json_default
+from backend.src.state.digest_set import DigestSet
+from backend.src.state.message_log import MessageLog
+
+logger = logging.getLogger("SessionLog")
+
+CREATE_TURNS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS session_turns (
+        id BIGSERIAL PRIMARY KEY,
+        thread_id VARCHAR(255) NOT NULL,
+        turn INTEGER NOT NULL,
+        delta JSONB NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (thread_id, turn)
+    );
+"""
+
+APPEND_TURN_SQL = """
+    INSERT INTO session_turns (thread_id, turn, delta)
+    VALUES (%s, %s, %s)
+    ON CONFLICT (thread_id, turn) DO NOTHING;
+"""
+
+LOAD_TURNS_SQL = """
+    SELECT turn, delta FROM session_turns
+    WHERE thread_id = %s
+    ORDER BY turn;
+"""
+
+LAST_TURN_SQL = """
+    SELECT COALESCE(MAX(turn), -1) FROM session_turns WHERE thread_id = %s;
+"""
+
+# Cursore per chiave: (lunghezza, ultimo elemento) per le liste, ultimo digest per i
+# DigestSet, valore per il resto
+Cursor = Dict[str, Any]
+
+def offset_key(key: str) -> str:
+    """Chiave del delta con la posizione assoluta del primo messaggio di un MessageLog."""
+    return f"{key}_offset"
+
+def build_delta(cursor: Optional[Cursor], state: Dict[str, Any]) -> Tuple[Dict[str, Any], Cursor]:
+    """Calcola le differenze tra lo stato già registrato (`cursor`) e lo stato attuale.
+
+    Le liste che crescono in coda vengono registrate come `append` con i soli
+    elementi nuovi; qualsiasi altra modifica come `set` del valore intero.
+    Per i DigestSet si registrano i digest aggiunti dopo l'ultimo noto: quelli
+    rimossi dal limite vengono scartati di nuovo al ripristino. L'`offset` di
+    un MessageLog (la finestra dopo l'archiviazione) è registrato come
+    `<chiave>_offset` quando cambia.
+    """
+    cursor = cursor or {}
+    appends: Dict[str, List[Any]] = {}
+    sets: Dict[str, Any] = {}
+    new_cursor: Cursor = {}
+
+    for key, value in state.items():
+        previous = cursor.get(key)
+        if isinstance(value, MessageLog):
+            new_cursor[offset_key(key)] = value.offset
+            if value.offset != cursor.get(offset_key(key), 0):
+                sets[offset_key(key)] = value.offset
+        if isinstance(value, DigestSet):
+            new_cursor[key] = ("digest", value.last())
+            if isinstance(previous, tuple) and previous[0] == "digest":
+                added = value.since(previous[1])
+                if added is not None:
+                    if added:
+                        appends[key] = added
+                    continue
+            if value or previous is not None:
+                sets[key] = list(value)
+        elif isinstance(value, list):
+            new_cursor[key] = (len(value), value[-1] if value else None)
+            if isinstance(previous, tuple) and isinstance(previous[0], int):
+                prev_len, prev_last = previous
+                if len(value) >= prev_len and (prev_len == 0 or value[prev_len - 1] == prev_last):
+                    if len(value) > prev_len:
+                        appends[key] = list(value[prev_len:])
+                    continue
+            if value or previous is not None:
+                sets[key] = list(value)
+        else:
+            new_cursor[key] = value
+            if key not in cursor or previous != value:
+                sets[key] = value
+
+    delta: Dict[str, Any] = {}
+    if appends:
+        delta["append"] = appends
+    if sets:
+        delta["set"] = sets
+    return delta, new_cursor
+
+def apply_delta(state: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """Applica un delta allo stato (in place) e lo restituisce."""
+    for key, value in delta.get("set", {}).items():
+        state[key] = value
+    for key, items in delta.get("append", {}).items():
+        state.setdefault(key, [])
+        state[key].extend(items)
+    return state
+
+def fold_deltas(deltas: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ricostruisce lo stato completo di una sessione dai delta dei turni."""
+    state: Dict[str, Any] = {}
+    for delta in deltas:
+        apply_delta(state, delta)
+    return state
+
+def turn_params(data: Dict[str, Any]) -> tuple:
+    """Parametri di APPEND_TURN_SQL da un record {thread_id, turn, delta, ...}."""
+    record = {k: v for k, v in data.items() if k not in ("thread_id", "turn")}
+    return (data["thread_id"], data["turn"], json.dumps(record, default=json_default))
+
+class SessionLog:
+    """Tabella `session_turns`: un INSERT per turno, stato ricostruito su richiesta."""
+
+    def __init__(self, persistent_store):
+        self.store = persistent_store
+        self.store.execute(CREATE_TURNS_TABLE_SQL)
+        logger.debug("Tabella 'session_turns' verificata/creata in PostgreSQL")
+
+    def append(self, data: Dict[str, Any]):
+        """Registra un turno (accodato alla unit of work attiva, se presente)."""
+        self.store.write(APPEND_TURN_SQL, turn_params(data))
+
+    def last_turn(self, thread_id: str) -> int:
+        row = self.store.execute(LAST_TURN_SQL, (thread_id,), fetch="one")
+        return row[0] if row else -1
+
+    def load(self, thread_id: str) -> Dict[str, Any]:
+        """Stato completo della sessione ottenuto ripiegando i delta in ordine di turno."""
+        rows = self.store.execute(LOAD_TURNS_SQL, (thread_id,), fetch="all", dict_rows=True)
+        return fold_deltas([row["delta"] for row in rows])
+
+    def migrate_session_logs(self, delete: bool = False) -> int:
+        """Converte le righe `session_logs` di long_term_memory in un turno 0 con lo stato completo."""
+        rows = self.store.execute("""
+            SELECT key, data FROM long_term_memory WHERE namespace = 'session_logs';
+        """, fetch="all", dict_rows=True)
+        migrated = 0
+        with self.store.unit_of_work():
+            for row in rows:
+                delta, _ = build_delta(None, row["data"] or {})
+                self.append({"thread_id": row["key"], "turn": 0, **delta, "meta": {"migrated": True}})
+                migrated += 1
+            if delete:
+                self.store.write("DELETE FROM long_term_memory WHERE namespace = 'session_logs';", ())
+        logger.info(f"Migrati {migrated} session_logs in session_turns")
+        return migrated
+
+def main():
+    parser = argparse.ArgumentParser(description="Strumenti per il log di sessione per turni")
+    parser.add_argument("--migrate", action="store_true", help="Converte le righe session_logs esistenti")
+    parser.add_argument("--delete", action="store_true", help="Elimina le righe session_logs dopo la migrazione")
+    args = parser.parse_args()
+
+    if args.migrate:
+        from backend.src.core_components import CoreComponents  # Import locale per evitare dipendenze circolari
+        memory_store = CoreComponents.get_memory_store()
+        count = memory_store.session_log.migrate_session_logs(delete=args.delete)
+        print(f"Migrati {count} session_logs")
+    else:
+        parser.print_help()
+
+if __name__ == "__main__":
+    main()
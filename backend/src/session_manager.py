@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import re
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Set, Tuple
+from backend.src.config import MAX_SESSIONS, SESSION_IDLE_TTL, SESSION_LOG_MODE
+from backend.src.state.state_manager import StateManager, WINDOWED_KEYS
+from backend.src.state.state_schema import StateSchema
+from backend.src.state.message_log import MessageLog
+from backend.src.state.message import Message
+from backend.src.state.digest_set import DigestSet
+from backend.src.session_log import build_delta, offset_key
+from backend.src.utils.lru_cache import LRUCache
+from backend.src.utils.blocking import run_blocking
+
+logger = logging.getLogger("SessionManager")
+
+# Gli ID diventano thread_id e chiavi (VARCHAR(255), es. "<id>/<turno>"): lunghezza e caratteri limitati
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_.:-]{1,128}")
+
+class InvalidSessionId(ValueError):
+    """session_id fornito dal client troppo lungo o con caratteri non ammessi."""
+
+def validate_session_id(session_id: str) -> str:
+    if not isinstance(session_id, str) or not SESSION_ID_PATTERN.fullmatch(session_id):
+        raise InvalidSessionId("session_id non valido: da 1 a 128 caratteri tra lettere, cifre e _ . : -")
+    return session_id
+
+def new_session_id(prefix: str = "session") -> str:
+    return f"{prefix}-{uuid.uuid4().hex}"
+
+class Session:
+    """Contesto di una conversazione: stato, assistente e lock per i turni."""
+
+    def __init__(self, session_id: str, state_manager: StateManager, assistant, manager: Optional["SessionManager"] = None):
+        self.session_id = session_id
+        self.state_manager = state_manager
+        self.assistant = assistant
+        self.manager = manager  # Se presente, la sessione non viene rimossa durante un turno
+        self.lock = asyncio.Lock()  # Un turno alla volta per sessione
+        self._streaming: Set[asyncio.Task] = set()  # Riferimenti forti: i turni sopravvivono al client
+        self.created_at = time.time()
+
+    @contextmanager
+    def _turn(self) -> Iterator[None]:
+        if self.manager is None:
+            yield
+            return
+        self.manager._pin(self)
+        try:
+            yield
+        finally:
+            self.manager._unpin(self)
+
+    async def process(self, command: str) -> str:
+        """Esegue un turno e restituisce la risposta dell'assistente."""
+        with self._turn():
+            async with self.lock:
+                return await self.assistant.process_command(command)
+
+    async def stream(self, command: str) -> AsyncIterator[Dict[str, Any]]:
+        """Esegue un turno producendo i frame per il client.
+
+        `{"type": "delta", "content"}` per ogni blocco di token, poi
+        `{"type": "final", "content", "session_id"}` con la risposta completa,
+        oppure `{"type": "error", "message"}` se il turno fallisce o non
+        produce una risposta. Se il client si disconnette il
+        turno viene comunque completato.
+        """
+        frames: asyncio.Queue = asyncio.Queue()
+
+        async def on_token(content: str):
+            await frames.put({"type": "delta", "content": content})
+
+        async def run():
+            try:
+                with self._turn():
+                    async with self.lock:
+                        reply = await self.assistant.process_command(command, on_token=on_token)
+                if not reply:
+                    raise RuntimeError("Nessuna risposta generata")
+                await frames.put({"type": "final", "content": reply, "session_id": self.session_id})
+            except Exception as e:
+                logger.error(f"Errore nel turno in streaming della sessione {self.session_id}: {e}", exc_info=True)
+                await frames.put({"type": "error", "message": str(e)})
+
+        task = asyncio.create_task(run())
+        self._streaming.add(task)
+        task.add_done_callback(self._streaming.discard)
+        while True:
+            frame = await frames.get()
+            yield frame
+            if frame["type"] != "delta":
+                return
+
+class SessionManager:
+    """Sessioni indipendenti per l'API, indicizzate per session/thread ID.
+
+    Ogni sessione ha il proprio StateManager e VoiceAssistant (thread_id =
+    session_id); grafo, MemoryStore e write-behind sono condivisi. Le
+    sessioni inattive da più di `idle_ttl` secondi, o meno usate oltre
+    `max_sessions`, vengono rimosse dalla memoria: al ritorno lo stato è
+    ricostruito dal log di sessione per turni.
+
+    Le sessioni con un turno in corso restano bloccate in memoria anche se
+    escono dalla cache: una nuova istanza ripristinata dal log avrebbe un
+    altro lock e riuserebbe lo stesso numero di turno.
+    """
+
+    def __init__(self, memory_store, write_behind=None, max_sessions: int = MAX_SESSIONS, idle_ttl: float = SESSION_IDLE_TTL):
+        self.memory_store = memory_store
+        self.write_behind = write_behind
+        self._sessions = LRUCache(max_sessions, ttl=idle_ttl)
+        self._pinned: Dict[str, Tuple[Session, int]] = {}  # session_id -> (sessione, turni in corso)
+        self._closed: Set[str] = set()
+        self._create_lock = asyncio.Lock()
+
+    async def get(self, session_id: Optional[str] = None) -> Session:
+        """Restituisce la sessione, creandola (o ripristinandola) se necessario.
+
+        Senza `session_id` viene creata una nuova sessione con un ID generato:
+        nessuno stato è condiviso tra client diversi.
+        """
+        session_id = validate_session_id(session_id) if session_id else new_session_id()
+        session = self._touch(session_id)
+        if session is not None:
+            return session
+        async with self._create_lock:
+            session = self._touch(session_id)
+            if session is None:
+                session = await run_blocking(self._create, session_id)
+                self._sessions.put(session_id, session)
+                logger.info(f"Sessione {session_id} creata ({len(self._sessions)} attive)")
+        return session
+
+    def _touch(self, session_id: str) -> Optional[Session]:
+        # Un nuovo put rinnova la scadenza: il TTL conta dall'ultimo utilizzo
+        pinned = self._pinned.get(session_id)
+        session = pinned[0] if pinned is not None else self._sessions.get(session_id)
+        if session is not None:
+            self._closed.discard(session_id)
+            self._sessions.put(session_id, session)
+        return session
+
+    def _pin(self, session: Session) -> None:
+        _, turns = self._pinned.get(session.session_id, (session, 0))
+        self._pinned[session.session_id] = (session, turns + 1)
+
+    def _unpin(self, session: Session) -> None:
+        _, turns = self._pinned.pop(session.session_id, (session, 1))
+        if turns > 1:
+            self._pinned[session.session_id] = (session, turns - 1)
+        elif session.session_id not in self._closed:
+            # Appena usata: torna in cache se era stata rimossa durante il turno
+            self._sessions.put(session.session_id, session)
+        else:
+            self._closed.discard(session.session_id)
+
+    def _create(self, session_id: str) -> Session:
+        from backend.src.voice_assistant import VoiceAssistant  # Import locale per evitare dipendenze circolari
+
+        state_manager = StateManager(self.memory_store)
+        state_manager.set_state_schema(StateSchema)
+        assistant = VoiceAssistant(state_manager, write_behind=self.write_behind, thread_id=session_id)
+        assistant.is_web_mode = True
+        if SESSION_LOG_MODE == "turns":
+            self._restore(assistant, session_id)
+        return Session(session_id, state_manager, assistant, manager=self)
+
+    def _restore(self, assistant, session_id: str):
+        """Ricarica lo stato di una sessione già vista (es. dopo l'eviction)."""
+        last_turn = self.memory_store.session_log.last_turn(session_id)
+        if last_turn < 0:
+            return
+        state = self.memory_store.load_session_state(session_id)
+        for key in WINDOWED_KEYS:
+            # La finestra riparte dalla sua posizione assoluta: stesso ordine nel merge e stesse chiavi in archivio
+            offset = state.pop(offset_key(key), 0)
+            if key in state:
+                state[key] = MessageLog(
+                    (Message.from_dict(item) if isinstance(item, dict) else item for item in state[key]),
+                    offset=offset,
+                )
+        if "processed_messages" in state:
+            # Il log contiene già i digest: il limite scarta di nuovo i più vecchi
+            state["processed_messages"] = DigestSet(state["processed_messages"])
+        assistant.state_manager.state.update(state)
+        assistant.turn = last_turn + 1
+        # Lo stato ripristinato è già nel log: il prossimo turno registra solo le differenze
+        _, assistant._log_cursor = build_delta(None, assistant.state_manager.state)
+        logger.info(f"Sessione {session_id} ripristinata dal turno {last_turn}")
+
+    def close(self, session_id: str) -> None:
+        self._sessions.invalidate(session_id)
+        if session_id in self._pinned:
+            self._closed.add(session_id)  # Rimossa alla fine del turno in corso
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._sessions.stats(), "pinned": len(self._pinned)}
@@ -0,0 +1,109 @@
+# src/state/digest_set.py
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from backend.src.config import PROCESSED_MESSAGES_LIMIT
+
+def text_digest(value: Any) -> str:
+    """Digest compatto e stabile tra processi (64 bit in esadecimale)."""
+    return hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).hexdigest()
+
+class DigestSet:
+    """Insieme ordinato e limitato dei digest dei messaggi già elaborati.
+
+    Appartenenza e inserimento costano O(1); oltre `max_size` vengono
+    rimossi i digest più vecchi. Si serializza come lista di digest
+    (`_asdict` per i checkpoint, `json_default` per i log di sessione).
+    Come MessageLog, un insieme `frozen` è condiviso e non si modifica più.
+    """
+
+    __slots__ = ("max_size", "frozen", "_digests")
+
+    def __init__(self, digests: Iterable[str] = (), max_size: int = PROCESSED_MESSAGES_LIMIT):
+        self.max_size = max_size
+        self.frozen = False
+        self._digests: "OrderedDict[str, None]" = OrderedDict()
+        for digest in digests:
+            self._insert(digest)
+
+    def _insert(self, digest: str) -> bool:
+        if self.frozen:
+            raise TypeError("DigestSet condiviso: usare merge_processed per aggiungere messaggi")
+        if digest in self._digests:
+            return False
+        self._digests[digest] = None
+        if len(self._digests) > self.max_size:
+            self._digests.popitem(last=False)
+        return True
+
+    def add(self, value: Any) -> bool:
+        """Registra un messaggio; False se era già presente."""
+        return self._insert(text_digest(value))
+
+    def __contains__(self, value: Any) -> bool:
+        return text_digest(value) in self._digests
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._digests)
+
+    def __len__(self) -> int:
+        return len(self._digests)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, DigestSet):
+            return NotImplemented
+        return list(self._digests) == list(other._digests)
+
+    __hash__ = None
+
+    def last(self) -> Optional[str]:
+        return next(reversed(self._digests), None)
+
+    def since(self, digest: Optional[str]) -> Optional[List[str]]:
+        """Digest aggiunti dopo `digest` (None se `digest` non è più presente)."""
+        if digest is None:
+            return list(self._digests)
+        added = []
+        for current in reversed(self._digests):
+            if current == digest:
+                added.reverse()
+                return added
+            added.append(current)
+        return None
+
+    def freeze(self) -> "DigestSet":
+        self.frozen = True
+        return self
+
+    def copy(self) -> "DigestSet":
+        clone = DigestSet(max_size=self.max_size)
+        clone._digests = self._digests.copy()
+        return clone
+
+    def _asdict(self) -> Dict[str, Any]:
+        return {"digests": list(self._digests), "max_size": self.max_size}
+
+    def __reduce__(self):
+        return (DigestSet, (list(self._digests), self.max_size))
+
+    def __repr__(self) -> str:
+        return f"DigestSet({len(self._digests)}/{self.max_size} digest)"
+
+def merge_processed(old: Optional[Any], new: Optional[Any]) -> DigestSet:
+    """Reducer per processed_messages.
+
+    Un DigestSet è lo stato completo (snapshot in ingresso al grafo, stato
+    finale in uscita) e viene adottato senza copie; una lista contiene i
+    messaggi appena elaborati (delta dei nodi) da aggiungere.
+    """
+    if isinstance(new, DigestSet):
+        return new.freeze()
+    if isinstance(old, DigestSet):
+        processed = old.copy() if old.frozen else old
+    else:
+        # Checkpoint o stato precedenti: lista dei messaggi originali
+        processed = DigestSet(text_digest(value) for value in old or [])
+    for value in new or []:
+        processed.add(value)
+    return processed
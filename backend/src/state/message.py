@@ -0,0 +1,91 @@
+# src/state/message.py
+
+import json
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Hashable, Iterator, Optional
+from backend.src.state.digest_set import DigestSet
+
+def _hashable(value: Any) -> Hashable:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+
+def content_digest(role: Any, content: Any, extra: Optional[Dict[str, Any]] = None) -> Hashable:
+    """Chiave di deduplicazione di un messaggio: `id` se presente, altrimenti hash di ruolo, contenuto e campi extra."""
+    if extra:
+        if extra.get("id") is not None:
+            return ("id", extra["id"])
+        return hash((role, _hashable(content), json.dumps(extra, sort_keys=True, ensure_ascii=False, default=str)))
+    return hash((role, _hashable(content)))
+
+class Message(Mapping):
+    """Messaggio compatto della conversazione, compatibile con i dizionari {"role", "content", ...}.
+
+    Usa `__slots__` al posto del dizionario per istanza, il ruolo è internato
+    e il digest per la deduplicazione è calcolato una volta alla creazione.
+    `embedding` è un riferimento opzionale al vettore già calcolato (non
+    viene serializzato). `_asdict` permette al serializer dei checkpoint di
+    LangGraph di salvarlo e ricostruirlo dai soli campi.
+    """
+
+    __slots__ = ("role", "content", "extra", "digest", "embedding")
+
+    def __init__(self, role: str, content: Any, **extra: Any):
+        self.role = sys.intern(role) if isinstance(role, str) else role
+        self.content = content
+        self.extra = extra or None  # tool_call_id, name, ... solo se presenti
+        self.digest = content_digest(self.role, content, self.extra)
+        self.embedding = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "Message":
+        if isinstance(data, Message):
+            return data
+        extra = {key: value for key, value in data.items() if key not in ("role", "content")}
+        return cls(data.get("role", ""), data.get("content", ""), **extra)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "role":
+            return self.role
+        if key == "content":
+            return self.content
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "role"
+        yield "content"
+        if self.extra is not None:
+            yield from self.extra
+
+    def __len__(self) -> int:
+        return 2 + (len(self.extra) if self.extra is not None else 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {"role": self.role, "content": self.content}
+        if self.extra is not None:
+            data.update(self.extra)
+        return data
+
+    _asdict = to_dict
+
+    def __reduce__(self):
+        return (_restore_message, (self.to_dict(),))
+
+    def __repr__(self) -> str:
+        return f"Message({self.to_dict()!r})"
+
+def _restore_message(data: Dict[str, Any]) -> Message:
+    return Message.from_dict(data)
+
+def json_default(obj: Any) -> Any:
+    """`default` per json.dumps: i Message come dizionari, i DigestSet come liste di digest."""
+    if isinstance(obj, Message):
+        return obj.to_dict()
+    if isinstance(obj, DigestSet):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
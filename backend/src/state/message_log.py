@@ -0,0 +1,142 @@
+# src/state/message_log.py
+
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+from backend.src.state.message import Message, content_digest
+
+def message_digest(item: Any) -> Hashable:
+    """Chiave di deduplicazione: `id` del messaggio se presente, altrimenti digest del contenuto.
+
+    Un Message e il dizionario equivalente hanno lo stesso digest.
+    """
+    if isinstance(item, Message):
+        return item.digest
+    if isinstance(item, dict):
+        extra = {key: value for key, value in item.items() if key not in ("role", "content")}
+        return content_digest(item.get("role"), item.get("content"), extra)
+    try:
+        hash(item)
+        return item
+    except TypeError:
+        return repr(item)
+
+class MessageLog(list):
+    """Lista di messaggi senza duplicati con indice hash in ordine di inserimento.
+
+    `append`/`extend` ignorano i messaggi già presenti con costo O(1)
+    ammortizzato per messaggio e `in` usa l'indice invece di scorrere la lista.
+    I digest sono calcolati una sola volta per messaggio e riusati da `copy`.
+    `offset` è la posizione assoluta del primo messaggio: i messaggi
+    precedenti sono stati spostati in archivio (vedi `split`).
+
+    Un log `frozen` è condiviso tra più stati (snapshot, canali del grafo)
+    e non si modifica più: `merge_messages` ne estende una copia.
+    """
+
+    def __init__(self, items: Optional[Iterable[Any]] = None, offset: int = 0):
+        super().__init__()
+        self.offset = offset
+        self.frozen = False
+        self._digests: List[Hashable] = []
+        self._index: Dict[Hashable, int] = {}
+        if items is not None:
+            self.extend(items)
+
+    def _add(self, item: Any, digest: Hashable) -> bool:
+        if self.frozen:
+            raise TypeError("MessageLog condiviso: usare merge_messages per aggiungere messaggi")
+        if digest in self._index:
+            return False
+        self._index[digest] = len(self._digests)
+        self._digests.append(digest)
+        super().append(item)
+        return True
+
+    def append(self, item: Any) -> None:
+        self._add(item, message_digest(item))
+
+    def extend(self, items: Iterable[Any]) -> None:
+        if isinstance(items, MessageLog):
+            for item, digest in zip(items, items._digests):
+                self._add(item, digest)
+        else:
+            for item in items:
+                self._add(item, message_digest(item))
+
+    def __iadd__(self, items: Iterable[Any]) -> "MessageLog":
+        self.extend(items)
+        return self
+
+    def __contains__(self, item: Any) -> bool:
+        return message_digest(item) in self._index
+
+    def freeze(self) -> "MessageLog":
+        """Rende il log immutabile, così può essere condiviso senza copie (O(1))."""
+        self.frozen = True
+        return self
+
+    def copy(self) -> "MessageLog":
+        clone = MessageLog(offset=self.offset)
+        list.extend(clone, self)
+        clone._digests = list(self._digests)
+        clone._index = dict(self._index)
+        return clone
+
+    def split(self, size: int) -> Tuple[List[Any], "MessageLog"]:
+        """Divide il log in (messaggi più vecchi, nuovo log con gli ultimi `size`).
+
+        I messaggi più vecchi escono anche dall'indice di deduplicazione.
+        """
+        cut = max(len(self) - size, 0)
+        hot = MessageLog(offset=self.offset + cut)
+        list.extend(hot, self[cut:])
+        hot._digests = self._digests[cut:]
+        hot._index = {digest: position for position, digest in enumerate(hot._digests)}
+        return list(self[:cut]), hot
+
+    def extends(self, other: list) -> bool:
+        """True se `other` è un prefisso di questo log (confronto sull'ultimo messaggio di `other`, O(1)).
+
+        `other` può essere anche una lista semplice, come i canali ricaricati
+        da un checkpoint (msgpack non conserva il tipo MessageLog).
+        """
+        size = len(other)
+        if size > len(self._digests):
+            return False
+        if size == 0:
+            return True
+        last = other._digests[-1] if isinstance(other, MessageLog) else message_digest(other[-1])
+        return self._digests[size - 1] == last
+
+    def __reduce__(self):
+        # Pickle/deepcopy ricostruiscono l'indice invece di passare per append senza stato
+        return (MessageLog, (list(self), self.offset))
+
+    def _not_supported(self, *args, **kwargs):
+        raise TypeError("MessageLog è append-only")
+
+    insert = remove = pop = clear = sort = reverse = __setitem__ = __delitem__ = _not_supported
+
+def merge_messages(old: Optional[list], new: Optional[list]) -> MessageLog:
+    """Reducer per i log di messaggi: aggiunge a `old` i soli messaggi nuovi di `new`.
+
+    I nodi restituiscono solo i messaggi nuovi (delta). Se `new` è un
+    MessageLog che contiene già `old` come prefisso (es. lo stato finale del
+    grafo, o lo snapshot in ingresso rispetto al canale ricaricato dal
+    checkpoint come lista) viene adottato direttamente e congelato, senza
+    copie né ricostruzione dell'indice. Un MessageLog con `offset` maggiore
+    è una finestra più recente e sostituisce `old` (es. lo storico completo
+    ancora presente nel checkpoint).
+    """
+    if isinstance(new, MessageLog) and new.offset > getattr(old, "offset", 0):
+        return new.freeze()
+    if isinstance(new, MessageLog) and (not old or new.extends(old)):
+        # Adottato senza copia: ora è condiviso, le estensioni successive ne fanno una copia
+        return new.freeze()
+    if isinstance(old, MessageLog):
+        # Copy-on-write: si estende in place solo un log non condiviso
+        log = old.copy() if old.frozen else old
+    else:
+        log = MessageLog(old)
+    if new:
+        log.extend(new)
+    return log
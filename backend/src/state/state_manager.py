@@ -1,21 +1,51 @@
 # src/state/state_manager.py
 
+import copy
 import logging
-from typing import Type, get_origin, get_args
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type, get_origin, get_args
 from backend.src.state.state_schema import StateSchema
+from backend.src.state.message_log import MessageLog
+from backend.src.state.digest_set import DigestSet
 from backend.src.memory_store import MemoryStore
 from typing_extensions import Annotated
 from backend.src.utils.log_config import setup_logging
+from backend.src.config import STATE_VALIDATION
+from backend.src.utils.lazy_log import state_summary, summarize
 
 logger = logging.getLogger("StateManager")
 
+# (tipo base, reducer, validatore) per una chiave dello stato
+FieldSpec = Tuple[Any, Optional[Callable[[Any, Any], Any]], Callable[[Any], bool]]
+
+def compile_field(annotation: Any) -> FieldSpec:
+    """Risolve una volta sola tipo base, reducer e validatore di un'annotazione dello schema."""
+    reducer = None
+    if get_origin(annotation) is Annotated:
+        args = get_args(annotation)
+        annotation = args[0]
+        reducer = args[1] if len(args) > 1 else None
+    base_type = get_origin(annotation) or annotation
+    if isinstance(base_type, type):
+        validator = lambda value: isinstance(value, base_type)
+    else:
+        validator = lambda value: True  # Literal, Union, ...: nessun controllo
+    return base_type, reducer, validator
+
+def compile_schema(schema: Type[StateSchema]) -> Dict[str, FieldSpec]:
+    return {key: compile_field(annotation) for key, annotation in schema.__annotations__.items()}
+
+# Log di messaggi soggetti alla finestra della conversazione
+WINDOWED_KEYS = ("user_messages", "agent_messages")
+# Valori condivisi (congelati) tra lo stato e gli snapshot dei turni
+SHARED_KEYS = WINDOWED_KEYS + ("processed_messages",)
+
 class StateManager:
     def __init__(self, memory_store):  # Accept memory_store from CoreComponents
         self.memory_store = memory_store  # Use the provided MemoryStore
         logger.debug("StateManager initialized.")
         self.state: StateSchema = {
-            "user_messages": [],
-            "agent_messages": [],
+            "user_messages": MessageLog(),
+            "agent_messages": MessageLog(),
             "should_research": False,
             "terminate": False,  # Ensure default is False
             "valid_query": False,
@@ -27,133 +57,108 @@ class StateManager:
             "last_user_message": "",
             "relevant_messages": [],
             "modified_response": "",
-            "processed_messages": [],
+            "processed_messages": DigestSet(),
             "long_term_memory": {},  # Initialize long_term_memory
             "short_term_memory": [],  # Initialize as a list
+            "thread_id": "",
             # ...existing code...
         }
+        # Ultima long_term_memory salvata: si riscrive solo quando cambia
+        self._saved_long_term_memory: Dict[str, Any] = {}
         logger.debug("StateManager inizializzato con stato vuoto e StateSchema impostato.")
 
     def set_state_schema(self, schema: Type[StateSchema]):
-        """Imposta un nuovo schema per lo stato."""
+        """Imposta un nuovo schema per lo stato e lo compila nella tabella per chiave."""
         self.state_schema = schema
+        self._fields = compile_schema(schema)
         logger.debug("StateSchema aggiornato in StateManager.")
 
-    def _format_state_for_log(self, state_dict: dict) -> dict:
-        """Formatta lo stato per il logging in modo più leggibile"""
-        return {
-            key: (
-                value[-3:] if isinstance(value, list) and key in ['user_messages', 'agent_messages'] 
-                else value
-            )
-            for key, value in state_dict.items()
-            if key in ['user_messages', 'agent_messages', 'last_agent', 'next_agent']
-        }
-
     def update_state(self, updates: dict):
         """Aggiorna lo stato con i nuovi valori forniti, validandoli contro StateSchema."""
         if not isinstance(updates, dict):
             logger.error("Aggiornamenti dello stato non sono un dizionario.")
             return
 
+        changed = []
         for key, value in updates.items():
-            if key in self.state_schema.__annotations__:
-                annotation = self.state_schema.__annotations__[key]
-                origin = get_origin(annotation)
-
-                # Check if the annotation is Annotated
-                if origin is Annotated:
-                    args = get_args(annotation)
-                    base_type = get_origin(args[0]) or args[0]
-                    reducer = args[1] if len(args) > 1 else None
-                else:
-                    base_type = origin if origin else annotation
-                    reducer = None
-
-                if base_type is list:
-                    if reducer:
-                        self.state[key] = reducer(self.state.get(key, []), value)
-                        logger.debug("Updated state key '%s' with value: %s", key, 
-                                     str(self.state[key])[:200] + '...' if len(str(self.state[key])) > 200 else self.state[key])
-                    else:
-                        self.state[key].extend(value)
-                        logger.debug("Updated state key '%s' with value: %s", key, self.state[key])
-                elif base_type is dict:
-                    if reducer:
-                        self.state[key] = reducer(self.state.get(key, {}), value)
-                        logger.debug("Updated state key '%s' with value: %s", key, self.state[key])
-                    else:
-                        self.state[key].update(value)
-                        logger.debug("Updated state key '%s' with value: %s", key, self.state[key])
-                else:
-                    self.state[key] = value
-                    logger.debug("Updated state key '%s' with value: %s", key, self.state[key])
-            else:
+            field = self._fields.get(key)
+            if field is None:
                 logger.warning(f"Chiave non riconosciuta nello stato: {key}")
+                continue
+            base_type, reducer, _ = field
+
+            if reducer is not None and base_type is list:
+                self.state[key] = reducer(self.state.get(key, []), value)
+            elif reducer is not None and base_type is dict:
+                self.state[key] = reducer(self.state.get(key, {}), value)
+            elif base_type is list:
+                self.state[key].extend(value)
+            elif base_type is dict:
+                self.state[key].update(value)
+            elif reducer is not None:
+                self.state[key] = reducer(self.state.get(key), value)
+            else:
+                self.state[key] = value
+            changed.append(key)
+            logger.debug("Updated state key '%s' with value: %s", key, summarize(self.state[key]))
 
-        # Validazione dello stato aggiornato
-        self.validate_state()
-
-        # Log before deduplication
-        logger.debug("Pre-deduplication processed_messages: %s", self.state.get('processed_messages', []))
+        # Validazione delle sole chiavi modificate (disattivata in produzione)
+        if STATE_VALIDATION:
+            self._validate_keys(changed)
 
         # Ensure terminate remains False
         self.state["terminate"] = False  
 
-        # Elimina duplicati mantenendo l'ordine in 'processed_messages'
-        seen = set()
-        unique_processed = []
-        for msg in self.state.get("processed_messages", []):
-            if msg not in seen:
-                seen.add(msg)
-                unique_processed.append(msg)
-        self.state["processed_messages"] = unique_processed
-
-        if "long_term_memory" in updates:
-            # Merge long-term memory updates
-            self.memory_store.save_to_long_term_memory("long_term_namespace", "memory_key", updates["long_term_memory"])
+        long_term_memory = self.state.get("long_term_memory", {})
+        if "long_term_memory" in updates and long_term_memory != self._saved_long_term_memory:
+            # Il grafo restituisce la memoria a ogni turno: la si salva solo se è cambiata
+            self.memory_store.save_to_long_term_memory("long_term_namespace", "memory_key", long_term_memory)
+            self._saved_long_term_memory = copy.deepcopy(long_term_memory)
             logger.debug("Memoria a lungo termine aggiornata.")
         
-        # Log after deduplication
-        logger.debug("Post-deduplication processed_messages: %s", self.state['processed_messages'])
-        logger.debug("Stato dopo update_state: %s", self.state)
-        
-        # **Log current agent_messages**
-        logger.debug("Current agent_messages: %s", self.state.get('agent_messages', []))
-
-        # Log in modo più leggibile
-        logger.debug("Pre-deduplication processed_messages count: %d", 
-                     len(self.state.get('processed_messages', [])))
-        logger.debug("Post-deduplication processed_messages count: %d", 
-                     len(self.state['processed_messages']))
-    
-        formatted_state = self._format_state_for_log(dict(self.state))
-        logger.debug("State after update: %s", formatted_state)
+        # Riepiloghi differiti: formattati solo se il livello DEBUG è attivo
+        logger.debug("Stato dopo update_state: %s", state_summary(self.state))
+        logger.debug("processed_messages count: %d", len(self.state.get('processed_messages', [])))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Vista coerente dello stato per un turno del grafo, in O(1) per chiave.
+
+        I log dei messaggi sono congelati e condivisi invece che copiati: gli
+        aggiornamenti successivi passano dai reducer, che ne estendono una copia.
+        """
+        for key in SHARED_KEYS:
+            value = self.state.get(key)
+            if isinstance(value, (MessageLog, DigestSet)):
+                value.freeze()
+        return dict(self.state)
+
+    def spill_window(self, window: int, batch: int) -> Dict[str, Tuple[int, List[Any]]]:
+        """Riporta i log dei messaggi agli ultimi `window` elementi quando li superano di `batch`.
+
+        Restituisce i messaggi rimossi per chiave, con la posizione assoluta del primo.
+        """
+        spilled = {}
+        for key in WINDOWED_KEYS:
+            log = self.state.get(key)
+            if not isinstance(log, MessageLog):
+                log = MessageLog(log or [])
+            if len(log) <= window + batch:
+                continue
+            older, self.state[key] = log.split(window)
+            spilled[key] = (log.offset, older)
+            logger.debug("Finestra di '%s': %d messaggi rimossi dalla memoria", key, len(older))
+        return spilled
 
     def validate_state(self):
-        """Valida lo stato attuale contro lo StateSchema."""
-        try:
-            for key, value in self.state.items():
-                if key in self.state_schema.__annotations__:
-                    expected_type = self.state_schema.__annotations__[key]
-                    origin = get_origin(expected_type)
-                    args = get_args(expected_type)
-                    
-                    if origin is not None:
-                        if origin is list:
-                            if not isinstance(value, list):
-                                logger.warning("Tipo inatteso per '%s': aspettato list, ottenuto %s", key, type(value))
-                        elif origin is dict:
-                            if not isinstance(value, dict):
-                                logger.warning("Tipo inatteso per '%s': aspettato dict, ottenuto %s", key, type(value))
-                        # Add more origin checks if necessary
-                    else:
-                        if not isinstance(value, expected_type):
-                            logger.warning("Tipo inatteso per '%s': aspettato %s, ottenuto %s", key, expected_type, type(value))
-            logger.debug("Validazione dello stato completata con successo.")
-        except Exception as e:
-            logger.error(f"Errore durante la validazione dello stato: {e}")
-    
+        """Valida l'intero stato attuale contro lo StateSchema."""
+        self._validate_keys(self.state.keys())
+
+    def _validate_keys(self, keys):
+        for key in keys:
+            field = self._fields.get(key)
+            if field is not None and not field[2](self.state[key]):
+                logger.warning("Tipo inatteso per '%s': aspettato %s, ottenuto %s", key, field[0], type(self.state[key]))
+
     def get_assistant_message(self) -> str:
         """Recupera l'ultimo messaggio generato dall'assistente."""
         agent_messages = self.state.get("agent_messages", [])
@@ -5,6 +5,8 @@ import operator
 from langgraph.types import Command
 from typing_extensions import Annotated
 import json  # Ensure json is imported if used elsewhere
+from backend.src.state.message_log import merge_messages
+from backend.src.state.digest_set import DigestSet, merge_processed
 
 def manage_list(old: list, new: list) -> list:
     """Combines lists without duplicates, maintaining order."""
@@ -36,9 +38,11 @@ def manage_long_term_memory(old: dict, new: dict) -> dict:
     return updated
 
 class StateSchema(TypedDict, total=False):
-    user_messages: Annotated[List[Dict[str, Any]], manage_list]
-    agent_messages: Annotated[List[Dict[str, Any]], manage_list]
-    processed_messages: Annotated[List[str], manage_list]
+    # Log append-only con indice hash: i nodi restituiscono solo i messaggi nuovi
+    user_messages: Annotated[List[Dict[str, Any]], merge_messages]
+    agent_messages: Annotated[List[Dict[str, Any]], merge_messages]
+    # Insieme limitato dei digest: i nodi restituiscono i messaggi appena elaborati
+    processed_messages: Annotated[DigestSet, merge_processed]
     short_term_memory: Annotated[List[Dict[str, Any]], manage_short_term_memory]
     long_term_memory: Annotated[Dict[str, Any], manage_long_term_memory]
     should_research: bool
@@ -52,5 +56,6 @@ class StateSchema(TypedDict, total=False):
     last_user_message: str  # Aggiungi l'ultimo messaggio dell'utente
     relevant_messages: List[Dict[str, Any]]  # Aggiungi i messaggi rilevanti
     modified_response: str  # Aggiungi la risposta modificata
+    thread_id: str  # Thread della sessione (indice vettoriale e profili utente)
     # Optional: Add fallback-related fields if necessary
 
@@ -2,6 +2,7 @@ import logging
 from typing import Annotated
 from langchain_core.tools import tool
 from langgraph.types import Command
+from backend.src.state.message import Message
 from langgraph.prebuilt.tool_node import InjectedState, InjectedToolArg
 
 class InjectedToolCallId(InjectedToolArg):
@@ -37,18 +38,17 @@ def make_handoff_tool(agent_name: str):
         # Combina 'user_messages' e 'agent_messages' in 'messages'
         messages = state.get("user_messages", []) + state.get("agent_messages", [])
 
-        tool_message = {
-            "role": "tool",
-            "content": f"Successfully transferred to {agent_name}",
-            "name": tool_name,
-            "tool_call_id": tool_call_id,
-        }
+        tool_message = Message(
+            "tool",
+            f"Successfully transferred to {agent_name}",
+            name=tool_name,
+            tool_call_id=tool_call_id,
+        )
         return Command(
             goto=agent_name,
             graph=Command.PARENT,
             update={
-                "user_messages": state.get("user_messages", []),
-                "agent_messages": state.get("agent_messages", []) + [tool_message],
+                "agent_messages": [tool_message],
             },
         )
     return handoff_to_agent
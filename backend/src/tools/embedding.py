@@ -1,44 +1,154 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+import hashlib
 import logging
 from typing import List, Dict, Any
-from sklearn.neighbors import NearestNeighbors
+from backend.src.config import EMBEDDING_CACHE_SIZE, MIN_SIMILARITY, SESSION_INDEX_LIMIT
+from backend.src.tools.model_registry import get_embedding_model
+from backend.src.tools.vector_index import VectorIndex
+from backend.src.utils.lru_cache import LRUCache
+from backend.src.state.message import Message
+from backend.src.profiler import profiled
 
 logger = logging.getLogger("EmbeddingTools")
 
-# Inizializza il modello di embedding
-model = SentenceTransformer('all-MiniLM-L6-v2')
-logger.debug("Modello SentenceTransformer inizializzato.")
+class EmbeddingCache:
+    """Cache degli embedding indicizzata per hash del contenuto.
+
+    Ogni testo viene codificato una sola volta finché resta in cache: ai turni
+    successivi vengono codificati solo i messaggi nuovi.
+    """
+
+    def __init__(self, max_size: int = EMBEDDING_CACHE_SIZE):
+        self._cache = LRUCache(max_size)
+
+    @staticmethod
+    def content_key(text: str) -> str:
+        return hashlib.md5(text.encode("utf-8")).hexdigest()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Restituisce gli embedding dei testi, codificando solo quelli mancanti."""
+        if not texts:
+            return np.array([])
+
+        keys = [self.content_key(text) for text in texts]
+        found = {}
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key in found or key in missing:
+                continue
+            vector = self._cache.get(key)
+            if vector is None:
+                missing[key] = text
+            else:
+                found[key] = vector
+
+        if missing:
+            with profiled("embedding"):
+                encoded = get_embedding_model().encode(list(missing.values()))
+            for key, vector in zip(missing, encoded):
+                self._cache.put(key, vector)
+                found[key] = vector
+            logger.debug(f"Codificati {len(missing)} nuovi testi su {len(texts)}")
+
+        return np.vstack([found[key] for key in keys])
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+# Cache condivisa da tutti i moduli che calcolano embedding
+embedding_cache = EmbeddingCache()
 
 def vectorize_messages(messages: List[Dict[str, Any]]) -> np.ndarray:
     """Vettorializza i contenuti dei messaggi."""
     try:
         texts = [msg['content'] for msg in messages]
-        embeddings = model.encode(texts)
-        logger.debug(f"Embeddings generati: {embeddings.shape}")
+        embeddings = embedding_cache.encode(texts)
+        logger.debug(f"Embeddings generati: {embeddings.shape}, cache: {embedding_cache.stats()}")
         return embeddings
     except Exception as e:
         logger.error(f"Errore nella vettorializzazione dei messaggi: {e}")
         return np.array([])
 
-def semantic_search(vectors: np.ndarray, query: str, messages: List[Dict[str, Any]], top_k: int = 3, similarity_threshold: float = 0.8) -> List[Dict[str, Any]]:
-    """Esegue una ricerca semantica per trovare i messaggi rilevanti."""
+def semantic_search(vectors: np.ndarray, query: str, messages: List[Dict[str, Any]], top_k: int = 3, min_similarity: float = MIN_SIMILARITY) -> List[Dict[str, Any]]:
+    """Esegue una ricerca semantica per trovare i messaggi rilevanti.
+
+    `min_similarity` è una soglia di similarità coseno (gli embedding di
+    all-MiniLM-L6-v2 sono normalizzati: 0.68 equivale alla vecchia soglia
+    di distanza L2 < 0.8).
+    """
     try:
         if vectors.size == 0:
             logger.debug("Vettori vuoti forniti per la ricerca semantica.")
             return []
-        
-        query_vector = model.encode([query])
-        nbrs = NearestNeighbors(n_neighbors=min(top_k, len(messages)), algorithm='ball_tree').fit(vectors)
-        distances, indices = nbrs.kneighbors(query_vector)
-        
-        relevant_messages = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if distance < similarity_threshold:
-                relevant_messages.append(messages[idx])
-        
-        logger.debug(f"{len(relevant_messages)} messaggi rilevanti trovati con una soglia di similarità di {similarity_threshold}.")
-        return relevant_messages
+
+        index = VectorIndex.from_vectors(vectors, messages)
+        return search_index(index, query, top_k=top_k, min_similarity=min_similarity)
     except Exception as e:
         logger.error(f"Errore durante la ricerca semantica: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def message_key(message: Dict[str, Any]) -> str:
+    """Chiave stabile di un messaggio (ruolo + contenuto)."""
+    return EmbeddingCache.content_key(f"{message.get('role', '')}\x1f{message.get('content', '')}")
+
+# Indici vettoriali per sessione, limitati alle sessioni usate più di recente
+_session_indexes = LRUCache(SESSION_INDEX_LIMIT)
+
+def get_session_index(thread_id: str) -> VectorIndex:
+    """Restituisce l'indice vettoriale persistente della sessione."""
+    index = _session_indexes.get(thread_id)
+    if index is None:
+        index = VectorIndex()
+        _session_indexes.put(thread_id, index)
+    return index
+
+def reset_session_index(thread_id: str) -> None:
+    """Scarta l'indice della sessione: verrà ricostruito dai soli messaggi in memoria."""
+    _session_indexes.invalidate(thread_id)
+
+def index_messages(index: VectorIndex, messages: List[Dict[str, Any]]) -> int:
+    """Aggiunge all'indice solo i messaggi non ancora indicizzati."""
+    new_messages = {}
+    for msg in messages:
+        key = message_key(msg)
+        if key not in index and key not in new_messages:
+            new_messages[key] = msg
+    if not new_messages:
+        return 0
+
+    # I Message conservano un riferimento al proprio embedding: non serve ricalcolarlo
+    messages = list(new_messages.values())
+    pending = [msg for msg in messages if getattr(msg, "embedding", None) is None]
+    computed = {}
+    if pending:
+        pending_vectors = vectorize_messages(pending)
+        if pending_vectors.size == 0:
+            return 0
+        computed = {id(msg): vector for msg, vector in zip(pending, pending_vectors)}
+    rows = []
+    for msg in messages:
+        vector = computed.get(id(msg))
+        if vector is None:
+            vector = msg.embedding
+        elif isinstance(msg, Message):
+            msg.embedding = vector
+        rows.append(vector)
+    vectors = np.stack(rows)
+    index.add_many(vectors, list(new_messages.values()), list(new_messages.keys()))
+    logger.debug(f"Indicizzati {len(new_messages)} nuovi messaggi (totale {len(index)})")
+    return len(new_messages)
+
+def search_index(index: VectorIndex, query: str, top_k: int = 3, min_similarity: float = MIN_SIMILARITY, with_scores: bool = False) -> List[Any]:
+    """Cerca nell'indice i messaggi più simili alla query (con `with_scores` come coppie (messaggio, similarità))."""
+    if len(index) == 0:
+        return []
+    query_vector = embedding_cache.encode([query])[0]
+    results = index.search(query_vector, top_k=top_k, min_similarity=min_similarity)
+    if with_scores:
+        return results
+    relevant_messages = [payload for payload, _ in results]
+    logger.debug(f"{len(relevant_messages)} messaggi rilevanti trovati con una soglia di similarità di {min_similarity}.")
+    return relevant_messages
@@ -0,0 +1,170 @@
+import logging
+import os
+import random
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from backend.src.config import ROUTER_MODE, ROUTER_CONFIDENCE_THRESHOLD, ROUTER_MODEL_PATH, ROUTER_AUDIT_RATE
+from backend.src.tools.embedding import embedding_cache
+from backend.src.tools.vector_index import normalize
+from backend.src.utils.blocking import run_blocking
+
+logger = logging.getLogger("IntentRouter")
+
+ROUTES = ("RESEARCHER", "GREETING")
+
+# Decisioni del router LLM (e campione delle decisioni locali) salvate come etichette per l'addestramento
+ROUTING_NAMESPACE = "routing_decisions"
+
+# Temperatura del softmax sulle similarità coseno: le similarità tra frasi
+# con all-MiniLM-L6-v2 differiscono di pochi centesimi
+CONFIDENCE_TEMPERATURE = 0.05
+
+class RouteDecision(NamedTuple):
+    route: str
+    source: str  # "local" o "llm"
+    confidence: Optional[float]  # Confidenza del classificatore locale (None se non addestrato)
+
+class CentroidClassifier:
+    """Classificatore nearest-centroid sugli embedding normalizzati dei messaggi.
+
+    La confidenza è il softmax delle similarità coseno con i centroidi. Il
+    modello è un file .npz con un centroide per rotta, caricato con la sola
+    NumPy (nessun pickle legato alla versione di scikit-learn); eval_router
+    lo confronta con una LogisticRegression sugli stessi embedding.
+    """
+
+    def __init__(self, labels: Sequence[str], centroids: np.ndarray, examples: int = 0):
+        self.labels = list(labels)
+        self.centroids = normalize(centroids)
+        self.examples = examples
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, labels: Sequence[str]) -> "CentroidClassifier":
+        vectors = normalize(vectors)
+        labels = np.asarray(labels)
+        classes = [route for route in ROUTES if np.any(labels == route)]
+        if len(classes) < 2:
+            raise ValueError("Servono esempi di entrambe le rotte per addestrare il router")
+        centroids = np.vstack([vectors[labels == route].mean(axis=0) for route in classes])
+        return cls(classes, centroids, examples=len(labels))
+
+    def predict(self, vectors: np.ndarray) -> List[Tuple[str, float]]:
+        """Rotta e confidenza per ogni vettore."""
+        similarities = normalize(np.atleast_2d(vectors)) @ self.centroids.T
+        scaled = similarities / CONFIDENCE_TEMPERATURE
+        probabilities = np.exp(scaled - scaled.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [(self.labels[i], float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as file:
+            np.savez(file, labels=np.asarray(self.labels), centroids=self.centroids, examples=self.examples)
+
+    @classmethod
+    def load(cls, path: str) -> "CentroidClassifier":
+        with np.load(path) as data:
+            return cls([str(label) for label in data["labels"]], data["centroids"], int(data["examples"]))
+
+def train_classifier(records: Sequence[Dict[str, Any]]) -> CentroidClassifier:
+    """Addestra il classificatore da record {"message", "route"} (es. le decisioni del router LLM)."""
+    records = [record for record in records if record.get("route") in ROUTES and record.get("message")]
+    vectors = embedding_cache.encode([record["message"] for record in records])
+    return CentroidClassifier.fit(vectors, [record["route"] for record in records])
+
+class IntentRouter:
+    """Routing a due livelli per il supervisor.
+
+    In modalità "hybrid" il classificatore locale decide quando la sua
+    confidenza raggiunge la soglia, altrimenti decide il router LLM; "local"
+    usa sempre il classificatore e "llm" sempre il modello. Senza un
+    classificatore addestrato (ROUTER_MODEL_PATH) si usa il router LLM.
+
+    Le sole decisioni dell'LLM sono un campione distorto (i messaggi sotto
+    soglia): una quota `audit_rate` delle decisioni locali viene fatta
+    etichettare anche all'LLM, per misurare l'accordo e riaddestrare.
+    """
+
+    def __init__(self, mode: str = ROUTER_MODE, threshold: float = ROUTER_CONFIDENCE_THRESHOLD,
+                 model_path: str = ROUTER_MODEL_PATH, classifier: Optional[CentroidClassifier] = None,
+                 audit_rate: float = ROUTER_AUDIT_RATE):
+        self.mode = mode
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.model_path = model_path
+        self.classifier = classifier
+        if classifier is None and mode != "llm":
+            self.classifier = self._load(model_path)
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._metrics = {"decisions": 0, "local": 0, "llm": 0, "fallbacks": 0, "audits": 0, "confidence_sum": 0.0, "scored": 0}
+
+    @staticmethod
+    def _load(path: str) -> Optional[CentroidClassifier]:
+        if not path or not os.path.exists(path):
+            logger.info(f"Nessun classificatore di routing in {path}: si usa il router LLM")
+            return None
+        try:
+            classifier = CentroidClassifier.load(path)
+            logger.info(f"Classificatore di routing caricato da {path} ({classifier.examples} esempi)")
+            return classifier
+        except Exception as e:
+            logger.error(f"Errore nel caricamento del classificatore di routing: {e}")
+            return None
+
+    def classify(self, message: str) -> Optional[Tuple[str, float]]:
+        """Rotta e confidenza del classificatore locale (None se non disponibile)."""
+        if self.classifier is None:
+            return None
+        return self.classifier.predict(embedding_cache.encode([message]))[0]
+
+    async def aroute(self, message: str, llm_route: Callable[[], Awaitable[str]]) -> RouteDecision:
+        """Sceglie la rotta; `llm_route` viene atteso solo quando serve il router LLM."""
+        local = None
+        if self.mode != "llm" and self.classifier is not None:
+            local = await run_blocking(self.classify, message)  # Embedding CPU-bound fuori dall'event loop
+        if local is not None and (self.mode == "local" or local[1] >= self.threshold):
+            decision = RouteDecision(local[0], "local", local[1])
+        else:
+            decision = RouteDecision(await llm_route(), "llm", local[1] if local is not None else None)
+        self._record(decision, fallback=local is not None and decision.source == "llm")
+        logger.debug(f"Routing: {decision.route} ({decision.source}, confidenza {decision.confidence})")
+        return decision
+
+    def should_audit(self, decision: RouteDecision) -> bool:
+        """Estrae a campione le decisioni locali da far etichettare anche al router LLM."""
+        if decision.source != "local" or self._random.random() >= self.audit_rate:
+            return False
+        with self._lock:
+            self._metrics["audits"] += 1
+        return True
+
+    def _record(self, decision: RouteDecision, fallback: bool) -> None:
+        with self._lock:
+            self._metrics["decisions"] += 1
+            self._metrics[decision.source] += 1
+            self._metrics["fallbacks"] += fallback
+            if decision.confidence is not None:
+                self._metrics["scored"] += 1
+                self._metrics["confidence_sum"] += decision.confidence
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+        scored = metrics.pop("scored")
+        confidence_sum = metrics.pop("confidence_sum")
+        return {
+            "mode": self.mode,
+            "threshold": self.threshold,
+            "trained_examples": self.classifier.examples if self.classifier is not None else 0,
+            **metrics,
+            "fallback_rate": round(metrics["fallbacks"] / scored, 4) if scored else None,
+            "avg_confidence": round(confidence_sum / scored, 4) if scored else None,
+        }
+
+# Router condiviso da tutti i supervisor
+intent_router = IntentRouter()
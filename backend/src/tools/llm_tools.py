@@ -1,13 +1,10 @@
 # src/tools/llm_tools.py
 
 from langchain_openai import ChatOpenAI
-from sentence_transformers import SentenceTransformer
-from sklearn.neighbors import NearestNeighbors
-import numpy as np
 import logging
 from typing import List, Dict, Any, Optional
-from backend.src.tools.embedding import model  # Import llm and model from embedding.py
-from backend.src.memory_store import MemoryStore  # Updated import
+from backend.src.tools.embedding import vectorize_messages, semantic_search  # Unica implementazione, riesportata per compatibilità
+from backend.src.profiler import profiled
 from dotenv import load_dotenv
 import os
 
@@ -16,82 +13,79 @@ load_dotenv()
 
 logger = logging.getLogger("LLMTools")
 
+# Risultato di perform_research in caso di errore (da non salvare né riusare)
+RESEARCH_ERROR = "Errore durante la ricerca. Riprovare."
+
 llm = ChatOpenAI(model="gpt-3.5-turbo")
 
-memory_store = MemoryStore()
+def _get_memory_store():
+    """Restituisce il MemoryStore condiviso invece di crearne uno nuovo all'import."""
+    from backend.src.core_components import CoreComponents  # Import locale per evitare dipendenze circolari
+    return CoreComponents.get_memory_store()
+
+def research_messages(query: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": f"Esegui una ricerca approfondita sulla seguente query: {query}. Fornisci i risultati in modo chiaro e conciso."}
+    ]
+
+def response_messages(conversation_text: str, last_user_message: str, modified_response: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": f"Rispondi al seguente messaggio: {last_user_message}. Utilizza le seguenti informazioni rilevanti: {conversation_text}. Risposta modificata: {modified_response}"}
+    ]
+
+def _content(response: Any) -> str:
+    return response.content if isinstance(response.content, str) else str(response.content)
 
 def perform_research(query: str) -> str:
     try:
         logger.debug(f"Eseguendo ricerca per la query: {query}")
-        response = llm.invoke(
-            input=[
-                {"role": "system", "content": f"Esegui una ricerca approfondita sulla seguente query: {query}. Fornisci i risultati in modo chiaro e conciso."}
-            ],
-            temperature=0.7
-        )
-        research_result = response.content if isinstance(response.content, str) else str(response.content)
+        with profiled("llm"):
+            response = llm.invoke(input=research_messages(query), temperature=0.7)
+        research_result = _content(response)
+        logger.debug(f"Risultati della ricerca: {research_result}")
+        return research_result
+    except Exception as e:
+        logger.error(f"Errore durante la ricerca: {e}")
+        return RESEARCH_ERROR
+
+async def aperform_research(query: str) -> str:
+    """Variante asincrona di perform_research: la richiesta a OpenAI non blocca l'event loop."""
+    try:
+        logger.debug(f"Eseguendo ricerca per la query: {query}")
+        with profiled("llm"):
+            response = await llm.ainvoke(input=research_messages(query), temperature=0.7)
+        research_result = _content(response)
         logger.debug(f"Risultati della ricerca: {research_result}")
         return research_result
     except Exception as e:
         logger.error(f"Errore durante la ricerca: {e}")
-        return "Errore durante la ricerca. Riprovare."
+        return RESEARCH_ERROR
 
 def generate_response(conversation_text: str, last_user_message: str, modified_response: str) -> str:
     try:
         logger.debug(f"Generando risposta basata sulle informazioni raccolte: {conversation_text}")
-        # Utilizza il metodo 'invoke' con 'input=messages'
-        response = llm.invoke(
-            input=[
-                {"role": "system", "content": f"Rispondi al seguente messaggio: {last_user_message}. Utilizza le seguenti informazioni rilevanti: {conversation_text}. Risposta modificata: {modified_response}"}
-            ],
-            temperature=0.7
-        )
+        with profiled("llm"):
+            response = llm.invoke(input=response_messages(conversation_text, last_user_message, modified_response), temperature=0.7)
         # Estrai solo il contenuto della risposta
-        generated_response = response.content if isinstance(response.content, str) else str(response.content)
+        generated_response = _content(response)
         logger.debug(f"Risposta generata: {generated_response}")
         return generated_response
     except Exception as e:
         logger.error(f"Errore nella generazione della risposta: {e}")
         return "Errore nella generazione della risposta. Riprovare."
 
-def vectorize_messages(messages: List[Dict[str, Any]]) -> np.ndarray:
-    """Vettorializza i messaggi."""
+async def agenerate_response(conversation_text: str, last_user_message: str, modified_response: str) -> str:
+    """Variante asincrona di generate_response."""
     try:
-        texts = [msg['content'] for msg in messages]
-        embeddings = model.encode(texts)
-        logger.debug(f"Embeddings generati: {embeddings.shape}")
-        return embeddings
-    except Exception as e:
-        logger.error(f"Errore nella vettorializzazione dei messaggi: {e}")
-        return np.array([])
-
-def semantic_search(vectors: np.ndarray, query: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Esegue una ricerca semantica per trovare i messaggi rilevanti."""
-    try:
-        query_vector = model.encode([query])
-        num_samples = len(messages)
-        if num_samples == 0:
-            logger.debug("Nessun messaggio disponibile per la ricerca semantica.")
-            return []
-        
-        # Usa al massimo 3 vicini e comunque non più del numero di messaggi disponibili
-        n_neighbors = min(3, num_samples)
-        logger.debug(f"Cerco {n_neighbors} messaggi rilevanti tra {num_samples} messaggi disponibili")
-        
-        nbrs = NearestNeighbors(n_neighbors=n_neighbors, algorithm='ball_tree').fit(vectors)
-        distances, indices = nbrs.kneighbors(query_vector)
-        
-        # Filtra i messaggi per similarità
-        relevant_messages = []
-        for i, distance in zip(indices[0], distances[0]):
-            if distance < 0.8:  # Solo messaggi abbastanza simili
-                relevant_messages.append(messages[i])
-                
-        logger.debug(f"Trovati {len(relevant_messages)} messaggi rilevanti")
-        return relevant_messages
+        logger.debug(f"Generando risposta basata sulle informazioni raccolte: {conversation_text}")
+        with profiled("llm"):
+            response = await llm.ainvoke(input=response_messages(conversation_text, last_user_message, modified_response), temperature=0.7)
+        generated_response = _content(response)
+        logger.debug(f"Risposta generata: {generated_response}")
+        return generated_response
     except Exception as e:
-        logger.error(f"Errore durante la ricerca semantica: {e}")
-        return []
+        logger.error(f"Errore nella generazione della risposta: {e}")
+        return "Errore nella generazione della risposta. Riprovare."
 
 def modify_response(research_result: str) -> str:
     """Modifica la risposta utilizzando un prompt e un LLM."""
@@ -108,7 +102,7 @@ def modify_response(research_result: str) -> str:
 def save_to_long_term_memory(namespace: str, key: str, data: Dict[str, Any]) -> None:
     """Salva i dati nella memoria a lungo termine."""
     try:
-        memory_store.save_to_long_term_memory(namespace, key, data)
+        _get_memory_store().save_to_long_term_memory(namespace, key, data)
         logger.debug(f"Salvato nella memoria a lungo termine: {namespace}/{key}")
     except Exception as e:
         logger.error(f"Errore nel salvataggio della memoria a lungo termine: {e}")
@@ -116,7 +110,7 @@ def save_to_long_term_memory(namespace: str, key: str, data: Dict[str, Any]) ->
 def retrieve_from_long_term_memory(namespace: str, key: str) -> Dict[str, Any]:
     """Recupera i dati dalla memoria a lungo termine."""
     try:
-        item = memory_store.retrieve_from_long_term_memory(namespace, key)
+        item = _get_memory_store().retrieve_from_long_term_memory(namespace, key)
         logger.debug(f"Recuperato dalla memoria a lungo termine: {namespace}/{key}")
         return item
     except Exception as e:
@@ -126,7 +120,7 @@ def retrieve_from_long_term_memory(namespace: str, key: str) -> Dict[str, Any]:
 def search_long_term_memory(namespace: str, query: str) -> List[Dict[str, Any]]:
     """Esegue una ricerca nella memoria a lungo termine."""
     try:
-        results = memory_store.search_long_term_memory(namespace, query)
+        results = _get_memory_store().search_long_term_memory(namespace, query)
         if not results:
             logger.debug(f"Nessun risultato trovato nella memoria a lungo termine per: {query}")
             return []
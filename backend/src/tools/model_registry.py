@@ -0,0 +1,98 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING
+from backend.src.config import EMBEDDING_MODEL_NAME
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = logging.getLogger("ModelRegistry")
+
+class ModelRegistry:
+    """Registro unico dei modelli di embedding del processo.
+
+    Ogni modello viene caricato una sola volta, alla prima richiesta o dal
+    warm-up in background, e condiviso da tutti i moduli.
+    """
+
+    def __init__(self):
+        self._models: Dict[str, "SentenceTransformer"] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def _lock_for(self, name: str) -> threading.Lock:
+        with self._registry_lock:
+            return self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name: str = EMBEDDING_MODEL_NAME) -> "SentenceTransformer":
+        """Restituisce il modello, caricandolo al primo utilizzo."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._lock_for(name):
+            # Un altro thread potrebbe averlo caricato nel frattempo
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            return self._models[name]
+
+    def _load(self, name: str) -> "SentenceTransformer":
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Caricamento del modello {name}...")
+        start = time.perf_counter()
+        try:
+            model = SentenceTransformer(name)
+        except Exception as e:
+            logger.error(f"Errore nel caricamento del modello {name}: {e}")
+            raise
+        load_time = time.perf_counter() - start
+        self._stats[name] = {
+            "load_time_s": round(load_time, 3),
+            "memory_bytes": self._memory_footprint(model),
+        }
+        logger.info(f"Modello {name} caricato in {load_time:.2f}s ({self._stats[name]['memory_bytes'] / 2**20:.1f} MiB)")
+        return model
+
+    @staticmethod
+    def _memory_footprint(model: Any) -> int:
+        """Byte occupati da parametri e buffer del modello."""
+        try:
+            tensors = list(model.parameters()) + list(model.buffers())
+            return sum(t.numel() * t.element_size() for t in tensors)
+        except Exception as e:
+            logger.debug(f"Impossibile calcolare la memoria del modello: {e}")
+            return 0
+
+    def is_loaded(self, name: str = EMBEDDING_MODEL_NAME) -> bool:
+        return name in self._models
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """Precarica i modelli, di default in un thread daemon."""
+        names = list(names) if names is not None else [EMBEDDING_MODEL_NAME]
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.error(f"Warm-up del modello {name} fallito: {e}")
+
+        if not background:
+            load_all()
+            return None
+        thread = threading.Thread(target=load_all, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Tempo di caricamento e memoria occupata per ogni modello caricato."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+# Registro condiviso da tutti i moduli
+model_registry = ModelRegistry()
+
+def get_embedding_model() -> "SentenceTransformer":
+    return model_registry.get(EMBEDDING_MODEL_NAME)
@@ -0,0 +1,113 @@
+import numpy as np
+import logging
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger("VectorIndex")
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Normalizza i vettori (per riga) a norma unitaria in float32."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+class VectorIndex:
+    """Indice vettoriale append-only per ricerche top-k per similarità coseno.
+
+    I vettori normalizzati sono memorizzati in un array NumPy contiguo che
+    raddoppia di capacità quando è pieno, quindi l'aggiunta costa O(1)
+    ammortizzato e una ricerca è un singolo prodotto matrice-vettore.
+    """
+
+    def __init__(self, dims: Optional[int] = None, initial_capacity: int = 256):
+        self.dims = dims
+        self._capacity = initial_capacity
+        self._vectors: Optional[np.ndarray] = None
+        self._payloads: List[Any] = []
+        self._keys: Dict[Hashable, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_vectors(cls, vectors: np.ndarray, payloads: List[Any]) -> "VectorIndex":
+        """Costruisce un indice da una matrice di vettori già calcolati."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        index = cls(dims=vectors.shape[1], initial_capacity=max(len(vectors), 1))
+        index.add_many(vectors, payloads)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._keys
+
+    def _ensure_capacity(self, needed: int):
+        if self._vectors is None:
+            self._capacity = max(self._capacity, needed)
+            self._vectors = np.empty((self._capacity, self.dims), dtype=np.float32)
+        elif needed > self._capacity:
+            while self._capacity < needed:
+                self._capacity *= 2
+            grown = np.empty((self._capacity, self.dims), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+    def add(self, vector: np.ndarray, payload: Any = None, key: Optional[Hashable] = None) -> int:
+        """Aggiunge un vettore; se `key` è già indicizzata restituisce la riga esistente."""
+        return self.add_many(np.asarray(vector).reshape(1, -1), [payload], [key])[0]
+
+    def add_many(self, vectors: np.ndarray, payloads: List[Any], keys: Optional[List[Optional[Hashable]]] = None) -> List[int]:
+        """Aggiunge più vettori in blocco, saltando le chiavi già presenti."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if keys is None:
+            keys = [None] * len(payloads)
+        if len(vectors) == 0:
+            return []
+
+        with self._lock:
+            if self.dims is None:
+                self.dims = vectors.shape[1]
+            rows = []
+            new_rows = []
+            for i, key in enumerate(keys):
+                if key is not None and key in self._keys:
+                    rows.append(self._keys[key])
+                    continue
+                row = self._size + len(new_rows)
+                new_rows.append(i)
+                rows.append(row)
+                if key is not None:
+                    self._keys[key] = row
+
+            if new_rows:
+                self._ensure_capacity(self._size + len(new_rows))
+                self._vectors[self._size:self._size + len(new_rows)] = normalize(vectors[new_rows])
+                self._payloads.extend(payloads[i] for i in new_rows)
+                self._size += len(new_rows)
+            return rows
+
+    def search(self, query_vector: np.ndarray, top_k: int = 3, min_similarity: float = -1.0) -> List[Tuple[Any, float]]:
+        """Restituisce fino a `top_k` coppie (payload, similarità coseno) in ordine decrescente."""
+        with self._lock:
+            size = self._size
+            vectors = self._vectors
+            payloads = self._payloads
+        if size == 0 or top_k <= 0:
+            return []
+
+        query = normalize(np.asarray(query_vector).reshape(-1))
+        similarities = vectors[:size] @ query
+        k = min(top_k, size)
+        if k < size:
+            candidates = np.argpartition(-similarities, k - 1)[:k]
+        else:
+            candidates = np.arange(size)
+        ordered = candidates[np.argsort(-similarities[candidates])]
+
+        return [
+            (payloads[i], float(similarities[i]))
+            for i in ordered
+            if similarities[i] >= min_similarity
+        ]
@@ -0,0 +1,32 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+from backend.src.config import BLOCKING_POOL_SIZE
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool condiviso per il lavoro bloccante (embedding, psycopg2, sqlite), creato al primo utilizzo."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+    return _executor
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Esegue `func` nel pool limitato senza bloccare l'event loop.
+
+    Come asyncio.to_thread propaga i contextvars (unit of work, span del
+    profiler), ma i thread sono al massimo BLOCKING_POOL_SIZE: sotto carico
+    il lavoro CPU-bound si accoda invece di moltiplicare i thread.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
@@ -0,0 +1,52 @@
+from typing import Any, Callable, Iterable, Optional
+
+# Limiti di default per le rappresentazioni nei log
+MAX_ITEMS = 3
+MAX_CHARS = 200
+
+class LazyRepr:
+    """Argomento di log formattato solo quando il record viene effettivamente emesso.
+
+    Usare con il formato %-style del modulo logging:
+    `logger.debug("Stato: %s", state_summary(state))` non costa nulla se il
+    livello DEBUG è disattivato.
+    """
+
+    __slots__ = ("_render",)
+
+    def __init__(self, render: Callable[[], str]):
+        self._render = render
+
+    def __str__(self) -> str:
+        return self._render()
+
+    __repr__ = __str__
+
+def truncate(value: Any, max_items: int = MAX_ITEMS, max_chars: int = MAX_CHARS) -> str:
+    """Rappresentazione compatta: liste ridotte agli ultimi elementi, testo tagliato a `max_chars`."""
+    if isinstance(value, (list, tuple)):
+        if len(value) > max_items:
+            tail = ", ".join(truncate(item, max_items, max_chars) for item in value[-max_items:])
+            text = f"[{len(value)} elementi, ultimi {max_items}: {tail}]"
+        else:
+            text = "[" + ", ".join(truncate(item, max_items, max_chars) for item in value) + "]"
+    elif isinstance(value, dict):
+        text = "{" + ", ".join(f"{key!r}: {truncate(item, max_items, max_chars)}" for key, item in value.items()) + "}"
+    else:
+        text = repr(value)
+    return text if len(text) <= max_chars else text[:max_chars] + "..."
+
+def summarize(value: Any, max_items: int = MAX_ITEMS, max_chars: int = MAX_CHARS) -> LazyRepr:
+    """Versione differita di `truncate` (il testo semplice resta senza virgolette)."""
+    if isinstance(value, str):
+        return LazyRepr(lambda: value if len(value) <= max_chars else value[:max_chars] + "...")
+    return LazyRepr(lambda: truncate(value, max_items, max_chars))
+
+def state_summary(state: Any, keys: Optional[Iterable[str]] = None, max_items: int = MAX_ITEMS, max_chars: int = MAX_CHARS) -> LazyRepr:
+    """Riepilogo differito dello stato: una voce per chiave, ognuna troncata separatamente."""
+    def render() -> str:
+        if not isinstance(state, dict):
+            return truncate(state, max_items, max_chars)
+        selected = state.keys() if keys is None else [key for key in keys if key in state]
+        return "{" + ", ".join(f"{key}: {truncate(state[key], max_items, max_chars)}" for key in selected) + "}"
+    return LazyRepr(render)
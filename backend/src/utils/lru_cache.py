@@ -0,0 +1,83 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger("LRUCache")
+
+class LRUCache:
+    """Cache LRU thread-safe con contatori di hit/miss e scadenza opzionale (TTL)."""
+
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        if max_size <= 0:
+            raise ValueError("max_size deve essere positivo")
+        self.max_size = max_size
+        self.ttl = ttl  # Secondi di validità di ogni voce (None = nessuna scadenza)
+        self._data: "OrderedDict[Hashable, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.generation = 0  # Incrementato a ogni invalidazione
+
+    def get(self, key: Hashable, default: Optional[Any] = None) -> Any:
+        """Restituisce il valore in cache aggiornandone la posizione LRU."""
+        with self._lock:
+            if key in self._data:
+                value, expires_at = self._data[key]
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any, generation: Optional[int] = None) -> None:
+        """Inserisce un valore, eliminando le voci meno usate oltre `max_size`.
+
+        Con `generation` (letta prima di caricare il valore) l'inserimento viene
+        saltato se nel frattempo c'è stata un'invalidazione: il valore potrebbe
+        precedere una scrittura appena committata.
+        """
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """Rimuove una voce dalla cache, se presente."""
+        with self._lock:
+            self._data.pop(key, None)
+            self.generation += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statistiche di utilizzo della cache."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
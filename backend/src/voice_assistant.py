@@ -3,10 +3,19 @@
 import logging
 import speech_recognition as sr
 from backend.src.state.state_manager import StateManager
-from backend.src.langgraph_setup import get_graph, END  # Ensure langgraph_setup does not import CoreComponents
+from backend.src.langgraph_setup import get_graph, END, STREAMING_NODES  # Ensure langgraph_setup does not import CoreComponents
 from backend.src.audio.audio_handler import AudioHandler
 from backend.src.utils.error_handler import ErrorHandler
-from typing import Optional
+from backend.src.write_behind import WriteBehindPersister
+from backend.src.session_log import build_delta
+from backend.src.config import SESSION_LOG_MODE, MESSAGE_WINDOW_SIZE, MESSAGE_ARCHIVE_BATCH
+from backend.src.tools.embedding import reset_session_index
+from backend.src.utils.lazy_log import state_summary
+from backend.src.state.message import Message
+from backend.src.profiler import profiler
+from backend.src.utils.blocking import run_blocking
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 from backend.src.tools.llm_tools import retrieve_from_long_term_memory, save_to_long_term_memory, should_update_profile
 import asyncio
 from langchain.schema.runnable import RunnableConfig
@@ -14,12 +23,16 @@ from langchain.schema.runnable import RunnableConfig
 logger = logging.getLogger("VoiceAssistant")
 
 class VoiceAssistant:
-    def __init__(self, state_manager: StateManager):
+    def __init__(self, state_manager: StateManager, write_behind: Optional[WriteBehindPersister] = None, thread_id: Optional[str] = None):
         self.listening = True
         self.state_manager = state_manager
+        self.write_behind = write_behind  # Se presente, i session_logs vengono salvati in background
+        self.turn = 0  # Numero del prossimo turno nel log di sessione
+        self._log_cursor = None  # Stato già registrato nel log per turni
         self.audio_handler = AudioHandler()
-        self.thread_id = self.generate_thread_id()
+        self.thread_id = thread_id or self.generate_thread_id()  # Le sessioni dell'API usano il proprio ID
         self.is_web_mode = False  # Aggiungiamo un flag per il web mode
+        self._loop: Optional[asyncio.AbstractEventLoop] = None  # Loop della modalità vocale, unico per tutti i comandi
         logger.debug("VoiceAssistant initialization completed.")
 
     def generate_thread_id(self) -> str:
@@ -43,8 +56,37 @@ class VoiceAssistant:
             logger.info(f"Usando thread_id di fallback: {fallback_id}")
             return fallback_id
 
-    async def process_command(self, command: str):
-        """Elabora il comando trascritto."""
+    async def process_command(self, command: str, on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        """Elabora il comando trascritto, registrandone la traccia (nodi, LLM, embedding, DB, TTS).
+
+        Con `on_token` i token della risposta vengono inoltrati mentre il
+        modello li genera. Restituisce la risposta generata in questo turno
+        ("" se il grafo non ne ha prodotta); gli errori vengono propagati.
+        """
+        with profiler.turn(self.thread_id, turn=self.turn):
+            return await self._process_command(command, on_token)
+
+    async def _astream_graph(self, graph, state: Dict[str, Any], config: RunnableConfig, on_token: Callable[[str], Awaitable[None]],
+                             turn_start: float) -> Tuple[Dict[str, Any], Optional[float]]:
+        """Esegue il grafo inoltrando i token dei nodi di risposta; restituisce lo stato finale e il time-to-first-token."""
+        result: Dict[str, Any] = {}
+        first_token = None
+        async for mode, payload in graph.astream(state, config=config, stream_mode=["messages", "values"]):
+            if mode == "values":
+                result = payload  # L'ultimo valore è lo stato finale, come con ainvoke
+                continue
+            chunk, metadata = payload
+            if metadata.get("langgraph_node") not in STREAMING_NODES or not isinstance(chunk.content, str) or not chunk.content:
+                continue  # Es. il router LLM del supervisor
+            if first_token is None:
+                first_token = time.perf_counter() - turn_start
+                logger.info(f"Time-to-first-token {first_token * 1e3:.0f} ms (thread {self.thread_id}, turno {self.turn})")
+                profiler.annotate(ttft_ms=round(first_token * 1e3, 1))
+            await on_token(chunk.content)
+        return result, first_token
+
+    async def _process_command(self, command: str, on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> str:
+        turn_start = time.perf_counter()
         try:
             # Get the current graph instance
             graph = get_graph()
@@ -54,45 +96,53 @@ class VoiceAssistant:
             # Configura il RunnableConfig con il thread ID
             config = RunnableConfig(configurable={"thread_id": self.thread_id})
 
-            # Log dello stato iniziale formattato
-            formatted_state = {k: v for k, v in self.state_manager.state.items() if not isinstance(v, (list, dict)) or len(str(v)) < 100}
-            logger.debug("Stato iniziale: %s", formatted_state)
-
-            # Log del comando utente
+            # Il messaggio dell'utente entra nello stato tramite il reducer, poi si prende uno snapshot
+            self.state_manager.update_state({"user_messages": [Message("user", command)]})
             logger.debug("Aggiunto messaggio utente: %s", command)
+            state = self.state_manager.snapshot()
+            state["thread_id"] = self.thread_id
+            replies_before = len(state.get("agent_messages", []))
+            logger.debug("Stato iniziale: %s", state_summary(state))
 
-            # Crea una copia dello stato corrente
-            state = self.state_manager.state.copy()
-            logger.debug("Stato iniziale: %s", state)  # Added state argument
+            # Tutte le scritture del turno (nodi del grafo inclusi) in un'unica transazione
+            async with self.state_manager.memory_store.aunit_of_work():
+                # Esegui il grafo
+                graph_start = time.perf_counter()
+                timings = {}
+                if on_token is None:
+                    command_result = await graph.ainvoke(state, config=config)
+                else:
+                    command_result, first_token = await self._astream_graph(graph, state, config, on_token, turn_start)
+                    if first_token is not None:
+                        timings["ttft_s"] = round(first_token, 4)
+                timings["graph_s"] = round(time.perf_counter() - graph_start, 4)
+                logger.debug("Risultato dell'esecuzione del grafo: %s", state_summary(command_result))
 
-            # Aggiungi il messaggio dell'utente
-            if "user_messages" not in state:
-                state["user_messages"] = []
-            state["user_messages"].append({"role": "user", "content": command})
-            logger.debug("Aggiunto messaggio utente: %s", command)
-
-            # Esegui il grafo
-            command_result = await graph.ainvoke(state, config=config)
-            logger.debug("Risultato dell'esecuzione del grafo: %s", command_result)  # Added command_result argument
+                # **Update the entire state instead of extracting 'update'**
+                if not isinstance(command_result, dict):
+                    logger.error("Risultato del comando non è un dizionario.")
+                    command_result = {}
 
-            # **Update the entire state instead of extracting 'update'**
-            if not isinstance(command_result, dict):
-                logger.error("Risultato del comando non è un dizionario.")
-                command_result = {}
+                # Può calcolare embedding e scritture psycopg2 (long_term_memory): nel pool limitato
+                await run_blocking(self.state_manager.update_state, command_result)
+                # Solo una risposta aggiunta in questo turno: mai quella di un turno precedente
+                replied = len(self.state_manager.state.get("agent_messages", [])) > replies_before
+                assistant_message = self.state_manager.get_assistant_message() if replied else ""
 
-            self.state_manager.update_state(command_result)
-            
-            # **Add logging for updated state**
-            logger.debug("Stato dopo update_state: %s", self.state_manager.state)  # Added state_manager.state argument
+                if MESSAGE_WINDOW_SIZE > 0:
+                    await self._archive_overflow()
 
-            # Usa MemoryStore direttamente tramite StateManager
-            self.state_manager.memory_store.save_to_long_term_memory("session_logs", self.thread_id, self.state_manager.to_dict())  # Updated
-            assistant_message = self.state_manager.get_assistant_message()
-            logger.debug(f"Messaggio dell'assistente: {assistant_message}")
+                # Il log di sessione è salvato fuori dal percorso della risposta quando possibile
+                namespace, key, data = self._session_log_record(timings)
+                if self.write_behind is not None:
+                    self.write_behind.submit(namespace, key, data)
+                else:
+                    await self.state_manager.memory_store.asave_to_long_term_memory(namespace, key, data)
+                logger.debug("Messaggio dell'assistente: %s", assistant_message)
 
-            # Salva il thread_id nel database
-            self.state_manager.memory_store.save_to_long_term_memory("threads", self.thread_id, {"thread_id": self.thread_id})  # Updated
-            logger.debug(f"Thread ID salvato nel database: {self.thread_id}")
+                # Salva il thread_id nel database
+                await self.state_manager.memory_store.asave_to_long_term_memory("threads", self.thread_id, {"thread_id": self.thread_id})
+                logger.debug(f"Thread ID salvato nel database: {self.thread_id}")
 
             # Riproduci la risposta solo se c'è un messaggio e NON siamo in web mode
             if assistant_message:
@@ -100,9 +150,39 @@ class VoiceAssistant:
                     self.audio_handler.speak(assistant_message)
             else:
                 logger.warning("Messaggio dell'assistente è vuoto. Nessun audio da riprodurre.")
+            return assistant_message
 
         except Exception as e:
             logger.error(f"Errore nell'elaborazione del comando: {e}", exc_info=True)
+            raise
+
+    async def _archive_overflow(self):
+        """Sposta in archivio i messaggi oltre la finestra: la memoria per sessione resta costante."""
+        spilled = self.state_manager.spill_window(MESSAGE_WINDOW_SIZE, MESSAGE_ARCHIVE_BATCH)
+        if not spilled:
+            return
+        archive = self.state_manager.memory_store.message_archive
+        for key, kind in (("user_messages", "user"), ("agent_messages", "agent")):
+            if key in spilled:
+                offset, messages = spilled[key]
+                await archive.aarchive(self.thread_id, kind, offset, messages, write_behind=self.write_behind)
+        # L'indice vettoriale in memoria viene ricostruito dalla sola finestra
+        reset_session_index(self.thread_id)
+
+    def _session_log_record(self, timings: dict) -> tuple:
+        """Record del log di sessione per il turno appena concluso: (namespace, key, data)."""
+        if SESSION_LOG_MODE != "turns":
+            return "session_logs", self.thread_id, self.state_manager.to_dict()
+
+        delta, self._log_cursor = build_delta(self._log_cursor, self.state_manager.state)
+        record = {
+            "thread_id": self.thread_id,
+            "turn": self.turn,
+            **delta,
+            "meta": {"routing": self.state_manager.state.get("last_agent", ""), "timings": timings},
+        }
+        self.turn += 1
+        return "session_turns", f"{self.thread_id}/{record['turn']}", record
 
     def update_state(self, last_user_message: str):
         """Aggiorna lo stato con la memoria a breve e lungo termine."""
@@ -142,17 +222,35 @@ class VoiceAssistant:
                 # Update the language parameter to match whisper's expected format
                 command = recognizer.recognize_whisper(audio, language="italian", model="base")
                 logger.info(f"Comando riconosciuto: {command}")
-                asyncio.run(self.process_command(command))
+                self._run_async(self.process_command(command))
             except sr.UnknownValueError:
                 logger.warning("Whisper Recognition non ha capito l'audio.")
             except sr.RequestError as e:
                 logger.error(f"Errore di richiesta a Whisper Recognition; {e}")
+            except Exception:
+                pass  # Già registrato da process_command: si resta in ascolto
+
+    def _run_async(self, coro):
+        """Esegue una coroutine nel loop della modalità vocale.
+
+        Il loop resta lo stesso tra un comando e l'altro: il pool asincrono
+        del database e le sue connessioni vengono riusati invece di essere
+        riaperti a ogni comando.
+        """
+        if self._loop is None or self._loop.is_closed():
+            self._loop = asyncio.new_event_loop()
+        return self._loop.run_until_complete(coro)
 
     def run(self):
         """Avvia il Voice Assistant."""
         logger.info("Voice Assistant avviato.")
-        while self.listening:
-            self.listen_and_process()
+        try:
+            while self.listening:
+                self.listen_and_process()
+        finally:
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.run_until_complete(self.state_manager.memory_store.aclose())
+                self._loop.close()
         logger.info("Voice Assistant terminato.")
 
 def should_update_profile(command: str) -> bool:
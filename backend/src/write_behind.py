@@ -0,0 +1,199 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+from backend.src.config import (
+    WRITE_BEHIND_MAX_QUEUE,
+    WRITE_BEHIND_FLUSH_INTERVAL,
+    WRITE_BEHIND_MAX_ATTEMPTS,
+    WRITE_BEHIND_DEAD_LETTER_PATH,
+)
+from backend.src.state.message import json_default
+
+logger = logging.getLogger("WriteBehind")
+
+def _snapshot(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Copia il primo livello di liste/dizionari: lo stato live può cambiare prima del flush."""
+    return {
+        key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+        for key, value in data.items()
+    }
+
+class WriteBehindPersister:
+    """Persistenza write-behind per la memoria a lungo termine.
+
+    Le scritture vengono accodate senza attendere il database e salvate da
+    un thread in background, a intervalli regolari e allo shutdown. Scritture
+    ripetute sulla stessa chiave prima del flush vengono fuse nell'ultima.
+
+    Se la transazione del batch fallisce, le scritture vengono ritentate una
+    alla volta: quelle valide vengono salvate, mentre una scrittura che
+    fallisce da sola per `max_attempts` flush viene spostata nel log
+    dead-letter (o scartata), così non blocca la coda.
+    """
+
+    def __init__(self, memory_store, max_queue_size: int = WRITE_BEHIND_MAX_QUEUE, flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL,
+                 max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS, dead_letter_path: str = WRITE_BEHIND_DEAD_LETTER_PATH):
+        self.memory_store = memory_store
+        self.max_queue_size = max_queue_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.dead_letter_path = dead_letter_path
+        self._pending: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._attempts: Dict[Tuple[str, str], int] = {}  # Flush falliti per le scritture isolate
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._stopped = False
+        self._thread = None
+        self._metrics = {
+            "enqueued": 0,
+            "coalesced": 0,
+            "dropped": 0,
+            "written": 0,
+            "failed_flushes": 0,
+            "failed_records": 0,
+            "dead_lettered": 0,
+            "flushes": 0,
+            "last_flush_latency_s": 0.0,
+            "max_flush_latency_s": 0.0,
+            "total_flush_latency_s": 0.0,
+        }
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+        logger.debug(f"Write-behind avviato (coda max {self.max_queue_size}, flush ogni {self.flush_interval}s)")
+
+    def submit(self, namespace: str, key: str, data: Dict[str, Any]) -> None:
+        """Accoda una scrittura; ritorna subito."""
+        item_key = (namespace, key)
+        with self._condition:
+            self._metrics["enqueued"] += 1
+            if item_key in self._pending:
+                self._metrics["coalesced"] += 1
+            elif len(self._pending) >= self.max_queue_size:
+                # Coda piena: si scarta la scrittura più vecchia
+                dropped, _ = self._pending.popitem(last=False)
+                self._metrics["dropped"] += 1
+                logger.warning(f"Coda write-behind piena, scartata la scrittura {dropped[0]}/{dropped[1]}")
+            self._pending[item_key] = _snapshot(data)
+            if len(self._pending) >= self.max_queue_size // 2:
+                self._condition.notify()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._stopped:
+                    self._condition.wait(timeout=self.flush_interval)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def flush(self) -> int:
+        """Salva tutte le scritture in coda in un'unica transazione."""
+        with self._flush_lock:
+            with self._condition:
+                if not self._pending:
+                    return 0
+                batch = self._pending
+                self._pending = OrderedDict()
+
+            start = time.perf_counter()
+            try:
+                self._write(batch.items())
+                written = len(batch)
+            except Exception as e:
+                logger.error(f"Flush write-behind fallito, {len(batch)} scritture ritentate una alla volta: {e}")
+                with self._condition:
+                    self._metrics["failed_flushes"] += 1
+                written = self._flush_isolated(batch)
+
+            latency = time.perf_counter() - start
+            with self._condition:
+                for item_key in batch:
+                    if item_key not in self._pending:
+                        self._attempts.pop(item_key, None)
+                self._metrics["flushes"] += 1
+                self._metrics["written"] += written
+                self._metrics["last_flush_latency_s"] = latency
+                self._metrics["max_flush_latency_s"] = max(self._metrics["max_flush_latency_s"], latency)
+                self._metrics["total_flush_latency_s"] += latency
+            logger.debug(f"Write-behind: {written} scritture salvate in {latency * 1000:.1f} ms")
+            return written
+
+    def _write(self, items) -> None:
+        with self.memory_store.unit_of_work():
+            for (namespace, key), data in items:
+                self.memory_store.save_to_long_term_memory(namespace, key, data)
+
+    def _flush_isolated(self, batch: "OrderedDict[Tuple[str, str], Dict[str, Any]]") -> int:
+        """Ritenta le scritture una per una; restituisce quante sono state salvate."""
+        failed: List[Tuple[Tuple[str, str], Dict[str, Any], Exception]] = []
+        for item_key, data in batch.items():
+            try:
+                self._write([(item_key, data)])
+            except Exception as e:
+                failed.append((item_key, data, e))
+        written = len(batch) - len(failed)
+        # Se non passa nessuna scrittura il problema è il database, non i record: niente tentativi consumati
+        isolated = written > 0 or len(batch) == 1
+        dead = []
+        with self._condition:
+            self._metrics["failed_records"] += len(failed)
+            for item_key, data, error in failed:
+                attempts = self._attempts.get(item_key, 0) + isolated
+                if attempts >= self.max_attempts:
+                    self._attempts.pop(item_key, None)
+                    self._metrics["dead_lettered"] += 1
+                    dead.append((item_key, data, error))
+                    continue
+                self._attempts[item_key] = attempts
+                # Le scritture più recenti arrivate nel frattempo hanno la precedenza
+                self._pending.setdefault(item_key, data)
+        for item_key, data, error in dead:
+            self._dead_letter(item_key, data, error)
+        return written
+
+    def _dead_letter(self, item_key: Tuple[str, str], data: Dict[str, Any], error: Exception) -> None:
+        namespace, key = item_key
+        logger.error(f"Scrittura {namespace}/{key} fallita {self.max_attempts} volte, rimossa dalla coda: {error}")
+        if not self.dead_letter_path:
+            return
+        record = {"namespace": namespace, "key": key, "data": data, "error": str(error), "time": time.time()}
+        try:
+            directory = os.path.dirname(self.dead_letter_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.dead_letter_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record, default=json_default) + "\n")
+        except Exception as e:
+            logger.error(f"Impossibile salvare {namespace}/{key} nel log dead-letter: {e}")
+
+    def stop(self, timeout: float = 10.0):
+        """Ferma il thread di background dopo un ultimo flush."""
+        with self._condition:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self.flush()
+        logger.info("Write-behind fermato")
+
+    def metrics(self) -> Dict[str, Any]:
+        """Profondità della coda, latenza dei flush e scritture fuse/scartate."""
+        with self._condition:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._pending)
+        flushes = metrics["flushes"]
+        metrics["avg_flush_latency_s"] = metrics.pop("total_flush_latency_s") / flushes if flushes else 0.0
+        return metrics
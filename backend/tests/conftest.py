@@ -0,0 +1,74 @@
+import os
+
+# Gli agenti creano i client ChatOpenAI all'import: nei test le chiamate LLM sono sostituite
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from typing import Any, Dict, List, Tuple
+import pytest
+from backend.src.memory_store import MemoryStore
+from backend.src.message_archive import MessageArchive
+from backend.src.research_cache import ResearchCache
+from backend.src.session_log import fold_deltas
+
+class FakeSessionLog:
+    def __init__(self, memory_store: "FakeMemoryStore"):
+        self.memory_store = memory_store
+
+    def turns(self, thread_id: str) -> List[Dict[str, Any]]:
+        records = [
+            data for (namespace, _), data in self.memory_store.records.items()
+            if namespace == "session_turns" and data["thread_id"] == thread_id
+        ]
+        return sorted(records, key=lambda data: data["turn"])
+
+    def last_turn(self, thread_id: str) -> int:
+        turns = self.turns(thread_id)
+        return turns[-1]["turn"] if turns else -1
+
+class FakeMemoryStore:
+    """MemoryStore senza database: la memoria a lungo termine è un dizionario.
+
+    Le firme coincidono con quelle di MemoryStore (vedi test_fake_memory_store.py);
+    i metodi che non toccano il database sono quelli reali.
+    """
+
+    manage_short_term = MemoryStore.manage_short_term
+    manage_long_term = MemoryStore.manage_long_term
+    extract_relevant_info = MemoryStore.extract_relevant_info
+
+    def __init__(self):
+        self.records: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.saved: List[Tuple[str, str, Dict[str, Any]]] = []  # Scritture in ordine
+        self.search_results: List[Dict[str, Any]] = []  # Righe {key, data, similarity} delle ricerche
+        self.session_log = FakeSessionLog(self)
+        self.message_archive = MessageArchive(self)
+        self.research_cache = ResearchCache(self, enabled=False)
+
+    def save_to_long_term_memory(self, namespace: str, key: str, data: Dict[str, Any]) -> None:
+        self.records[(namespace, key)] = data
+        self.saved.append((namespace, key, data))
+
+    def retrieve_from_long_term_memory(self, namespace: str, key: str) -> Dict[str, Any]:
+        return self.records.get((namespace, key), {})
+
+    def search_long_term_memory(self, namespace: str, query: str, limit: int = 5, mode: str = "semantic") -> List[Dict[str, Any]]:
+        return self.search_results[:limit]
+
+    async def asave_to_long_term_memory(self, namespace: str, key: str, data: Dict[str, Any], embedding=None) -> None:
+        self.save_to_long_term_memory(namespace, key, data)
+
+    async def aretrieve_from_long_term_memory(self, namespace: str, key: str) -> Dict[str, Any]:
+        return self.retrieve_from_long_term_memory(namespace, key)
+
+    async def asearch_long_term_memory(self, namespace: str, query: str, limit: int = 5, mode: str = "semantic") -> List[Dict[str, Any]]:
+        return self.search_long_term_memory(namespace, query, limit=limit, mode=mode)
+
+    def load_session_state(self, thread_id: str) -> Dict[str, Any]:
+        return fold_deltas([
+            {key: value for key, value in data.items() if key not in ("thread_id", "turn")}
+            for data in self.session_log.turns(thread_id)
+        ])
+
+@pytest.fixture
+def memory_store() -> FakeMemoryStore:
+    return FakeMemoryStore()
@@ -0,0 +1,63 @@
+import json
+import pickle
+import pytest
+from backend.src.state.digest_set import DigestSet, merge_processed, text_digest
+from backend.src.state.message import json_default
+
+def test_membership_uses_digest_of_value():
+    processed = DigestSet()
+    assert processed.add("ciao")
+    assert not processed.add("ciao")
+
+    assert "ciao" in processed
+    assert "altro" not in processed
+    assert list(processed) == [text_digest("ciao")]
+
+def test_oldest_digests_are_evicted_over_max_size():
+    processed = DigestSet(max_size=3)
+    for value in ("a", "b", "c", "d"):
+        processed.add(value)
+
+    assert len(processed) == 3
+    assert "a" not in processed
+    assert processed.last() == text_digest("d")
+
+def test_since_returns_digests_added_after_cursor():
+    processed = DigestSet(max_size=3)
+    for value in ("a", "b"):
+        processed.add(value)
+    cursor = processed.last()
+    processed.add("c")
+
+    assert processed.since(cursor) == [text_digest("c")]
+    assert processed.since(None) == [text_digest(value) for value in ("a", "b", "c")]
+    processed.add("d")
+    processed.add("e")
+    assert processed.since(cursor) is None  # Il cursore è uscito dal limite
+
+def test_merge_processed_copies_frozen_set():
+    old = DigestSet().freeze()
+    merged = merge_processed(old, ["ciao"])
+
+    assert merged is not old
+    assert len(old) == 0
+    assert "ciao" in merged
+    with pytest.raises(TypeError):
+        old.add("altro")
+
+def test_merge_processed_adopts_full_set_and_legacy_lists():
+    full = DigestSet()
+    full.add("ciao")
+    assert merge_processed(DigestSet(), full) is full
+    assert full.frozen
+
+    legacy = merge_processed(["vecchio messaggio"], ["nuovo"])  # Checkpoint con la lista dei messaggi
+    assert "vecchio messaggio" in legacy and "nuovo" in legacy
+
+def test_serialization_round_trips():
+    processed = DigestSet(max_size=10)
+    processed.add("ciao")
+
+    assert pickle.loads(pickle.dumps(processed)) == processed
+    assert DigestSet(**processed._asdict()) == processed
+    assert json.loads(json.dumps({"processed": processed}, default=json_default)) == {"processed": list(processed)}
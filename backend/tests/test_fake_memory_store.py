@@ -0,0 +1,17 @@
+import inspect
+import pytest
+from backend.src.memory_store import MemoryStore
+from backend.tests.conftest import FakeMemoryStore
+
+SHARED_METHODS = [
+    name for name, member in vars(FakeMemoryStore).items()
+    if callable(member) and not name.startswith("_")
+]
+
+@pytest.mark.parametrize("name", SHARED_METHODS)
+def test_fake_matches_memory_store_signature(name):
+    real = getattr(MemoryStore, name)
+    fake = getattr(FakeMemoryStore, name)
+
+    assert list(inspect.signature(fake).parameters) == list(inspect.signature(real).parameters)
+    assert inspect.iscoroutinefunction(fake) == inspect.iscoroutinefunction(real)
@@ -0,0 +1,105 @@
+"""Topologia del grafo: ogni nodo, supervisor compreso, viene eseguito al più una volta per turno."""
+
+import asyncio
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_openai")
+
+from langgraph.checkpoint.memory import MemorySaver
+from backend.src import langgraph_setup
+from backend.src.agents import greeting_agent, researcher_agent, supervisor_agent
+from backend.src.profiler import GraphProfiler
+from backend.src.state.message import Message
+from backend.src.tools.intent_router import IntentRouter
+
+RESEARCH_MESSAGE = "Spiegami cos'è la fotosintesi"
+GREETING_MESSAGE = "Ciao, come stai?"
+FAILING_RESEARCH_MESSAGE = "Spiegami cos'è un errore di rete"
+
+@pytest.fixture
+def graph(monkeypatch, memory_store):
+    calls = {"route": 0, "research": 0, "respond": 0}
+
+    async def route(user_message, state):
+        calls["route"] += 1
+        return "RESEARCHER" if "cos'è" in user_message else "GREETING"
+
+    async def research(query):
+        calls["research"] += 1
+        if "errore" in query:
+            raise RuntimeError("ricerca non disponibile")
+        return f"fatti su {query}"
+
+    async def respond(conversation_text, last_user_message, modified_response):
+        calls["respond"] += 1
+        return f"{last_user_message} -> {modified_response}"
+
+    monkeypatch.setattr(supervisor_agent, "adetermine_next_agent", route)
+    monkeypatch.setattr(supervisor_agent, "find_relevant_messages", lambda state, message, archived=None: [])
+    monkeypatch.setattr(supervisor_agent, "intent_router", IntentRouter(mode="llm"))
+    monkeypatch.setattr(supervisor_agent, "MESSAGE_WINDOW_SIZE", 0)
+    monkeypatch.setattr(researcher_agent, "aperform_research", research)
+    monkeypatch.setattr(greeting_agent, "agenerate_response", respond)
+    monkeypatch.setattr(langgraph_setup, "create_checkpointer", lambda: (MemorySaver(), None))
+    profiler = GraphProfiler(enabled=True, export_path="")
+    monkeypatch.setattr(langgraph_setup, "profiler", profiler)
+
+    compiled = langgraph_setup.initialize_graph(memory_store)
+
+    def run_turn(message: str, thread_id: str = "test-thread"):
+        config = {"configurable": {"thread_id": thread_id}}
+        state = {"user_messages": [Message("user", message)], "thread_id": thread_id}
+
+        async def invoke():
+            with profiler.turn(thread_id):
+                return await compiled.ainvoke(state, config=config)
+
+        result = asyncio.run(invoke())
+        return result, profiler.traces(thread_id, limit=1)[0]["node_calls"]
+
+    return run_turn, calls
+
+def test_research_route_runs_each_node_once(graph):
+    run_turn, calls = graph
+    result, node_calls = run_turn(RESEARCH_MESSAGE)
+
+    assert node_calls == {"supervisor": 1, "researcher": 1, "greeting": 1, "manage_memory": 1}
+    assert calls == {"route": 1, "research": 1, "respond": 1}
+    # Il risultato della ricerca arriva al greeting, che genera l'unica risposta del turno
+    assert len(result["agent_messages"]) == 1
+    assert "fatti su" in result["agent_messages"][-1]["content"]
+
+def test_greeting_route_skips_researcher(graph):
+    run_turn, calls = graph
+    result, node_calls = run_turn(GREETING_MESSAGE)
+
+    assert node_calls == {"supervisor": 1, "greeting": 1, "manage_memory": 1}
+    assert calls == {"route": 1, "research": 0, "respond": 1}
+    assert len(result["agent_messages"]) == 1
+
+def test_every_node_runs_at_most_once_per_turn(graph):
+    run_turn, _ = graph
+    for message in (RESEARCH_MESSAGE, GREETING_MESSAGE, RESEARCH_MESSAGE + "?", GREETING_MESSAGE + "!"):
+        _, node_calls = run_turn(message)
+        assert node_calls["supervisor"] == 1
+        assert all(count <= 1 for count in node_calls.values()), node_calls
+
+def test_research_result_does_not_leak_into_next_greeting(graph):
+    run_turn, _ = graph
+    run_turn(RESEARCH_MESSAGE)
+    result, _ = run_turn(GREETING_MESSAGE)
+
+    assert result["agent_messages"][-1]["content"] == f"{GREETING_MESSAGE} -> "
+    assert result["research_result"] == ""
+
+def test_failed_research_does_not_reuse_previous_result(graph):
+    run_turn, calls = graph
+    run_turn(RESEARCH_MESSAGE)
+    result, node_calls = run_turn(FAILING_RESEARCH_MESSAGE)
+
+    assert node_calls == {"supervisor": 1, "researcher": 1, "greeting": 1, "manage_memory": 1}
+    assert calls["research"] == 2
+    assert result["agent_messages"][-1]["content"] == f"{FAILING_RESEARCH_MESSAGE} -> "
+    assert result["research_result"] == ""
+    assert result["modified_response"] == ""
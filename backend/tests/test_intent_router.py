@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from backend.src.tools.intent_router import IntentRouter, RouteDecision, ROUTING_NAMESPACE
+
+LOCAL = RouteDecision("GREETING", "local", 0.97)
+
+def make_router(audit_rate: float) -> IntentRouter:
+    router = IntentRouter(mode="local", audit_rate=audit_rate, model_path="")
+    router.classify = lambda message: ("GREETING", 0.97)  # Classificatore senza embedding
+    return router
+
+def test_audit_samples_only_local_decisions():
+    router = make_router(audit_rate=1.0)
+
+    assert router.should_audit(LOCAL)
+    assert not router.should_audit(RouteDecision("GREETING", "llm", 0.4))
+    assert not make_router(audit_rate=0.0).should_audit(LOCAL)
+    assert router.metrics()["audits"] == 1
+
+def test_audit_rate_is_a_fraction_of_local_decisions():
+    router = make_router(audit_rate=0.1)
+    audited = sum(router.should_audit(LOCAL) for _ in range(5000))
+
+    assert 350 < audited < 650
+
+def test_supervisor_labels_sampled_local_decisions(monkeypatch, memory_store):
+    pytest.importorskip("langgraph")
+    pytest.importorskip("langchain_openai")
+    from backend.src.agents import supervisor_agent
+    from backend.src.state.message import Message
+
+    llm_calls = []
+
+    async def llm_route(user_message, state):
+        llm_calls.append(user_message)
+        return "RESEARCHER"
+
+    router = make_router(audit_rate=1.0)
+    router.classifier = object()  # Solo per abilitare la decisione locale: classify è sostituito
+    monkeypatch.setattr(supervisor_agent, "intent_router", router)
+    monkeypatch.setattr(supervisor_agent, "adetermine_next_agent", llm_route)
+    monkeypatch.setattr(supervisor_agent, "find_relevant_messages", lambda state, message, archived=None: [])
+    monkeypatch.setattr(supervisor_agent, "MESSAGE_WINDOW_SIZE", 0)
+    node = supervisor_agent.create_supervisor_node(memory_store)
+
+    async def run():
+        command = await node({"user_messages": [Message("user", "Ciao!")], "thread_id": "t"})
+        await asyncio.gather(*supervisor_agent._audit_tasks)
+        return command
+
+    command = asyncio.run(run())
+
+    assert command.goto == "greeting"  # Decide il router locale, l'LLM etichetta soltanto
+    assert llm_calls == ["Ciao!"]
+    assert [(namespace, data) for namespace, _, data in memory_store.saved] == [(ROUTING_NAMESPACE, {
+        "message": "Ciao!", "route": "RESEARCHER", "local_confidence": 0.97, "source": "audit", "local_route": "GREETING",
+    })]
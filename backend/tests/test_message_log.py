@@ -0,0 +1,65 @@
+import pickle
+import pytest
+from backend.src.state.message import Message
+from backend.src.state.message_log import MessageLog, merge_messages
+
+def make_log(count: int) -> MessageLog:
+    return MessageLog(Message("user", f"messaggio {i}") for i in range(count))
+
+def test_append_skips_duplicates():
+    log = make_log(3)
+    log.append(Message("user", "messaggio 1"))
+    log.append({"role": "user", "content": "messaggio 2"})  # Stesso digest del Message equivalente
+    log.append(Message("assistant", "messaggio 1"))
+
+    assert len(log) == 4
+    assert Message("assistant", "messaggio 1") in log
+    assert {"role": "user", "content": "messaggio 0"} in log
+
+def test_log_is_append_only():
+    log = make_log(2)
+    with pytest.raises(TypeError):
+        log.pop()
+    with pytest.raises(TypeError):
+        log[0] = Message("user", "altro")
+
+def test_merge_adopts_extending_log_without_copy():
+    old = make_log(3).freeze()
+    new = merge_messages(old, [Message("user", "nuovo")]).freeze()
+
+    assert merge_messages(old, new) is new
+    assert new.frozen
+
+def test_merge_adopts_snapshot_over_list_restored_from_checkpoint():
+    snapshot = merge_messages(make_log(5).freeze(), [Message("user", "nuovo")]).freeze()
+    restored = [Message(message.role, message.content) for message in snapshot[:5]]  # msgpack restituisce una lista
+
+    assert merge_messages(restored, snapshot) is snapshot
+
+def test_merge_extends_frozen_log_copy_on_write():
+    old = make_log(2).freeze()
+    merged = merge_messages(old, [Message("user", "nuovo"), Message("user", "messaggio 0")])
+
+    assert merged is not old
+    assert len(old) == 2
+    assert [message["content"] for message in merged] == ["messaggio 0", "messaggio 1", "nuovo"]
+
+def test_merge_rebuilds_from_diverging_list():
+    restored = [Message("user", "altro")]
+    merged = merge_messages(restored, make_log(2).freeze())
+
+    assert [message["content"] for message in merged] == ["altro", "messaggio 0", "messaggio 1"]
+
+def test_split_keeps_recent_window_with_offset():
+    archived, window = make_log(5).split(2)
+
+    assert [message["content"] for message in archived] == ["messaggio 0", "messaggio 1", "messaggio 2"]
+    assert window.offset == 3
+    assert Message("user", "messaggio 0") not in window
+    assert merge_messages(make_log(5), window.freeze()) is window  # Finestra più recente: sostituisce lo storico
+
+def test_pickle_rebuilds_index():
+    log = pickle.loads(pickle.dumps(make_log(3)))
+
+    assert isinstance(log, MessageLog)
+    assert Message("user", "messaggio 2") in log
@@ -0,0 +1,96 @@
+"""Read-through cache del MemoryStore: nessuna riga vecchia in cache dopo il commit di una scrittura."""
+
+from backend.src.db_pool import UnitOfWork, bind_unit_of_work, current_unit_of_work
+from backend.src.memory_store import MemoryStore
+from backend.src.utils.lru_cache import LRUCache
+
+NAMESPACE = "user_profiles"
+
+class FakePersistentStore:
+    """Tabella in memoria con la stessa semantica di write/flush di PersistentStore."""
+
+    def __init__(self):
+        self.rows = {}
+        self.on_get = None  # Eseguito durante la lettura, per simulare un commit concorrente
+
+    def get(self, namespace, key):
+        uow = current_unit_of_work()
+        if uow is not None and (namespace, key) in uow.pending:
+            return uow.pending[(namespace, key)]
+        row = self.rows.get((namespace, key))
+        if self.on_get is not None:
+            self.on_get()
+        return row
+
+    def write(self, namespace, key, data):
+        uow = current_unit_of_work()
+        if uow is not None:
+            uow.add("UPSERT", (namespace, key, data), key=(namespace, key), data=data)
+            return
+        self.rows[(namespace, key)] = data
+
+    def flush(self, uow):
+        for _, (namespace, key, data) in uow.statements:
+            self.rows[(namespace, key)] = data
+        uow.committed()
+
+class FakeLongTermStore:
+    def __init__(self, persistent_store):
+        self.persistent_store = persistent_store
+
+    def put(self, namespace, key, data, index=True):
+        self.persistent_store.write(namespace, key, data)
+
+def make_store():
+    store = MemoryStore.__new__(MemoryStore)  # Senza database
+    store._read_caches = {NAMESPACE: LRUCache(16, ttl=300)}
+    store.persistent_store = FakePersistentStore()
+    store.long_term_store = FakeLongTermStore(store.persistent_store)
+    return store
+
+def test_reader_during_unit_of_work_does_not_pin_old_row():
+    store = make_store()
+    store.persistent_store.rows[(NAMESPACE, "mario")] = {"name": "Mario"}
+    uow = UnitOfWork()
+    with bind_unit_of_work(uow):
+        store.save_to_long_term_memory(NAMESPACE, "mario", {"name": "Mario Rossi"})
+
+    # Lettore concorrente prima del commit: vede (e mette in cache) la riga vecchia
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "mario") == {"name": "Mario"}
+    store.persistent_store.flush(uow)
+
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "mario") == {"name": "Mario Rossi"}
+
+def test_negative_entry_is_dropped_after_commit():
+    store = make_store()
+    uow = UnitOfWork()
+    with bind_unit_of_work(uow):
+        store.save_to_long_term_memory(NAMESPACE, "luigi", {"name": "Luigi"})
+
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "luigi") == {}
+    store.persistent_store.flush(uow)
+
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "luigi") == {"name": "Luigi"}
+
+def test_read_overlapping_commit_is_not_cached():
+    store = make_store()
+    store.persistent_store.rows[(NAMESPACE, "mario")] = {"name": "Mario"}
+
+    def commit_during_read():
+        store.persistent_store.on_get = None
+        store.save_to_long_term_memory(NAMESPACE, "mario", {"name": "Mario Rossi"})
+
+    store.persistent_store.on_get = commit_during_read
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "mario") == {"name": "Mario"}
+
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "mario") == {"name": "Mario Rossi"}
+
+def test_discarded_unit_of_work_keeps_cache():
+    store = make_store()
+    store.persistent_store.rows[(NAMESPACE, "mario")] = {"name": "Mario"}
+    store.retrieve_from_long_term_memory(NAMESPACE, "mario")
+    with bind_unit_of_work(UnitOfWork()):
+        store.save_to_long_term_memory(NAMESPACE, "mario", {"name": "Mario Rossi"})  # Mai committata
+
+    assert store.retrieve_from_long_term_memory(NAMESPACE, "mario") == {"name": "Mario"}
+    assert store.cache_stats()[NAMESPACE]["hits"] == 1
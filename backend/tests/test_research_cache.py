@@ -0,0 +1,46 @@
+import asyncio
+import time
+from backend.src.research_cache import RESEARCH_NAMESPACE, ResearchCache, VOLATILE_PATTERN, normalize_query
+
+def record(query, age_s=0.0):
+    return {"query": query, "result": f"risultato per {query}", "created_at": time.time() - age_s, "latency_s": 1.5}
+
+def test_normalize_query_collapses_case_spaces_and_punctuation():
+    assert normalize_query("  Chi   è\tDante?? ") == "chi è dante"
+    assert normalize_query("Cos'è il DNA.") == normalize_query("cos'è il dna")
+
+def test_volatile_queries_get_short_ttl(memory_store):
+    cache = ResearchCache(memory_store, ttl=3600, volatile_ttl=60)
+
+    assert VOLATILE_PATTERN.search("Che tempo fa oggi a Roma?")
+    assert not VOLATILE_PATTERN.search("Chi ha scritto la Divina Commedia?")
+    assert cache.ttl_for("ultime notizie sul calcio") == 60
+    assert cache.ttl_for("storia di Roma") == 3600
+
+def test_exact_hit_uses_normalized_key(memory_store):
+    memory_store.records[(RESEARCH_NAMESPACE, "chi è dante")] = record("Chi è Dante?")
+    hit = asyncio.run(ResearchCache(memory_store, enabled=True).aget("chi è DANTE ?"))
+
+    assert hit["match"] == "exact"
+    assert hit["result"] == "risultato per Chi è Dante?"
+
+def test_semantic_hit_respects_similarity_and_ttl(memory_store):
+    memory_store.search_results = [
+        {"data": record("chi era Dante", age_s=10_000), "similarity": 0.99},  # Scaduto
+        {"data": record("chi fu Dante Alighieri"), "similarity": 0.95},
+        {"data": record("Dante"), "similarity": 0.5},
+    ]
+    cache = ResearchCache(memory_store, enabled=True, ttl=3600, min_similarity=0.9)
+    hit = asyncio.run(cache.aget("chi è Dante"))
+
+    assert hit["match"] == "semantic"
+    assert hit["query"] == "chi fu Dante Alighieri"
+    assert cache.metrics()["semantic_hits"] == 1
+
+def test_miss_is_counted(memory_store):
+    memory_store.search_results = [{"data": record("altro"), "similarity": 0.2}]
+    cache = ResearchCache(memory_store, enabled=True, min_similarity=0.9)
+
+    assert asyncio.run(cache.aget("chi è Dante")) is None
+    assert cache.metrics()["misses"] == 1
+    assert cache.metrics()["hit_rate"] == 0.0
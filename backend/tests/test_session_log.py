@@ -0,0 +1,52 @@
+import copy
+from backend.src.session_log import apply_delta, build_delta, fold_deltas
+from backend.src.state.digest_set import DigestSet
+
+def test_first_delta_sets_everything():
+    state = {"user_messages": [{"role": "user", "content": "ciao"}], "last_agent": "greeting"}
+    delta, _ = build_delta(None, state)
+
+    assert delta == {"set": {"user_messages": state["user_messages"], "last_agent": "greeting"}}
+
+def test_growing_lists_are_logged_as_appends():
+    state = {"user_messages": ["a"], "last_agent": "greeting"}
+    _, cursor = build_delta(None, state)
+    state = {"user_messages": ["a", "b"], "last_agent": "greeting"}
+    delta, _ = build_delta(cursor, state)
+
+    assert delta == {"append": {"user_messages": ["b"]}}
+
+def test_rewritten_lists_and_changed_values_are_set():
+    _, cursor = build_delta(None, {"short_term_memory": ["a", "b"], "query": "x"})
+    delta, _ = build_delta(cursor, {"short_term_memory": ["b", "c"], "query": "y"})
+
+    assert delta == {"set": {"short_term_memory": ["b", "c"], "query": "y"}}
+
+def test_unchanged_state_produces_empty_delta():
+    state = {"user_messages": ["a"], "query": "x"}
+    _, cursor = build_delta(None, state)
+
+    assert build_delta(cursor, state)[0] == {}
+
+def test_digest_sets_append_new_digests():
+    processed = DigestSet()
+    processed.add("a")
+    _, cursor = build_delta(None, {"processed_messages": processed})
+    processed.add("b")
+    delta, _ = build_delta(cursor, {"processed_messages": processed})
+
+    assert delta == {"append": {"processed_messages": [list(processed)[-1]]}}
+
+def test_folding_deltas_rebuilds_state():
+    states = [
+        {"user_messages": ["a"], "query": "x"},
+        {"user_messages": ["a", "b"], "query": "x"},
+        {"user_messages": ["a", "b", "c"], "query": "y", "last_agent": "researcher"},
+    ]
+    cursor, deltas = None, []
+    for state in states:
+        delta, cursor = build_delta(cursor, state)
+        deltas.append(copy.deepcopy(delta))
+
+    assert fold_deltas(deltas) == states[-1]
+    assert apply_delta({"user_messages": ["a"]}, {"append": {"user_messages": ["b"]}}) == {"user_messages": ["a", "b"]}
@@ -0,0 +1,76 @@
+"""Ripristino di una sessione dal log per turni dopo l'eviction, con la finestra dei messaggi attiva."""
+
+import json
+from types import SimpleNamespace
+from backend.src.session_log import build_delta, turn_params
+from backend.src.session_manager import SessionManager
+from backend.src.state.message import Message
+from backend.src.state.message_log import MessageLog, merge_messages
+from backend.src.state.state_manager import StateManager
+from backend.src.state.state_schema import StateSchema
+
+THREAD_ID = "session-test"
+WINDOW = 3
+
+def make_assistant(memory_store):
+    state_manager = StateManager(memory_store)
+    state_manager.set_state_schema(StateSchema)
+    return SimpleNamespace(state_manager=state_manager, turn=0, _log_cursor=None)  # Parte di VoiceAssistant usata da _restore
+
+def log_turn(memory_store, assistant):
+    """Come VoiceAssistant._session_log_record, con il passaggio per JSONB."""
+    delta, assistant._log_cursor = build_delta(assistant._log_cursor, assistant.state_manager.state)
+    record = {"thread_id": THREAD_ID, "turn": assistant.turn, **delta}
+    thread_id, turn, data = turn_params(record)
+    memory_store.save_to_long_term_memory("session_turns", f"{thread_id}/{turn}", {"thread_id": thread_id, "turn": turn, **json.loads(data)})
+    assistant.turn += 1
+
+def archive_keys(memory_store, spilled):
+    offset, messages = spilled["user_messages"]
+    return [key for _, key, _ in memory_store.message_archive.records(THREAD_ID, "user", offset, messages)]
+
+def spilled_session(memory_store):
+    assistant = make_assistant(memory_store)
+    assistant.state_manager.update_state({"user_messages": [Message("user", f"m{i}") for i in range(10)]})
+    log_turn(memory_store, assistant)
+    spilled = assistant.state_manager.spill_window(WINDOW, 0)
+    log_turn(memory_store, assistant)
+    return assistant, spilled
+
+def test_restore_keeps_window_offset(memory_store):
+    _, spilled = spilled_session(memory_store)
+    assert archive_keys(memory_store, spilled)[0] == "user/00000000"
+
+    restored = make_assistant(memory_store)
+    SessionManager(memory_store)._restore(restored, THREAD_ID)
+    window = restored.state_manager.state["user_messages"]
+
+    assert isinstance(window, MessageLog)
+    assert window.offset == 7
+    assert [message["content"] for message in window] == ["m7", "m8", "m9"]
+    assert "user_messages_offset" not in restored.state_manager.state
+    assert restored.turn == 2
+    # Cursore allineato allo stato ripristinato: nessuna riscrittura completa al turno successivo
+    assert build_delta(restored._log_cursor, restored.state_manager.state)[0] == {}
+
+def test_restored_window_replaces_checkpoint_history(memory_store):
+    spilled_session(memory_store)
+    restored = make_assistant(memory_store)
+    SessionManager(memory_store)._restore(restored, THREAD_ID)
+    restored.state_manager.update_state({"user_messages": [Message("user", "nuovo")]})
+
+    checkpoint = [Message("user", f"m{i}") for i in range(10)]  # Canale del checkpointer: storico completo
+    merged = merge_messages(checkpoint, restored.state_manager.snapshot()["user_messages"])
+
+    assert [message["content"] for message in merged] == ["m7", "m8", "m9", "nuovo"]
+
+def test_next_spill_after_restore_continues_archive_keys(memory_store):
+    spilled_session(memory_store)
+    restored = make_assistant(memory_store)
+    SessionManager(memory_store)._restore(restored, THREAD_ID)
+    restored.state_manager.update_state({"user_messages": [Message("user", "nuovo")]})
+    spilled = restored.state_manager.spill_window(WINDOW, 0)
+
+    assert archive_keys(memory_store, spilled) == ["user/00000007"]
+    log_turn(memory_store, restored)
+    assert memory_store.load_session_state(THREAD_ID)["user_messages_offset"] == 8
@@ -0,0 +1,31 @@
+from backend.src.state.state_manager import StateManager
+from backend.src.state.state_schema import StateSchema
+
+def make_state_manager(memory_store):
+    state_manager = StateManager(memory_store)
+    state_manager.set_state_schema(StateSchema)
+    return state_manager
+
+def test_unchanged_long_term_memory_is_not_saved(memory_store):
+    state_manager = make_state_manager(memory_store)
+    for _ in range(3):
+        state_manager.update_state({"long_term_memory": {}, "last_agent": "greeting"})
+
+    assert memory_store.saved == []
+
+def test_long_term_memory_is_saved_once_per_change(memory_store):
+    state_manager = make_state_manager(memory_store)
+    state_manager.update_state({"long_term_memory": {"nome": "Mario"}})
+    state_manager.update_state({"long_term_memory": {"nome": "Mario"}})
+    state_manager.update_state({"long_term_memory": {"città": "Roma"}})
+
+    assert [data for _, _, data in memory_store.saved] == [{"nome": "Mario"}, {"nome": "Mario", "città": "Roma"}]
+
+def test_in_place_changes_are_detected(memory_store):
+    state_manager = make_state_manager(memory_store)
+    state_manager.update_state({"long_term_memory": {"important_info": ["preferenza: tè"]}})
+    state_manager.state["long_term_memory"]["important_info"].append("informazione: vive a Roma")
+    state_manager.update_state({"long_term_memory": {}})
+
+    assert len(memory_store.saved) == 2
+    assert memory_store.saved[-1][2]["important_info"] == ["preferenza: tè", "informazione: vive a Roma"]
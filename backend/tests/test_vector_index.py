@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from backend.src.tools.vector_index import VectorIndex, normalize
+
+def test_normalize_handles_zero_vectors():
+    vectors = normalize(np.array([[3.0, 4.0], [0.0, 0.0]]))
+
+    assert vectors.dtype == np.float32
+    assert np.allclose(vectors, [[0.6, 0.8], [0.0, 0.0]])
+
+def test_search_orders_by_cosine_similarity():
+    index = VectorIndex()
+    index.add_many(np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]]), ["x", "y", "xy"])
+    results = index.search(np.array([2.0, 0.1]), top_k=2)
+
+    assert [payload for payload, _ in results] == ["x", "xy"]
+    assert results[0][1] == pytest.approx(0.9988, abs=1e-3)
+
+def test_min_similarity_filters_results():
+    index = VectorIndex.from_vectors(np.array([[1.0, 0.0], [-1.0, 0.0]]), ["vicino", "opposto"])
+
+    assert index.search(np.array([1.0, 0.0]), top_k=5, min_similarity=0.0) == [("vicino", pytest.approx(1.0))]
+
+def test_duplicate_keys_return_existing_row():
+    index = VectorIndex()
+    first = index.add(np.array([1.0, 0.0]), "a", key="a")
+    again = index.add(np.array([0.0, 1.0]), "altro", key="a")
+
+    assert first == again == 0
+    assert len(index) == 1
+    assert "a" in index
+
+def test_capacity_grows_beyond_initial_size():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(10, 4))
+    index = VectorIndex(initial_capacity=2)
+    index.add_many(vectors[:3], list(range(3)))
+    index.add_many(vectors[3:], list(range(3, 10)))
+
+    assert len(index) == 10
+    for i, vector in enumerate(vectors):
+        assert index.search(vector, top_k=1)[0][0] == i
+
+def test_empty_index_returns_nothing():
+    assert VectorIndex(dims=3).search(np.ones(3)) == []
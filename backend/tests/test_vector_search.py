@@ -0,0 +1,125 @@
+"""Ricerca vettoriale di PersistentStore: scansione esatta in NumPy e ricerca esatta dopo il post-filtro dell'indice ANN."""
+
+import asyncio
+import json
+import numpy as np
+import pytest
+from backend.src.memory_store import (
+    PersistentStore,
+    SCAN_EMBEDDINGS_SQL,
+    SEARCH_VECTOR_EXACT_SQL,
+    SEARCH_VECTOR_SQL,
+    rank_by_embedding,
+)
+
+def cosine(a, b) -> float:
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    return float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+class TablePersistentStore(PersistentStore):
+    """PersistentStore su una tabella in memoria: interpreta le sole query di ricerca vettoriale.
+
+    SEARCH_VECTOR_SQL imita HNSW/IVFFlat: l'indice restituisce i primi
+    `ef_search` candidati di tutta la tabella e il filtro sul namespace
+    viene applicato dopo.
+    """
+
+    def __init__(self, vector_enabled: bool, ef_search: int = 4):
+        self.vector_enabled = vector_enabled
+        self.ef_search = ef_search
+        self.rows = []  # (namespace, key, data, embedding)
+        self.queries = []
+
+    def add(self, namespace, key, embedding=None):
+        self.rows.append((namespace, key, {"text": key}, embedding))
+
+    def _ranked(self, rows, vector):
+        ranked = [
+            {"key": key, "data": data, "similarity": cosine(embedding, vector), "namespace": namespace}
+            for namespace, key, data, embedding in rows if embedding is not None
+        ]
+        return sorted(ranked, key=lambda row: row["similarity"], reverse=True)
+
+    def execute(self, sql, params=(), fetch=None, dict_rows=False):
+        self.queries.append(sql)
+        if sql == SCAN_EMBEDDINGS_SQL:
+            (namespace,) = params
+            return [
+                {"key": key, "data": data, "embedding": embedding}
+                for row_namespace, key, data, embedding in self.rows
+                if row_namespace == namespace and embedding is not None
+            ]
+        if sql == SEARCH_VECTOR_SQL:
+            vector, namespace, _, limit = params
+            candidates = self._ranked(self.rows, json.loads(vector))[:self.ef_search]
+        elif sql == SEARCH_VECTOR_EXACT_SQL:
+            vector, namespace, limit = params
+            candidates = self._ranked(self.rows, json.loads(vector))
+        else:
+            raise AssertionError(f"Query inattesa: {sql}")
+        matches = [row for row in candidates if row.pop("namespace") == namespace]
+        return matches[:limit]
+
+def filled_store(vector_enabled: bool) -> TablePersistentStore:
+    store = TablePersistentStore(vector_enabled)
+    # Namespace grande e molto simile alla query: occupa tutti i candidati dell'indice
+    for i in range(20):
+        store.add("research_results", f"r{i}", [1.0, 0.01 * i, 0.0])
+    store.add("message_archive/t", "vicino", [1.0, 0.2, 0.0])
+    store.add("message_archive/t", "medio", [1.0, 1.0, 0.0])
+    store.add("message_archive/t", "lontano", [0.0, 0.0, 1.0])
+    store.add("message_archive/t", "senza_embedding")
+    return store
+
+def test_rank_by_embedding_orders_top_k():
+    rows = [
+        {"key": "a", "data": {}, "embedding": [0.0, 1.0]},
+        {"key": "b", "data": {}, "embedding": [1.0, 0.1]},
+        {"key": "c", "data": {}, "embedding": [1.0, 1.0]},
+    ]
+    ranked = rank_by_embedding(rows, [1.0, 0.0], limit=2)
+
+    assert [row["key"] for row in ranked] == ["b", "c"]
+    assert ranked[0]["similarity"] == pytest.approx(cosine([1.0, 0.1], [1.0, 0.0]), abs=1e-6)
+    assert rank_by_embedding([], [1.0, 0.0], limit=2) == []
+
+def test_numpy_scan_filters_namespace_and_missing_embeddings():
+    store = filled_store(vector_enabled=False)
+    results = store.search_vector("message_archive/t", [1.0, 0.0, 0.0], limit=5)
+
+    assert [row["key"] for row in results] == ["vicino", "medio", "lontano"]
+    assert store.queries == [SCAN_EMBEDDINGS_SQL]
+
+def test_small_namespace_falls_back_to_exact_search():
+    store = filled_store(vector_enabled=True)
+    results = store.search_vector("message_archive/t", [1.0, 0.0, 0.0], limit=2)
+
+    # I candidati dell'indice sono tutti di research_results: senza la ricerca esatta nessun risultato
+    assert [row["key"] for row in results] == ["vicino", "medio"]
+    assert store.queries == [SEARCH_VECTOR_SQL, SEARCH_VECTOR_EXACT_SQL]
+
+def test_full_ann_result_skips_exact_search():
+    store = filled_store(vector_enabled=True)
+    results = store.search_vector("research_results", [1.0, 0.0, 0.0], limit=3)
+
+    assert [row["key"] for row in results] == ["r0", "r1", "r2"]
+    assert store.queries == [SEARCH_VECTOR_SQL]
+
+def test_async_store_falls_back_to_exact_search():
+    pytest.importorskip("psycopg_pool")
+    from backend.src.async_memory_store import AsyncPersistentStore
+
+    sync_store = filled_store(vector_enabled=True)
+    sync_store.connection_string = ""
+    sync_store.embedding_cast = "::vector"
+    sync_store.fulltext_enabled = False
+    store = AsyncPersistentStore(sync_store)
+
+    async def execute(sql, params=(), fetch=None, dict_rows=False):
+        return sync_store.execute(sql, params, fetch=fetch, dict_rows=dict_rows)
+
+    store.execute = execute
+    results = asyncio.run(store.search_vector("message_archive/t", [1.0, 0.0, 0.0], limit=2))
+
+    assert [row["key"] for row in results] == ["vicino", "medio"]
+    assert sync_store.queries == [SEARCH_VECTOR_SQL, SEARCH_VECTOR_EXACT_SQL]
@@ -25,6 +25,7 @@ function App() {
   const audioRef = useRef(null);
   const [isAssistantSpeaking, setIsAssistantSpeaking] = useState(false);
   const audioAnalyzer = useRef(null);
+  const sessionIdRef = useRef(null);  // Sessione assegnata dal backend alla prima risposta
 
   useEffect(() => {
     // Initial connection check
@@ -51,13 +52,14 @@ function App() {
       const response = await fetch(ENDPOINTS.CHAT_MESSAGE, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ command: command.trim() })  // Verifica che questo corrisponda al backend
+        body: JSON.stringify({ command: command.trim(), session_id: sessionIdRef.current })  // Verifica che questo corrisponda al backend
       });
       
       if (!response.ok) throw new Error('Network response was not ok');
       
       const data = await response.json();
       console.log('Response received:', data);
+      if (data.session_id) sessionIdRef.current = data.session_id;
       setStatus(data.message);
 
       if (data.audio_response) {  // Cambiato da data.audio a data.audio_response
@@ -225,7 +227,10 @@ function App() {
     formData.append('audio', audioBlob, 'recording.wav');
 
     try {
-      const response = await fetch(ENDPOINTS.AUDIO_UPLOAD, {
+      const url = sessionIdRef.current
+        ? `${ENDPOINTS.AUDIO_UPLOAD}?session_id=${encodeURIComponent(sessionIdRef.current)}`
+        : ENDPOINTS.AUDIO_UPLOAD;
+      const response = await fetch(url, {
         method: 'POST',
         body: formData
       });
@@ -234,6 +239,7 @@ function App() {
       
       const data = await response.json();
       console.log('Received response:', data); // Debug log
+      if (data.session_id) sessionIdRef.current = data.session_id;
       
       setStatus(data.text || 'Audio processed');
       if (data.text) setCommand(data.text);